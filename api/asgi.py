@@ -0,0 +1,170 @@
+"""
+Async Web App (ASGI)
+--------------------
+An asyncio serving mode for the study spot web app, built with Quart (the async
+counterpart of Flask). It serves the same templates and form contract as
+api/index.py, but request handlers await engine calls that run in a bounded
+thread pool, so slow queries never hold up the event loop and many slow
+clients can be connected without one OS thread each.
+
+Concurrency is configured with environment variables:
+- STUDY_ASYNC_WORKERS: threads running engine calls (default: STUDY_POOL_SIZE, or 4)
+- STUDY_ASYNC_MAX_PENDING: engine calls admitted at once, running or queued (default 64)
+
+Usage:
+$ hypercorn api.asgi:app --workers 1
+$ python3 api/asgi.py
+
+"""
+
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Response, jsonify, render_template, request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import index
+import interface
+import metrics
+from index import (
+    BATCH_LIMIT, POOL_BUSY, POOL_SIZE, POOL_TIMEOUT, PROMETHEUS_CONTENT_TYPE, format_fallback_results, is_api_path,
+    profile_response, recommend,
+)
+from prolog_pool import PoolTimeout
+from query_builder import InvalidQuery
+
+app = Quart(__name__, template_folder=index.template_dir, static_folder=index.static_dir)
+
+WORKERS = int(os.environ.get("STUDY_ASYNC_WORKERS", str(POOL_SIZE or 4)))
+MAX_PENDING = int(os.environ.get("STUDY_ASYNC_MAX_PENDING", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="study-engine")
+_pending = None
+
+
+async def run_engine(func, *args):
+    """
+    Run a blocking engine call in the bounded executor and await its result.
+
+    At most MAX_PENDING calls are admitted at once; a call that cannot be
+    admitted within STUDY_POOL_TIMEOUT seconds raises PoolTimeout.
+    """
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(MAX_PENDING)
+    try:
+        await asyncio.wait_for(_pending.acquire(), timeout=POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"No engine slot free after {POOL_TIMEOUT:.2f}s") from None
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args))
+    finally:
+        _pending.release()
+
+
+def _search(data, mode):
+    """Run a /search query and format its results for results.html."""
+    if mode == "strict":
+        results = interface.run_strict_query(data)
+        interface.log_recommendations(data, results)
+        return results
+    raw_results = interface.run_fallback_query(data)
+    interface.log_recommendations(data, raw_results)
+    with metrics.timed("format"):
+        return format_fallback_results(raw_results[0]["Results"], data) if raw_results else []
+
+
+@app.route("/")
+async def home():
+    return await render_template("index.html")
+
+
+@app.route("/search", methods=["POST"])
+async def search():
+    form = await request.form
+    mode = "strict" if form.get("mode") == "strict" else "fallback"
+    metrics.count_request("search", mode)
+    # Validate and canonicalize the form before any engine is called
+    data = interface.normalize_inputs(form.to_dict(), mode)
+    results = await run_engine(_search, data, mode)
+    with metrics.timed("render"):
+        return await render_template("results.html", results=results, mode=mode)
+
+
+@app.route("/api/recommend", methods=["POST"])
+async def recommend_batch():
+    """Run a batch of preference objects concurrently; same contract as the Flask endpoint."""
+    body = await request.get_json(silent=True)
+    queries = body.get("queries") if isinstance(body, dict) else body
+    if not isinstance(queries, list):
+        return jsonify({"error": "Expected a JSON array of preference objects"}), 400
+    if len(queries) > BATCH_LIMIT:
+        return jsonify({"error": f"At most {BATCH_LIMIT} queries per request"}), 413
+    results = await asyncio.gather(*(_recommend(preferences) for preferences in queries))
+    return jsonify({"results": list(results)})
+
+
+async def _recommend(preferences):
+    """Run one batch entry; an entry not admitted in time gets an "error" entry like other failures."""
+    try:
+        return await run_engine(recommend, preferences)
+    except PoolTimeout as e:
+        mode = "strict" if isinstance(preferences, dict) and preferences.get("mode") == "strict" else "fallback"
+        return {"mode": mode, "error": str(e)}
+
+
+@app.route("/api/nearby")
+async def nearby():
+    """Return the spots nearest to a point; same contract as the Flask endpoint."""
+    args = request.args
+    spots = await run_engine(
+        interface.nearest_spots, args.get("lat"), args.get("lon"), args.get("k", 5), args.get("radius_m")
+    )
+    return jsonify({"results": [{"name": s["Name"], "link": s["Link"], "meters": s["Meters"]} for s in spots]})
+
+
+@app.route("/api/pool")
+async def pool_stats():
+    """Report engine pool gauges and checkout wait times."""
+    return jsonify(index.engine_pool.stats() if index.engine_pool else {"size": 0})
+
+
+@app.route("/api/profile")
+async def profile():
+    """Prolog query profile; same contract as the Flask endpoint."""
+    body, status = await run_engine(profile_response, request.args)
+    return (body if isinstance(body, str) else jsonify(body)), status
+
+
+@app.route("/metrics")
+async def metrics_text():
+    """Stage latency histograms, request counts and gauges in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route("/metrics.json")
+async def metrics_json():
+    """The /metrics data as JSON."""
+    return jsonify(metrics.snapshot())
+
+
+@app.errorhandler(InvalidQuery)
+async def invalid_query(error):
+    if is_api_path(request.path):
+        return jsonify({"error": str(error)}), 400
+    return f"❌ {error}", 400
+
+
+@app.errorhandler(PoolTimeout)
+async def pool_busy(error):
+    if is_api_path(request.path):
+        return jsonify({"error": POOL_BUSY}), 503
+    return f"⏳ {POOL_BUSY}", 503
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -1,18 +1,52 @@
-from flask import Flask, request, render_template
-from pyswip import Prolog
+from flask import Flask, Response, jsonify, request, render_template
 import os
+import sys
+import threading
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 template_dir = os.path.abspath(os.path.join(base_dir, '..', 'templates'))
 static_dir = os.path.abspath(os.path.join(base_dir, '..', 'static'))
 
+# Make the project modules (interface, engines) importable when run from api/
+sys.path.insert(0, os.path.abspath(os.path.join(base_dir, '..')))
+import interface
+import metrics
+from interface import compute_match_info
+import prolog_profile
+from prolog_pool import EngineError, PrologEnginePool, PoolTimeout
+from query_builder import InvalidQuery, PREFERENCE_KEYS
+from explanations import ATTRIBUTES, MATCHED, SKIPPED
+
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 
-prolog = Prolog()
+# Pool of preloaded Prolog engines so concurrent requests never share one engine.
+# STUDY_POOL_SIZE=0 falls back to the single in-process engine.
+POOL_SIZE = int(os.environ.get("STUDY_POOL_SIZE", "4"))
+POOL_TIMEOUT = float(os.environ.get("STUDY_POOL_TIMEOUT", "5"))
+# Seconds an engine may take to answer before it is killed and replaced
+POOL_QUERY_TIMEOUT = float(os.environ.get("STUDY_POOL_QUERY_TIMEOUT", "30"))
+engine_pool = (
+    PrologEnginePool(POOL_SIZE, acquire_timeout=POOL_TIMEOUT, profile=prolog_profile.ENABLED,
+                     query_timeout=POOL_QUERY_TIMEOUT)
+    if POOL_SIZE > 0 else None
+)
+interface.use_engine_pool(engine_pool)
+if engine_pool is not None:
+    # Load the engines in the background so the first requests do not wait for them
+    threading.Thread(target=engine_pool.warm, name="engine-pool-warm", daemon=True).start()
+if interface.KB_WATCH_INTERVAL > 0:
+    interface.watch_kb(interface.KB_WATCH_INTERVAL)
+
+# Maximum number of preference objects accepted by one /api/recommend call
+BATCH_LIMIT = int(os.environ.get("STUDY_BATCH_LIMIT", "100"))
+
+# Gauges published at /metrics, read when scraped
+metrics.register_gauges("cache", interface.cache_stats)
+metrics.register_gauges("recommendation_log", interface.recommendation_log_stats)
+if engine_pool is not None:
+    metrics.register_gauges("pool", engine_pool.stats)
 
-# Load expert system
-KB_PATH = os.path.join(os.path.dirname(__file__), "..", "study_system.pl")
-prolog.query(f'consult("{KB_PATH}")')
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 
 @app.route("/")
@@ -22,8 +56,8 @@ def home():
 
 def format_fallback_results(raw_list, user_inputs):
     formatted = []
-    for score, name, link, explanation in raw_list:
-        summary, _, match_bar = compute_match_info(user_inputs, score, explanation)
+    for score, name, link, explanation, matches in raw_list:
+        summary, _, match_bar = compute_match_info(matches)
         formatted.append({
             "name": name,
             "score": score,
@@ -37,49 +71,169 @@ def format_fallback_results(raw_list, user_inputs):
 
 @app.route("/search", methods=["POST"])
 def search():
-    data = request.form
-    mode = data.get("mode")
-    
-    query = ""  # build based on mode and inputs
+    mode = request.form.get("mode")
+    metrics.count_request("search", "strict" if mode == "strict" else "fallback")
+    # Validate and canonicalize the form before any engine is called
+    data = interface.normalize_inputs(request.form.to_dict(), "strict" if mode == "strict" else "fallback")
+
+    # Queries go through interface so they share its engine selection and result cache
     if mode == "strict":
-        query = f"""
-        recommend_spot(
-            {data['origin']},
-            {data['max_minutes']},
-            {data['work_type']},
-            {data['outlet_pref']},
-            {data['vibe_pref']},
-            {data['seating_pref']},
-            {data['price_pref']},
-            {data['open_late']},
-            Name, Link)
-        """
-        results = list(prolog.query(query))
-        return render_template("results.html", results=results, mode="strict")
+        results = interface.run_strict_query(data)
+        interface.log_recommendations(data, results)
+        with metrics.timed("render"):
+            return render_template("results.html", results=results, mode="strict")
 
     else:  # fallback
-        query = f"""
-        find_top_study_spots(
-            {data['origin']},
-            {data['max_minutes']},
-            {data['travel_weight']},
-            {data['work_type']}, {data['work_weight']},
-            {data['outlet_pref']}, {data['outlet_weight']},
-            {data['vibe_pref']}, {data['vibe_weight']},
-            {data['seating_pref']}, {data['seating_weight']},
-            {data['price_pref']}, {data['price_weight']},
-            {data['open_late']}, {data['late_weight']},
-            "{data['explain_mode']}",
-            {data['top_n']},
-            Results)
-        """
-        raw_results = list(prolog.query(query))
-        if raw_results:
-            formatted_results = format_fallback_results(raw_results[0]["Results"], data)
-        else:
-            formatted_results = []
-        return render_template("results.html", results=formatted_results, mode="fallback")
+        raw_results = interface.run_fallback_query(data)
+        interface.log_recommendations(data, raw_results)
+        with metrics.timed("format"):
+            if raw_results:
+                formatted_results = format_fallback_results(raw_results[0]["Results"], data)
+            else:
+                formatted_results = []
+        with metrics.timed("render"):
+            return render_template("results.html", results=formatted_results, mode="fallback")
+
+
+def match_flags(matches):
+    """Map per-attribute match states to True (matched), False (missed) or None (skipped)."""
+    return {attr: None if state == SKIPPED else state == MATCHED for attr, state in zip(ATTRIBUTES, matches)}
+
+
+def recommend(preferences):
+    """
+    Run one preference object from a batch and return its JSON-ready result.
+
+    Strict results have no score; every preference they were asked for matched.
+    An invalid object, or one whose query fails in an engine or finds no free
+    engine, gets an "error" entry instead of failing the whole batch.
+    """
+    if not isinstance(preferences, dict):
+        return {"error": "Each query must be a JSON object"}
+    mode = "strict" if preferences.get("mode") == "strict" else "fallback"
+    try:
+        user_inputs = interface.normalize_inputs(preferences, mode)
+    except InvalidQuery as e:
+        return {"mode": mode, "error": str(e)}
+
+    user_inputs["mode"] = mode
+    metrics.count_request("api_recommend", mode)
+    try:
+        return {"mode": mode, "recommendations": _recommendations(user_inputs, mode)}
+    except (EngineError, PoolTimeout) as e:
+        return {"mode": mode, "error": str(e)}
+
+
+def _recommendations(user_inputs, mode):
+    """Query, log and format the recommendations for normalized inputs."""
+    if mode == "strict":
+        results = interface.run_strict_query(user_inputs)
+        interface.log_recommendations(user_inputs, results)
+        with metrics.timed("format"):
+            flags = match_flags([SKIPPED if user_inputs[key] == "skip" else MATCHED for key in PREFERENCE_KEYS])
+            recommendations = [
+                {"score": None, "name": res["Name"], "link": res["Link"], "matches": flags}
+                for res in results
+            ]
+    else:
+        raw_results = interface.run_fallback_query(user_inputs)
+        interface.log_recommendations(user_inputs, raw_results)
+        with metrics.timed("format"):
+            recommendations = [
+                {
+                    "score": score,
+                    "name": name,
+                    "link": link,
+                    "matches": match_flags(matches),
+                }
+                for score, name, link, _, matches in (raw_results[0]["Results"] if raw_results else [])
+            ]
+    return recommendations
+
+
+@app.route("/api/recommend", methods=["POST"])
+def recommend_batch():
+    """
+    Run a batch of preference objects in one round trip.
+
+    The body is a JSON array of preference objects (the /search form fields,
+    with numbers allowed as JSON numbers), or {"queries": [...]}. Results come
+    back in the same order; an invalid object, or one whose query fails in an
+    engine, gets an "error" entry instead of failing the whole batch.
+    """
+    body = request.get_json(silent=True)
+    queries = body.get("queries") if isinstance(body, dict) else body
+    if not isinstance(queries, list):
+        return jsonify({"error": "Expected a JSON array of preference objects"}), 400
+    if len(queries) > BATCH_LIMIT:
+        return jsonify({"error": f"At most {BATCH_LIMIT} queries per request"}), 413
+    return jsonify({"results": [recommend(preferences) for preferences in queries]})
+
+
+@app.route("/api/nearby")
+def nearby():
+    """Return the spots nearest to ?lat=&lon=, with optional k (default 5) and radius_m."""
+    args = request.args
+    spots = interface.nearest_spots(args.get("lat"), args.get("lon"), args.get("k", 5), args.get("radius_m"))
+    return jsonify({"results": [{"name": s["Name"], "link": s["Link"], "meters": s["Meters"]} for s in spots]})
+
+
+@app.route("/api/pool")
+def pool_stats():
+    """Report engine pool gauges and checkout wait times."""
+    return jsonify(engine_pool.stats() if engine_pool else {"size": 0})
+
+
+def profile_response(args):
+    """Build the /api/profile body and status: JSON, or text with ?format=text; ?reset=1 clears the data."""
+    if not prolog_profile.ENABLED:
+        return {"error": "Prolog profiling is off; start the app with STUDY_PROLOG_PROFILE=1"}, 404
+    report = interface.profile_report(reset=args.get("reset") == "1")
+    if args.get("format") == "text":
+        return prolog_profile.format_report(report), 200
+    return report, 200
+
+
+@app.route("/api/profile")
+def profile():
+    """Per-query inference counts and the per-predicate profile of every Prolog engine."""
+    body, status = profile_response(request.args)
+    return (body if isinstance(body, str) else jsonify(body)), status
+
+
+@app.route("/metrics")
+def metrics_text():
+    """Stage latency histograms, request counts and gauges in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route("/metrics.json")
+def metrics_json():
+    """The /metrics data as JSON."""
+    return jsonify(metrics.snapshot())
+
+
+POOL_BUSY = "All recommendation engines are busy, please try again shortly."
+
+
+def is_api_path(path):
+    """JSON endpoints answer errors with {"error": ...}; the form pages with text."""
+    return path.startswith("/api/")
+
+
+@app.errorhandler(InvalidQuery)
+def invalid_query(error):
+    if is_api_path(request.path):
+        return jsonify({"error": str(error)}), 400
+    return f"❌ {error}", 400
+
+
+@app.errorhandler(PoolTimeout)
+def pool_busy(error):
+    if is_api_path(request.path):
+        return jsonify({"error": POOL_BUSY}), 503
+    return f"⏳ {POOL_BUSY}", 503
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
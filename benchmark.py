@@ -0,0 +1,455 @@
+"""
+Benchmark Suite
+---------------
+Non-interactive latency and throughput benchmarks for the recommendation hot paths:
+- parse_preferences (natural language parsing)
+- interface.run_strict_query and interface.run_fallback_query
+- interface.compute_match_info
+- interface.nearest_spots, from points across Seoul and far outside it
+- the Flask /search route, through its test client
+
+Every case runs over a fixed, seeded query corpus against knowledge bases of
+several sizes, and reports p50/p95/p99 latency and throughput as JSON. A run can
+be compared against a stored baseline to flag regressions.
+
+Usage:
+$ python3 benchmark.py --sizes 20,1000,10000 --output bench.json
+$ python3 benchmark.py --engine python --baseline bench.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from knowledge_base import (
+    KB_PATH, FACT_PREDICATES, ORIGINS, WORK_TYPES, OUTLET_OPTIONS, VIBES,
+    SEATING_TYPES, PRICES, LATE_OPTIONS
+)
+
+# Benchmark queries against the in-process engine unless told otherwise: pool
+# engines keep the KB they were started with, so they cannot follow KB sizes
+os.environ.setdefault("STUDY_POOL_SIZE", "0")
+# Synthetic queries must not end up in the recommendation log that log_analytics.py reads
+os.environ.setdefault("STUDY_LOG", "0")
+
+CASES = ("parse_preferences", "strict", "fallback", "compute_match_info", "nearby", "flask_search")
+
+# Natural language requests for the parsing benchmark; combined with seeded filler
+NL_PHRASES = (
+    "I want a cozy cafe with plugs",
+    "somewhere quiet to lock in, open late, free if possible",
+    "a lively spot for group work with booths",
+    "cheap place with individual desks and charging",
+    "chill lounge, no outlets needed, medium price",
+    "deep focus library that is open 24 hours",
+    "collaborative space with open tables and a relaxed vibe",
+    "affordable study cafe near the station, few sockets",
+    "I need intense focus and somewhere silent",
+    "any place that stays open after midnight with comfy seating",
+)
+
+# Nearest-spot query points far from every spot (Incheon airport, Busan, the
+# antipode), mixed into the corpus so a search that widens with the distance
+# from the data shows up as a regression
+FAR_POINTS = ((37.46, 126.44), (35.18, 129.07), (-37.55, -53.0))
+
+_FACT_LINE = re.compile(r"^(\w+)\((\w+)(.*)$")
+_QUOTED_NAME = re.compile(r"^(,\s*')(.*)('\)\.\s*)$")
+
+
+def build_corpus(size=200, seed=42):
+    """
+    Build the fixed query corpus.
+
+    Parameters
+    ----------
+    size : int
+        Number of structured queries (and natural language texts).
+    seed : int
+        Random seed; the same seed always gives the same corpus.
+
+    Returns
+    -------
+    dict
+        {"texts": [...], "queries": [...], "points": [...]} where queries are
+        interface user_inputs dicts and points (lat, lon, k) nearest-spot queries.
+    """
+    rng = random.Random(seed)
+
+    def pick(values):
+        return rng.choice(values + ("skip",)) if rng.random() < 0.8 else "skip"
+
+    queries = []
+    for _ in range(size):
+        query = {
+            "origin": rng.choice(ORIGINS),
+            "max_minutes": rng.randint(1, 45),
+            "work_type": pick(WORK_TYPES),
+            "outlet_pref": pick(OUTLET_OPTIONS),
+            "vibe_pref": pick(VIBES),
+            "seating_pref": pick(SEATING_TYPES),
+            "price_pref": pick(PRICES),
+            "open_late": pick(LATE_OPTIONS),
+            "explain_mode": rng.choice(("short", "long")),
+            "top_n": rng.choice((3, 5, 10)),
+        }
+        for weight_key, pref_key in (
+            ("travel_weight", None), ("work_weight", "work_type"), ("outlet_weight", "outlet_pref"),
+            ("vibe_weight", "vibe_pref"), ("seating_weight", "seating_pref"),
+            ("price_weight", "price_pref"), ("late_weight", "open_late"),
+        ):
+            query[weight_key] = 0 if pref_key and query[pref_key] == "skip" else rng.randint(1, 5)
+        queries.append(query)
+
+    texts = [
+        " ".join(rng.sample(NL_PHRASES, rng.randint(1, 3))) + rng.choice(("", " please", " thanks!"))
+        for _ in range(size)
+    ]
+    points = [
+        (rng.uniform(37.45, 37.7), rng.uniform(126.8, 127.15), rng.choice((1, 5, 10)))
+        for _ in range(size)
+    ]
+    for i, (lat, lon) in enumerate(FAR_POINTS):
+        points[i * len(points) // len(FAR_POINTS)] = (lat, lon, 5)
+    return {"texts": texts, "queries": queries, "points": points}
+
+
+def scale_kb(size, path, source=KB_PATH):
+    """
+    Write a copy of a knowledge base resized to `size` spots.
+
+    The rules are copied once; spot facts are replicated under new ids (and
+    numbered display names) right after the fact they copy, so every
+    predicate's clauses stay contiguous. Sizes below the source's spot count
+    keep the first `size` spots.
+
+    Parameters
+    ----------
+    size : int
+        Number of spots in the output KB.
+    path : str
+        Output file path.
+    source : str
+        Knowledge base to scale.
+
+    Returns
+    -------
+    str
+        The output path.
+    """
+    with open(source, encoding="utf-8") as kb_file:
+        lines = kb_file.readlines()
+    spot_ids = [m.group(2) for m in map(_FACT_LINE.match, lines) if m and m.group(1) == "study_spot"]
+    index = {spot: i for i, spot in enumerate(spot_ids)}
+    base = len(spot_ids)
+
+    with open(path, "w", encoding="utf-8") as out:
+        for line in lines:
+            match = _FACT_LINE.match(line.rstrip("\n"))
+            if not match or match.group(1) not in FACT_PREDICATES or match.group(2) not in index:
+                out.write(line)
+                continue
+            predicate, spot, rest = match.groups()
+            for copy in range(0, (size - index[spot] + base - 1) // base):
+                if copy == 0:
+                    out.write(line)
+                    continue
+                copy_rest = rest
+                name = _QUOTED_NAME.match(rest) if predicate == "study_spot_name" else None
+                if name:
+                    copy_rest = f"{name.group(1)}{name.group(2)} #{copy + 1}{name.group(3)}"
+                out.write(f"{predicate}({spot}_c{copy}{copy_rest}\n")
+    return path
+
+
+def _percentile(ordered, fraction):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(latencies_ns):
+    """
+    Summarize per-call latencies.
+
+    Parameters
+    ----------
+    latencies_ns : list of int
+        One wall-clock duration per call, in nanoseconds.
+
+    Returns
+    -------
+    dict
+        calls, p50_ms, p95_ms, p99_ms, mean_ms, min_ms, max_ms and throughput_per_s.
+    """
+    ordered = sorted(ns / 1e6 for ns in latencies_ns)
+    total_ms = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "p50_ms": _percentile(ordered, 0.50),
+        "p95_ms": _percentile(ordered, 0.95),
+        "p99_ms": _percentile(ordered, 0.99),
+        "mean_ms": total_ms / len(ordered) if ordered else 0.0,
+        "min_ms": ordered[0] if ordered else 0.0,
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "throughput_per_s": len(ordered) / (total_ms / 1000) if total_ms else 0.0,
+    }
+
+
+def time_calls(func, inputs, repeat=1, warmup=5):
+    """
+    Time func over every input, `repeat` times, after a few warm-up calls.
+
+    Returns
+    -------
+    dict
+        The summary from summarize.
+    """
+    for item in inputs[:warmup]:
+        func(item)
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter_ns()
+            func(item)
+            latencies.append(time.perf_counter_ns() - start)
+    return summarize(latencies)
+
+
+def _form(query, mode):
+    """Turn a corpus query into the /search form fields, as the web page submits them."""
+    form = {key: str(value) for key, value in query.items()}
+    form["work_type_weight"] = form.pop("work_weight")
+    form["open_late_weight"] = form.pop("late_weight")
+    form["mode"] = mode
+    return form
+
+
+def run_size(interface, client, corpus, cases, engine, repeat):
+    """Run the KB-dependent cases against the currently loaded knowledge base."""
+    queries = corpus["queries"]
+    results = {}
+    if "strict" in cases:
+        results["strict"] = time_calls(lambda q: interface.run_strict_query(q, engine), queries, repeat)
+    if "fallback" in cases:
+        results["fallback"] = time_calls(lambda q: interface.run_fallback_query(q, engine), queries, repeat)
+    if "compute_match_info" in cases:
+        rows = []
+        for query in queries:
+            raw = interface.run_fallback_query(query, engine)
+            rows += [row[4] for row in raw[0]["Results"]] if raw else []
+        results["compute_match_info"] = time_calls(interface.compute_match_info, rows, repeat)
+    if "nearby" in cases:
+        results["nearby"] = time_calls(lambda p: interface.nearest_spots(*p), corpus["points"], repeat)
+    if "flask_search" in cases:
+        forms = [_form(q, mode) for q, mode in zip(queries, ("fallback", "strict") * len(queries))]
+        results["flask_search"] = time_calls(lambda f: client.post("/search", data=f), forms, repeat)
+    return results
+
+
+def run_benchmarks(sizes=(20, 1000, 10000), cases=CASES, engine=None, corpus_size=200,
+                   seed=42, repeat=1, use_cache=False, synthetic=False):
+    """
+    Run the benchmark cases over a fixed corpus and several KB sizes.
+
+    Parameters
+    ----------
+    sizes : sequence of int
+        Knowledge base sizes (number of spots) to benchmark.
+    cases : sequence of str
+        Cases to run, from CASES.
+    engine : str, optional
+        "prolog" or "python"; defaults to interface.ENGINE.
+    corpus_size : int
+        Number of queries and texts in the corpus.
+    seed : int
+        Corpus seed.
+    repeat : int
+        Passes over the corpus per case.
+    use_cache : bool
+        Keep the query result caches on; off by default so every call reaches the engine.
+    synthetic : bool
+        Benchmark KBs from kb_generator (seeded with `seed`) instead of scaled copies of the shipped KB.
+
+    Returns
+    -------
+    dict
+        {"meta": {...}, "parse_preferences": {...}, "sizes": {size: {case: summary}}}.
+    """
+    import interface
+    from natural_language_parser import parse_preferences
+
+    engine = engine or interface.ENGINE
+    corpus = build_corpus(corpus_size, seed)
+    if not use_cache:
+        interface.strict_cache.maxsize = 0
+        interface.fallback_cache.maxsize = 0
+
+    client = None
+    if "flask_search" in cases:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+        import index
+        interface.ENGINE = engine
+        client = index.app.test_client()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": engine,
+            "seed": seed,
+            "corpus_size": corpus_size,
+            "repeat": repeat,
+            "cache": use_cache,
+            "kb": "synthetic" if synthetic else "scaled",
+        },
+        "sizes": {},
+    }
+    if "parse_preferences" in cases:
+        report["parse_preferences"] = time_calls(parse_preferences, corpus["texts"], repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for size in sizes:
+                path = os.path.join(tmp, f"kb_{size}.pl")
+                if synthetic:
+                    from kb_generator import generate_kb
+                    generate_kb(path, size, seed)
+                else:
+                    scale_kb(size, path)
+                interface.load_kb(path)
+                report["sizes"][str(size)] = run_size(interface, client, corpus, cases, engine, repeat)
+        finally:
+            interface.load_kb(KB_PATH)
+    return report
+
+
+def _git_commit():
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(report):
+    """Map "size/case" (or "parse_preferences") to its summary."""
+    flat = {}
+    if "parse_preferences" in report:
+        flat["parse_preferences"] = report["parse_preferences"]
+    for size, cases in report.get("sizes", {}).items():
+        for case, summary in cases.items():
+            flat[f"{size}/{case}"] = summary
+    return flat
+
+
+def compare(current, baseline, metric="p50_ms", tolerance=0.10):
+    """
+    Compare a run against a baseline run.
+
+    Parameters
+    ----------
+    current, baseline : dict
+        Reports from run_benchmarks.
+    metric : str
+        Latency metric to compare.
+    tolerance : float
+        Relative slowdown allowed before a case counts as a regression.
+
+    Returns
+    -------
+    list of dict
+        One row per case present in both runs: case, baseline, current,
+        ratio (current / baseline) and status ("faster", "slower" or "same").
+    """
+    rows = []
+    old, new = _flatten(baseline), _flatten(current)
+    for case in new:
+        if case not in old:
+            continue
+        before, after = old[case][metric], new[case][metric]
+        ratio = after / before if before else float("inf")
+        status = "slower" if ratio > 1 + tolerance else "faster" if ratio < 1 - tolerance else "same"
+        rows.append({"case": case, "baseline": before, "current": after, "ratio": ratio, "status": status})
+    return rows
+
+
+def print_report(report, comparison=None):
+    """Print a human-readable table of a report (and its baseline comparison) to stderr."""
+    print(f"{'Case':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}", file=sys.stderr)
+    for case, summary in _flatten(report).items():
+        print(f"{case:<32}{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}"
+              f"{summary['p99_ms']:>10.3f}{summary['throughput_per_s']:>12.1f}", file=sys.stderr)
+    if comparison:
+        print(f"\n{'Case':<32}{'baseline':>10}{'current':>10}{'ratio':>8}  status", file=sys.stderr)
+        for row in comparison:
+            print(f"{row['case']:<32}{row['baseline']:>10.3f}{row['current']:>10.3f}"
+                  f"{row['ratio']:>8.2f}  {row['status']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the study spot recommendation hot paths")
+    parser.add_argument("--sizes", default="20,1000,10000", help="comma-separated KB sizes (spots)")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases to run")
+    parser.add_argument("--engine", choices=("prolog", "python"), help="recommendation engine")
+    parser.add_argument("--corpus-size", type=int, default=200, help="queries in the fixed corpus")
+    parser.add_argument("--seed", type=int, default=42, help="corpus seed")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus per case")
+    parser.add_argument("--cache", action="store_true", help="keep the query result caches on")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use kb_generator KBs instead of scaled copies of study_system.pl")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--metric", default="p50_ms", help="metric compared against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if any case is slower than the baseline")
+    args = parser.parse_args()
+
+    unknown = set(args.cases.split(",")) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        cases=args.cases.split(","),
+        engine=args.engine,
+        corpus_size=args.corpus_size,
+        seed=args.seed,
+        repeat=args.repeat,
+        use_cache=args.cache,
+        synthetic=args.synthetic,
+    )
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            comparison = compare(report, json.load(baseline_file), args.metric, args.tolerance)
+        report["comparison"] = comparison
+
+    print_report(report, comparison)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(output + "\n")
+    else:
+        print(output)
+
+    if args.fail_on_regression and comparison and any(row["status"] == "slower" for row in comparison):
+        sys.exit(1)
@@ -0,0 +1,176 @@
+"""
+Fallback Explanation Builder
+----------------------------
+Builds the per-spot explanation strings produced by score_spot/20 in
+study_system.pl, so that Python-side engines return exactly the same text as
+the Prolog fallback mode.
+
+"""
+
+# Attributes in the order score_spot/20 evaluates them
+ATTRIBUTES = ("travel", "work", "outlet", "vibe", "seating", "price", "late")
+
+# Per-attribute match states
+MATCHED = 1
+MISSED = 0
+SKIPPED = -1
+
+# Match state atoms returned by ranked_study_spots/18
+STATE_CODES = {"matched": MATCHED, "missed": MISSED, "skipped": SKIPPED}
+
+# attribute -> (short label, long matched, long missed, long skipped)
+_MESSAGES = {
+    "travel": ("travel", "Matched travel time. ", "Did not match travel time. ", None),
+    "work": ("work type", "Matched work type preferences. ",
+             "Did not match work type preferences. ", "No work type preference. "),
+    "outlet": ("outlet preference", "Matched outlets preferences. ",
+               "Did not match outlet preferences. ", "No outlet preference. "),
+    "vibe": ("vibe preference", "Matched vibe preferences. ",
+             "Did not match vibe preferences. ", "No vibe preference. "),
+    "seating": ("seating preference", "Matched seating preferences. ",
+                "Did not match seating preferences. ", "No seating preference. "),
+    "price": ("price preference", "Matched price preferences. ",
+              "Did not match price preferences. ", "No price preference. "),
+    "late": ("opening time preference", "Matched opening time preferences. ",
+             "Did not match opening time preferences. ", "No opening time preference. "),
+}
+
+
+def explanation_message(attribute, state, explain_mode):
+    """
+    Return the explanation fragment for one attribute.
+
+    Parameters
+    ----------
+    attribute : str
+        One of ATTRIBUTES.
+    state : int
+        MATCHED, MISSED or SKIPPED.
+    explain_mode : str
+        'short' for ✔/✘ fragments, anything else for full sentences.
+
+    Returns
+    -------
+    str
+        The fragment, including its trailing ". ".
+    """
+    label, matched, missed, skipped = _MESSAGES[attribute]
+    if explain_mode == "short":
+        mark = "✘" if state == MISSED else "✔"
+        return f"{mark} {label}. "
+    if state == MATCHED:
+        return matched
+    if state == SKIPPED and skipped is not None:
+        return skipped
+    return missed
+
+
+def build_explanation(states, explain_mode):
+    """
+    Build the full explanation string for one spot.
+
+    Parameters
+    ----------
+    states : sequence of int
+        One match state per attribute, in ATTRIBUTES order.
+    explain_mode : str
+        'short' or 'long'.
+
+    Returns
+    -------
+    str
+        The fragments joined with a single space, as atomic_list_concat/3 does in Prolog.
+    """
+    return " ".join(
+        explanation_message(attribute, int(state), explain_mode)
+        for attribute, state in zip(ATTRIBUTES, states)
+    )
+
+
+
+def _sentence_states():
+    """Map every explanation sentence (without its full stop) to (attribute, state), or None if ambiguous."""
+    sentences = {}
+    for attribute in ATTRIBUTES:
+        # An attribute without a skipped message (travel) is never skipped
+        states = (MATCHED, MISSED, SKIPPED) if _MESSAGES[attribute][3] is not None else (MATCHED, MISSED)
+        for state in states:
+            for explain_mode in ("long", "short"):
+                sentence = explanation_message(attribute, state, explain_mode).strip().rstrip(".")
+                # Short explanations mark skipped preferences with ✔ too, so "✔" sentences
+                # cannot tell matched from skipped
+                if sentences.setdefault(sentence, (attribute, state)) != (attribute, state):
+                    sentences[sentence] = None
+    return sentences
+
+
+_SENTENCES = _sentence_states()
+
+
+def parse_explanation(text):
+    """
+    Recover the per-attribute match states from an explanation string.
+
+    The inverse of build_explanation, for explanations that were only kept as
+    text (e.g. in recommendation_log.csv).
+
+    Parameters
+    ----------
+    text : str
+        A long or short explanation.
+
+    Returns
+    -------
+    dict
+        attribute -> MATCHED, MISSED or SKIPPED for every attribute the text
+        mentions. Sentences that are not explanation fragments are ignored, and
+        so are short-mode "✔" sentences, which read the same whether the
+        preference was matched or skipped.
+    """
+    states = {}
+    for sentence in text.split("."):
+        match = _SENTENCES.get(sentence.strip())
+        if match is not None:
+            states[match[0]] = match[1]
+    return states
+
+
+def format_states(states):
+    """
+    Write a match state vector as text, e.g. "1 0 -1 1 1 1 0".
+
+    Parameters
+    ----------
+    states : sequence of int
+        One state per attribute, in ATTRIBUTES order.
+
+    Returns
+    -------
+    str
+    """
+    return " ".join(str(int(state)) for state in states)
+
+
+def parse_states(text):
+    """
+    Read a match state vector written by format_states.
+
+    Parameters
+    ----------
+    text : str
+        Space-separated states in ATTRIBUTES order.
+
+    Returns
+    -------
+    dict
+        attribute -> MATCHED, MISSED or SKIPPED.
+
+    Raises
+    ------
+    ValueError
+        If the text is not one valid state per attribute.
+    """
+    states = [int(state) for state in text.split()]
+    if len(states) != len(ATTRIBUTES) or not set(states) <= {MATCHED, MISSED, SKIPPED}:
+        raise ValueError(f"Not a match state vector: {text!r}")
+    return dict(zip(ATTRIBUTES, states))
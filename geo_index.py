@@ -0,0 +1,289 @@
+"""
+Spatial Index
+-------------
+A uniform grid over spot coordinates (location/3) for radius and nearest-spot
+queries without scanning every spot.
+
+Coordinates are projected onto a local plane in metres (equirectangular around
+the mean latitude, accurate to well under 1% across Seoul) and bucketed into
+square cells. A radius query only visits the cells that overlap the circle and
+measures exact great-circle distances for the spots in them, so its cost grows
+with the number of nearby spots rather than with the size of the knowledge base.
+A k-nearest query searches rings of cells outwards from the query point until
+no unvisited cell can hold a closer spot; once the rings would cover more
+cells than are occupied (a query far from every spot), the spots left are
+measured in one vectorized pass instead.
+
+Spot indices follow study_spot/1 order, like the other Python-side engines.
+
+"""
+
+import math
+
+import numpy as np
+
+from knowledge_base import KB_PATH, load_spots
+
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CELL_M = 500
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in metres; works elementwise on NumPy arrays.
+
+    Parameters
+    ----------
+    lat1, lon1, lat2, lon2 : float or np.ndarray
+        Coordinates in degrees.
+
+    Returns
+    -------
+    float or np.ndarray
+        Distance in metres.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """
+    Grid bucket index over the spots that have coordinates.
+
+    Attributes
+    ----------
+    lat, lon : np.ndarray
+        Coordinates per spot in degrees; NaN for spots without location/3.
+    cell_m : float
+        Cell edge length in metres.
+    cells : dict
+        (column, row) -> int array of spot indices in that cell.
+    """
+
+    def __init__(self, spots, cell_m=DEFAULT_CELL_M):
+        """
+        Bucket spot records by their coordinates.
+
+        Parameters
+        ----------
+        spots : list of dict
+            Spot records as returned by knowledge_base.load_spots.
+        cell_m : float
+            Cell edge length in metres; about the typical query radius works best.
+        """
+        lat = np.array([s["location"][0] if "location" in s else np.nan for s in spots], dtype=np.float64)
+        lon = np.array([s["location"][1] if "location" in s else np.nan for s in spots], dtype=np.float64)
+        self._build(lat, lon, cell_m)
+
+    def _build(self, lat, lon, cell_m):
+        """Bucket coordinate arrays (NaN where a spot has no location) into cells."""
+        self.size = len(lat)
+        self.cell_m = float(cell_m)
+        self.lat = lat
+        self.lon = lon
+
+        located = np.flatnonzero(~np.isnan(self.lat))
+        self._lat0 = float(np.mean(self.lat[located])) if len(located) else 0.0
+        self._cos_lat0 = math.cos(math.radians(self._lat0))
+
+        self.cells = {}
+        self._bounds = (0, -1, 0, -1)
+        self._located = located
+        self._columns = self._rows = np.empty(0, dtype=np.int64)
+        if len(located):
+            columns, rows = self._cell(self.lat[located], self.lon[located])
+            self._columns, self._rows = columns, rows
+            buckets = {}
+            for index, key in zip(located.tolist(), zip(columns.tolist(), rows.tolist())):
+                buckets.setdefault(key, []).append(index)
+            self.cells = {key: np.array(indices, dtype=np.intp) for key, indices in buckets.items()}
+            self._bounds = (int(columns.min()), int(columns.max()), int(rows.min()), int(rows.max()))
+
+    @classmethod
+    def from_kb(cls, path=KB_PATH, cell_m=DEFAULT_CELL_M):
+        """
+        Load a knowledge base file and index its spot coordinates.
+
+        Parameters
+        ----------
+        path : str
+            Path to the Prolog knowledge base.
+        cell_m : float
+            Cell edge length in metres.
+
+        Returns
+        -------
+        SpatialIndex
+        """
+        return cls(load_spots(path), cell_m)
+
+    @classmethod
+    def from_columns(cls, columns, cell_m=DEFAULT_CELL_M):
+        """
+        Index the coordinate columns of a memory-mapped columnar snapshot.
+
+        Parameters
+        ----------
+        columns : kb_columns.KBColumns
+            An open snapshot.
+        cell_m : float
+            Cell edge length in metres.
+
+        Returns
+        -------
+        SpatialIndex
+        """
+        index = cls.__new__(cls)
+        index._build(columns.column("lat"), columns.column("lon"), cell_m)
+        return index
+
+    def __len__(self):
+        return self.size
+
+    def _cell(self, lat, lon):
+        """Project coordinates onto the local plane and return their cell columns and rows."""
+        x = np.radians(lon) * EARTH_RADIUS_M * self._cos_lat0
+        y = np.radians(np.asarray(lat) - self._lat0) * EARTH_RADIUS_M
+        return np.floor(x / self.cell_m).astype(np.int64), np.floor(y / self.cell_m).astype(np.int64)
+
+    def _ring(self, column, row, radius):
+        """Yield the spot index arrays of the cells exactly `radius` cells away (Chebyshev)."""
+        if radius == 0:
+            border = [(column, row)]
+        else:
+            border = [(column + dx, row + dy) for dx in range(-radius, radius + 1) for dy in (-radius, radius)]
+            border += [(column + dx, row + dy) for dx in (-radius, radius) for dy in range(-radius + 1, radius)]
+        for key in border:
+            indices = self.cells.get(key)
+            if indices is not None:
+                yield indices
+
+    def within(self, lat, lon, radius_m):
+        """
+        Find every spot within a radius of a point.
+
+        Parameters
+        ----------
+        lat, lon : float
+            Query point in degrees.
+        radius_m : float
+            Search radius in metres.
+
+        Returns
+        -------
+        list of tuple
+            (spot index, distance in metres), nearest first.
+        """
+        columns, rows = self._cell(lat, lon)
+        column, row = int(columns), int(rows)
+        # The projection can be off by a fraction of a percent; search one metre
+        # per kilometre wider and let the exact distances decide
+        reach = int(math.ceil(radius_m * 1.001 / self.cell_m)) + 1
+        if (2 * reach + 1) ** 2 > len(self.cells):
+            # The circle covers more cells than are occupied: walk the occupied ones
+            candidates = [
+                indices for (c, r), indices in self.cells.items()
+                if abs(c - column) <= reach and abs(r - row) <= reach
+            ]
+        else:
+            candidates = [
+                indices
+                for dx in range(-reach, reach + 1)
+                for dy in range(-reach, reach + 1)
+                for indices in (self.cells.get((column + dx, row + dy)),)
+                if indices is not None
+            ]
+        if not candidates:
+            return []
+        candidates = np.concatenate(candidates)
+        distances = haversine_m(lat, lon, self.lat[candidates], self.lon[candidates])
+        keep = distances <= radius_m
+        candidates, distances = candidates[keep], distances[keep]
+        order = np.lexsort((candidates, distances))
+        return [(int(candidates[i]), float(distances[i])) for i in order]
+
+    def nearest(self, lat, lon, k=5, max_radius_m=None):
+        """
+        Find the k spots nearest to a point.
+
+        Parameters
+        ----------
+        lat, lon : float
+            Query point in degrees.
+        k : int
+            Number of spots to return.
+        max_radius_m : float, optional
+            Ignore spots further away than this.
+
+        Returns
+        -------
+        list of tuple
+            Up to k (spot index, distance in metres), nearest first.
+        """
+        if k <= 0 or not self.cells:
+            return []
+        columns, rows = self._cell(lat, lon)
+        column, row = int(columns), int(rows)
+        min_column, max_column, min_row, max_row = self._bounds
+        max_ring = max(column - min_column, max_column - column, row - min_row, max_row - row, 0)
+        if max_radius_m is not None:
+            max_ring = min(max_ring, int(math.ceil(max_radius_m * 1.001 / self.cell_m)) + 1)
+
+        found_indices, found_distances = [], []
+        found = 0
+        for radius in range(max_ring + 1):
+            if (2 * radius + 1) ** 2 > len(self.cells):
+                # Wider rings would visit more cells than are occupied: measure
+                # every spot not collected yet, i.e. `radius` or more cells away
+                rest = np.maximum(np.abs(self._columns - column), np.abs(self._rows - row)) >= radius
+                indices = self._located[rest]
+                found_indices.append(indices)
+                found_distances.append(haversine_m(lat, lon, self.lat[indices], self.lon[indices]))
+                break
+            for indices in self._ring(column, row, radius):
+                found_indices.append(indices)
+                found_distances.append(haversine_m(lat, lon, self.lat[indices], self.lon[indices]))
+                found += len(indices)
+            if found == len(self._located):
+                break
+            # Every spot in a ring further out is at least `radius` cells away
+            if found >= k:
+                kth = np.partition(np.concatenate(found_distances), k - 1)[k - 1]
+                if kth <= radius * self.cell_m * 0.999:
+                    break
+
+        if not found_indices:
+            return []
+        candidates = np.concatenate(found_indices)
+        distances = np.concatenate(found_distances)
+        if max_radius_m is not None:
+            keep = distances <= max_radius_m
+            candidates, distances = candidates[keep], distances[keep]
+        if len(distances) > k:
+            # Keep the k nearest (and anything tied with the k-th) before sorting
+            keep = distances <= np.partition(distances, k - 1)[k - 1]
+            candidates, distances = candidates[keep], distances[keep]
+        order = np.lexsort((candidates, distances))[:k]
+        return [(int(candidates[i]), float(distances[i])) for i in order]
+
+    def candidates(self, lat, lon, radius_m):
+        """
+        Return the indices of the spots within a radius, in index order.
+
+        Used as a pre-filter so engines only score spots near the query point.
+
+        Parameters
+        ----------
+        lat, lon : float
+            Query point in degrees.
+        radius_m : float
+            Search radius in metres.
+
+        Returns
+        -------
+        np.ndarray
+            Sorted spot indices.
+        """
+        return np.array(sorted(i for i, _ in self.within(lat, lon, radius_m)), dtype=np.intp)
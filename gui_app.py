@@ -1,3 +1,4 @@
+import argparse
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
 from natural_language_parser import parse_preferences
@@ -158,7 +159,7 @@ class StudySpotGUI:
         """
         Prompts the user to provide their location and the maximum time they are willing to travel.
 
-        Collects origin (sinseol/dongdaemun) and max_minutes as numerical input.
+        Collects origin (one of interface.travel_origins()) and max_minutes as numerical input.
         """
         self.clear_root()
         self.answers = {}
@@ -166,7 +167,7 @@ class StudySpotGUI:
         # Origin question
         tk.Label(
             self.root,
-            text="Where are you coming from? (Sinseol/Dongdaemun)",
+            text=f"Where are you coming from? ({interface.origin_names()})",
             font=("Arial", 13)
         ).pack(pady=10)
 
@@ -194,12 +195,12 @@ class StudySpotGUI:
         Stores the user's origin and maximum travel time.
 
         Validates:
-        - Origin must be 'sinseol' or 'dongdaemun'
+        - Origin must be one of interface.travel_origins()
         - Max travel time must be a positive integer
 
         If valid, proceeds to explanation style and recommendation mode selection.
         """
-        origin = self.origin_entry.get().strip().lower()
+        origin = self.origin_entry.get().strip().lower().replace(" ", "_")
 
         try:
             max_minutes = int(self.time_entry.get().strip())
@@ -208,7 +209,7 @@ class StudySpotGUI:
             return
 
         # Validate origin and travel time
-        if origin not in ["sinseol", "dongdaemun"] or max_minutes <= 0:
+        if origin not in interface.travel_origins() or max_minutes <= 0:
             messagebox.showerror("Error", "Invalid input.")
             return
 
@@ -346,7 +347,7 @@ class StudySpotGUI:
         self.clear_root()
         self.guided_inputs = {}
         self.guided_questions = [
-            ("origin", "Where are you coming from?", ["sinseol", "dongdaemun"]),
+            ("origin", "Where are you coming from?", list(interface.travel_origins())),
             ("max_minutes", "Max travel time in minutes? (e.g., 10, 15, 20)", None),
             ("work_type", "What kind of work?", ["deep_focus", "casual", "group", "skip"]),
             ("outlet_pref", "Power outlet availability?", ["no", "yes", "limited", "skip"]),
@@ -598,9 +599,11 @@ class StudySpotGUI:
                 self.guided_inputs["mode"] = "fallback"
                 self.show_guided_results()
                 return
+            interface.log_recommendations(self.guided_inputs, results)
             self.display_strict_results(results)
         else:
             results = interface.run_fallback_query(self.guided_inputs)
+            interface.log_recommendations(self.guided_inputs, results)
             result_list = results[0]["Results"] if results else []
             self.display_fallback_results(result_list)
 
@@ -621,9 +624,11 @@ class StudySpotGUI:
                 messagebox.showinfo("No Matches", "No exact matches found. Switching to fallback.")
                 self.show_results()
                 return
+            interface.log_recommendations(self.user_prefs, results)
             self.display_strict_results(results)
         else:
             results = interface.run_fallback_query(self.user_prefs)
+            interface.log_recommendations(self.user_prefs, results)
             result_list = results[0]["Results"] if results else []
             self.display_fallback_results(result_list)
     
@@ -661,8 +666,8 @@ class StudySpotGUI:
         tk.Label(scrollable_frame, text=f"🧭 Mode: {mode_label} Matching", font=("Arial", 12, "italic")).pack(pady=(5, 0))
         tk.Label(scrollable_frame, text="📍 Here are your top study spot recommendations:", font=("Arial", 14, "bold")).pack(pady=10)
 
-        for i, (score, name, link, explanation) in enumerate(results, 1):
-            match_info, skipped, match_bar = interface.compute_match_info(prefs, score, explanation)
+        for i, (score, name, link, explanation, matches) in enumerate(results, 1):
+            match_info, skipped, match_bar = interface.compute_match_info(matches)
             bar_visual = "█" * match_bar.count("✔") + "░" * (len(match_bar) - match_bar.count("✔"))
 
             star = "🌟" if i == 1 else ""
@@ -725,6 +730,13 @@ if __name__ == "__main__":
     """
     Entry point for the Seoul Study Spot Finder GUI.
     """
+    parser = argparse.ArgumentParser(description="Seoul Study Spot Finder GUI")
+    parser.add_argument("--engine", choices=interface.ENGINES, default=interface.ENGINE,
+                        help="recommendation engine for strict and fallback queries")
+    interface.ENGINE = parser.parse_args().engine
+    if interface.KB_WATCH_INTERVAL > 0:
+        interface.watch_kb(interface.KB_WATCH_INTERVAL)
+
     root = tk.Tk()
     app = StudySpotGUI(root)
     root.mainloop()
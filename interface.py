@@ -10,25 +10,638 @@ Key Features:
 - Guided CLI form with validation and suggestions
 - Strict and fallback recommendation modes
 - Interactive output with rich formatting (Colorama)
+- Selectable engine: Prolog rules, or the vectorized NumPy scorer and strict bitset index
+- LRU caching of query results, invalidated when the knowledge base changes
+- Inputs validated before any engine call; Prolog goals built from bound arguments
+- Match bars computed from the per-attribute match vector returned with each result
+- Optional exact travel times from any subway station via the transit graph
+- Radius pre-filter and nearest-spot queries on a spatial index of spot coordinates
+- Hot reload of knowledge base edits by fact diffing, without a restart
+- Optional SQLite knowledge store shared on disk between processes
+- Python engines mapped from a columnar KB snapshot when one is fresh
+- Every recommendation shown is logged to recommendation_log.csv in the background
+- Stage latency histograms and cache gauges for the /metrics endpoints (metrics.py)
+- Opt-in Prolog profiling of every query (--profile or STUDY_PROLOG_PROFILE=1)
+- Lazy startup: the Prolog engine and the knowledge base load on the first
+  query that needs them, so importing this module stays fast (startup_report.py)
 
 """
 
 
 
+import argparse
 import csv
+import os
+import threading
 from datetime import datetime
-from pyswip import Prolog
-from colorama import Fore, Style, init
 from natural_language_parser import parse_preferences
+from knowledge_base import KB_PATH, ORIGINS, load_spots
+from kb_compiler import consult_kb
+from result_cache import LRUCache, kb_content_hash, query_key
+from kb_reload import KBSnapshot, KBWatcher, ReadWriteLock, diff_facts, update_goal
+import metrics
+import prolog_profile
+import query_builder
+from query_builder import Goal, fallback_goal, strict_goal
+from explanations import MATCHED, MISSED, SKIPPED, STATE_CODES
+
+
+# Terminal colors (colorama), imported and initialized by _init_colors on first output
+Fore = Style = None
+
+# Recommendation engines: "prolog" runs the rules in study_system.pl,
+# "python" answers from the same facts with the vectorized NumPy scorer
+# (fallback) and the bitset index (strict), "sqlite" queries the on-disk
+# knowledge store written by kb_store.py
+ENGINES = ("prolog", "python", "sqlite")
+ENGINE = os.environ.get("STUDY_SPOT_ENGINE", "prolog")
+
+# Database used by the "sqlite" engine (default: study_system.db)
+SQLITE_PATH = os.environ.get("STUDY_SQLITE_PATH")
+
+# Travel times: "bands" uses the travel/3 bands for the two residences,
+# "graph" uses exact minutes from any station of the transit graph
+# (transit_graph.py); graph queries are answered by the Python engines
+TRAVEL_MODES = ("bands", "graph")
+TRAVEL_MODE = os.environ.get("STUDY_TRAVEL_MODE", "bands")
+
+# Match bar icon for each per-attribute match state
+_MATCH_ICONS = {MATCHED: "✔", MISSED: "✘", SKIPPED: "➖"}
+
+# Python-side engines, built from the knowledge base on first use
+_vector_scorer = None
+_strict_index = None
+_travel_matrix = None
+_spatial_index = None
+_kb_store = None
+
+# Columnar snapshot of the loaded KB (kb_columns.py): False until looked for,
+# then the mapped KBColumns, or None when there is no fresh one
+_kb_columns = False
+# Set STUDY_KB_COLUMNS=0 to always build the Python engines from the source
+USE_KB_COLUMNS = os.environ.get("STUDY_KB_COLUMNS", "1") != "0"
+
+# In-process Prolog engine (pyswip), created and loaded with the KB by get_prolog on first use
+prolog = None
+_prolog_lock = threading.Lock()
+_profile_prolog = prolog_profile.ENABLED
+
+# Path, content hash and fact snapshot of the loaded knowledge base; results are
+# cached per KB version, which is hashed on first use
+_kb_path = KB_PATH
+_kb_version = None
+_kb_snapshot = None
+CACHE_SIZE = int(os.environ.get("STUDY_CACHE_SIZE", "1024"))
+strict_cache = LRUCache(CACHE_SIZE)
+fallback_cache = LRUCache(CACHE_SIZE)
+
+# Queries hold the read side; loading or reloading the knowledge base holds the
+# write side, so no query ever sees a half-applied update
+_kb_lock = ReadWriteLock()
+
+# Poll the knowledge base file for edits every STUDY_KB_WATCH seconds (0 = off)
+KB_WATCH_INTERVAL = float(os.environ.get("STUDY_KB_WATCH", "0"))
+_kb_watcher = None
+
+# Recommendation log (recommendation_log.py); STUDY_LOG=0 turns it off
+LOG_ENABLED = os.environ.get("STUDY_LOG", "1") != "0"
+LOG_PATH = os.environ.get("STUDY_LOG_PATH")
+LOG_MAX_BYTES = int(os.environ.get("STUDY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = float(os.environ.get("STUDY_LOG_ROTATE_SECONDS", "0"))
+LOG_BACKUPS = int(os.environ.get("STUDY_LOG_BACKUPS", "5"))
+LOG_QUEUE_SIZE = int(os.environ.get("STUDY_LOG_QUEUE", "10000"))
+_recommendation_log = None
+_recommendation_log_lock = threading.Lock()
+
+
+def _init_colors():
+    """Import colorama and turn on color resets, once, before the first colored output."""
+    global Fore, Style
+    if Fore is None:
+        from colorama import Fore, Style, init
+        init(autoreset=True)
+
+
+def load_kb(path=KB_PATH):
+    """
+    Load the knowledge base into the Prolog engines and reset everything derived from it.
+
+    Every started engine of an attached pool consults the file first, and
+    engines the pool starts later load it; if a pooled engine fails to load it,
+    the pool is put back on the loaded file and the error is raised with
+    nothing else changed. An in-process engine that has not been created yet
+    loads the new path when it is (see get_prolog). The Python-side engines are rebuilt on next use
+    (from the columnar snapshot if one matches the new KB), and the result
+    caches are cleared on their next lookup because the KB version changes. The fact snapshot that hot reload
+    diffs against is only taken when the file is watched.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog knowledge base.
+    """
+    global _vector_scorer, _strict_index, _travel_matrix, _spatial_index, _kb_columns
+    global _kb_path, _kb_version, _kb_snapshot
+    with _kb_lock.writing(), _prolog_lock:
+        if _engine_pool is not None:
+            _consult_pool(path)
+        if prolog is not None:
+            consult_kb(prolog, path)
+        _vector_scorer = None
+        _strict_index = None
+        _travel_matrix = None
+        _spatial_index = None
+        _kb_columns = False
+        _kb_path = path
+        _kb_version = kb_content_hash(path)
+        _kb_snapshot = KBSnapshot.from_file(path) if _kb_watcher is not None or KB_WATCH_INTERVAL > 0 else None
+
+
+def _consult_pool(path):
+    """Make every engine of the attached pool consult path, restoring the loaded file if one fails."""
+    from prolog_pool import EngineError
+    try:
+        _engine_pool.broadcast(Goal("consult", (os.path.abspath(path),), ()))
+    except EngineError:
+        # Some engines may have loaded the new file already
+        _engine_pool.broadcast(Goal("consult", (os.path.abspath(_kb_path),), ()))
+        raise
+    _engine_pool.kb_path = path
+
+
+def reload_kb():
+    """
+    Apply edits to the loaded knowledge base file without restarting.
+
+    The file's facts are diffed against the loaded ones and only the changed
+    facts are retracted and asserted, in every pooled engine and then in the
+    in-process engine; a change to anything but facts re-consults the file. If
+    an engine fails to apply the diff, every engine re-consults the file
+    instead; if that fails too, the error is raised and the next reload
+    re-consults. The Python-side engines that are in use are rebuilt first,
+    while queries keep running on the old ones, then everything is swapped in
+    together with the new KB version (which clears the result caches) while no
+    query is running. An in-process engine that has not been created yet loads
+    the file when it is. Without a fact snapshot of the loaded file (it was not
+    being watched), the file is re-consulted.
+
+    Returns
+    -------
+    dict
+        {"retracted": n, "asserted": n, "reconsulted": bool}.
+    """
+    global _vector_scorer, _strict_index, _travel_matrix, _spatial_index, _kb_columns, _kb_version, _kb_snapshot
+    path = _kb_path
+    loaded_version = kb_version()
+    snapshot = KBSnapshot.from_file(path)
+    version = kb_content_hash(path)
+    if _kb_snapshot is None:
+        retracts, asserts, reconsult = [], [], version != loaded_version
+    else:
+        retracts, asserts = diff_facts(_kb_snapshot, snapshot)
+        reconsult = snapshot.rules_hash != _kb_snapshot.rules_hash
+    summary = {"retracted": len(retracts), "asserted": len(asserts), "reconsulted": reconsult}
+    if not (reconsult or retracts or asserts):
+        return summary
+
+    from scoring_engine import VectorizedScorer
+    from strict_index import StrictIndex
+    from geo_index import SpatialIndex
+    from prolog_pool import EngineError, PoolTimeout
+    spots = load_spots(path)
+    scorer = VectorizedScorer(spots) if _vector_scorer is not None else None
+    index = StrictIndex(spots) if _strict_index is not None else None
+    spatial = SpatialIndex(spots) if _spatial_index is not None else None
+
+    consult_goal = Goal("consult", (os.path.abspath(path),), ())
+    with _kb_lock.writing(), _prolog_lock:
+        try:
+            # Pooled engines first: if any of them fails to apply the diff, the
+            # in-process engine is untouched and every engine re-consults instead
+            if _engine_pool is not None:
+                try:
+                    _engine_pool.broadcast(consult_goal if reconsult else update_goal(retracts, asserts))
+                except (PoolTimeout, EngineError):
+                    if reconsult:
+                        raise
+                    reconsult = summary["reconsulted"] = True
+                    _engine_pool.broadcast(consult_goal)
+            if prolog is not None:
+                if reconsult:
+                    consult_kb(prolog, path)
+                else:
+                    try:
+                        list(prolog.query(update_goal(retracts, asserts)))
+                    except Exception:
+                        reconsult = summary["reconsulted"] = True
+                        consult_kb(prolog, path)
+                        if _engine_pool is not None:
+                            _engine_pool.broadcast(consult_goal)
+        except Exception:
+            # Some engines may hold the new facts and some the old: drop the fact
+            # snapshot and keep the old version, so the next reload re-consults everywhere
+            _kb_snapshot = None
+            raise
+        _vector_scorer, _strict_index, _spatial_index = scorer, index, spatial
+        _travel_matrix = None
+        _kb_columns = None
+        _kb_version = version
+        _kb_snapshot = snapshot
+    return summary
+
+
+def _on_kb_change(path):
+    """KBWatcher callback: reload the knowledge base if the changed file is the loaded one."""
+    if os.path.abspath(path) != os.path.abspath(_kb_path):
+        return
+    summary = reload_kb()
+    how = "re-consulted" if summary["reconsulted"] else f"{summary['retracted']} retracted, {summary['asserted']} asserted"
+    print(f"🔄 Reloaded {os.path.basename(path)}: {how}")
+
+
+def watch_kb(interval=1.0):
+    """
+    Start watching the loaded knowledge base file and hot-reload it on every edit.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between polls of the file.
+
+    Returns
+    -------
+    kb_reload.KBWatcher
+        The running watcher; call stop() to end it.
+    """
+    global _kb_watcher, _kb_snapshot
+    if _kb_watcher is not None:
+        _kb_watcher.stop()
+    if _kb_snapshot is None:
+        _kb_snapshot = KBSnapshot.from_file(_kb_path)
+    _kb_watcher = KBWatcher(_kb_path, _on_kb_change, interval).start()
+    return _kb_watcher
+
+
+def kb_version():
+    """
+    Return the content hash of the loaded knowledge base.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest of the KB source that was loaded.
+    """
+    global _kb_version
+    if _kb_version is None:
+        _kb_version = kb_content_hash(_kb_path)
+    return _kb_version
+
+
+def get_recommendation_log():
+    """
+    Return the shared RecommendationLogger, starting its writer thread on first use.
+
+    Returns
+    -------
+    recommendation_log.RecommendationLogger
+        The logger writing to STUDY_LOG_PATH, or recommendation_log.csv by default.
+    """
+    global _recommendation_log
+    with _recommendation_log_lock:
+        if _recommendation_log is None:
+            from recommendation_log import LOG_PATH as DEFAULT_LOG_PATH, RecommendationLogger
+            _recommendation_log = RecommendationLogger(
+                LOG_PATH or DEFAULT_LOG_PATH, max_bytes=LOG_MAX_BYTES, rotate_seconds=LOG_ROTATE_SECONDS,
+                backups=LOG_BACKUPS, queue_size=LOG_QUEUE_SIZE,
+            )
+    return _recommendation_log
+
+
+def log_recommendations(user_inputs, results):
+    """
+    Queue the recommendations shown for one query for the recommendation log.
+
+    Returns immediately; rows are written by the logger's background thread.
+
+    Parameters
+    ----------
+    user_inputs : dict
+        The query's preferences, with "mode" set to the results' mode.
+    results : list
+        Results as returned by run_strict_query or run_fallback_query.
+    """
+    if LOG_ENABLED:
+        get_recommendation_log().log(user_inputs, results)
+
+
+def recommendation_log_stats():
+    """
+    Return the recommendation logger's counters, or an empty dict if nothing was logged yet.
+
+    Returns
+    -------
+    dict
+        As returned by RecommendationLogger.stats.
+    """
+    return _recommendation_log.stats() if _recommendation_log is not None else {}
+
+
+def cache_stats():
+    """
+    Return hit/miss/eviction counters for the strict and fallback result caches.
+
+    Returns
+    -------
+    dict
+        {"strict": {...}, "fallback": {...}} as returned by LRUCache.stats.
+    """
+    return {"strict": strict_cache.stats(), "fallback": fallback_cache.stats()}
+
+
+# Optional PrologEnginePool; when set, Prolog queries run on pooled engines
+_engine_pool = None
+
+
+def use_engine_pool(pool):
+    """
+    Route Prolog queries through a pool of engines instead of the in-process engine.
+
+    Parameters
+    ----------
+    pool : PrologEnginePool or None
+        The pool to use, or None to go back to the in-process engine.
+    """
+    global _engine_pool
+    _engine_pool = pool
+
+
+def get_prolog():
+    """
+    Return the in-process Prolog engine, creating it and loading the knowledge base on first use.
+
+    pyswip and the SWI-Prolog runtime are only loaded here, so processes that
+    never run a Prolog query in-process (Python or SQLite engine, engine pool,
+    --help) never pay for them. The precompiled study_system.qlf is used when
+    it is newer than the source.
+
+    Returns
+    -------
+    pyswip.Prolog
+        The engine, with the loaded knowledge base consulted.
+    """
+    global prolog
+    if prolog is None:
+        with _prolog_lock:
+            if prolog is None:
+                from pyswip import Prolog
+                engine = Prolog()
+                consult_kb(engine, _kb_path)
+                if _profile_prolog:
+                    prolog_profile.enable(engine)
+                prolog = engine
+    return prolog
+
+
+def _prolog_query(goal):
+    """Run a query_builder.Goal on the engine pool if one is set, else in-process."""
+    if _engine_pool is not None:
+        return _engine_pool.query(goal)
+    get_prolog()
+    return prolog_profile.run_goal(goal)
+
+
+def enable_profiling():
+    """
+    Profile every Prolog query of the in-process engine from now on.
+
+    An engine that has not been created yet is profiled from its first query.
+    Pooled engines are profiled when their pool is created with profile=True.
+    """
+    global _profile_prolog
+    with _prolog_lock:
+        _profile_prolog = True
+        if prolog is not None and not prolog_profile.is_enabled():
+            prolog_profile.enable(prolog)
+
+
+def profile_report(reset=False):
+    """
+    Return the Prolog query profile of the in-process engine and every pooled engine.
+
+    Parameters
+    ----------
+    reset : bool
+        Clear the collected data after reading it.
+
+    Returns
+    -------
+    dict
+        As returned by prolog_profile.merge_reports; "engines" is 0 when
+        profiling is off everywhere.
+    """
+    reports = [prolog_profile.report(reset)]
+    if _engine_pool is not None:
+        reports += _engine_pool.profile_reports(reset)
+    return prolog_profile.merge_reports(reports)
+
+
+
+def get_kb_columns():
+    """
+    Return the columnar snapshot of the loaded knowledge base, if there is a fresh one.
+
+    Returns
+    -------
+    kb_columns.KBColumns or None
+        The memory-mapped snapshot next to the KB file when it was built from
+        the loaded version, else None (the Python engines then parse the source).
+    """
+    global _kb_columns
+    if _kb_columns is False:
+        _kb_columns = None
+        if USE_KB_COLUMNS:
+            from kb_columns import KBColumns, columns_path
+            _kb_columns = KBColumns.open_fresh(columns_path(_kb_path), kb_version())
+    return _kb_columns
+
+
+def get_vector_scorer():
+    """
+    Return the shared VectorizedScorer, loading the knowledge base on first use.
+
+    Returns
+    -------
+    VectorizedScorer
+        The NumPy scoring engine for the consulted knowledge base.
+    """
+    global _vector_scorer
+    if _vector_scorer is None:
+        from scoring_engine import VectorizedScorer
+        columns = get_kb_columns()
+        _vector_scorer = VectorizedScorer.from_columns(columns) if columns is not None else VectorizedScorer.from_kb(_kb_path)
+    return _vector_scorer
 
 
+def get_strict_index():
+    """
+    Return the shared StrictIndex, loading the knowledge base on first use.
+
+    Returns
+    -------
+    StrictIndex
+        The bitset index for strict queries over the consulted knowledge base.
+    """
+    global _strict_index
+    if _strict_index is None:
+        from strict_index import StrictIndex
+        columns = get_kb_columns()
+        _strict_index = StrictIndex.from_columns(columns) if columns is not None else StrictIndex.from_kb(_kb_path)
+    return _strict_index
+
+
+def get_kb_store():
+    """
+    Return the shared SQLiteStore, opening it on first use.
+
+    Returns
+    -------
+    kb_store.SQLiteStore
+        The store at STUDY_SQLITE_PATH, or study_system.db by default.
+    """
+    global _kb_store
+    if _kb_store is None:
+        from kb_store import DB_PATH, SQLiteStore
+        _kb_store = SQLiteStore(SQLITE_PATH or DB_PATH)
+    return _kb_store
 
-# Enable color resets for terminal output (for consistent styling)
-init(autoreset=True)
 
-# Initialize and consult our expert system knowledge base
-prolog = Prolog()
-prolog.consult("study_system.pl")
+def _result_version(engine):
+    """Version tag for cached results: the KB hash, plus the database's for the sqlite engine."""
+    if engine == "sqlite":
+        return f"{kb_version()}:{get_kb_store().version()}"
+    return kb_version()
+
+
+def get_spatial_index():
+    """
+    Return the shared SpatialIndex, loading the knowledge base on first use.
+
+    Returns
+    -------
+    SpatialIndex
+        The grid index over spot coordinates of the consulted knowledge base.
+    """
+    global _spatial_index
+    if _spatial_index is None:
+        from geo_index import SpatialIndex
+        columns = get_kb_columns()
+        _spatial_index = SpatialIndex.from_columns(columns) if columns is not None else SpatialIndex.from_kb(_kb_path)
+    return _spatial_index
+
+
+def nearest_spots(lat, lon, k=5, radius_m=None):
+    """
+    Find the study spots nearest to a point.
+
+    Parameters
+    ----------
+    lat, lon : float or str
+        Query point in degrees.
+    k : int or str
+        Number of spots to return.
+    radius_m : float or str, optional
+        Only consider spots within this many metres.
+
+    Returns
+    -------
+    list of dict
+        Up to k {"Name": ..., "Link": ..., "Meters": ...} dicts, nearest first.
+
+    Raises
+    ------
+    query_builder.InvalidQuery
+        If the point, k or radius is not valid.
+    """
+    lat, lon, k, radius_m = query_builder.normalize_nearby(lat, lon, k, radius_m)
+    with _kb_lock.reading():
+        scorer = get_vector_scorer()
+        return [
+            {"Name": scorer.names[i], "Link": scorer.links[i], "Meters": round(meters)}
+            for i, meters in get_spatial_index().nearest(lat, lon, k, radius_m)
+        ]
+
+
+def get_travel_matrix():
+    """
+    Return the shared TravelMatrix, with one column per spot in knowledge base order.
+
+    The matrix is loaded from its memory-mapped cache, or built from the
+    transit graph if the graph or the spot list changed.
+
+    Returns
+    -------
+    transit_graph.TravelMatrix
+        Exact minutes from every station to every spot of the consulted knowledge base.
+    """
+    global _travel_matrix
+    if _travel_matrix is None:
+        from transit_graph import travel_matrix
+        _travel_matrix = travel_matrix(get_vector_scorer().keys)
+    return _travel_matrix
+
+
+def travel_origins():
+    """
+    Return the origins queries may start from under the current TRAVEL_MODE.
+
+    Returns
+    -------
+    tuple of str
+        The travel/3 residences, or every node of the transit graph in graph mode.
+    """
+    if TRAVEL_MODE == "graph":
+        return tuple(get_travel_matrix().origins)
+    return ORIGINS
+
+
+def origin_names(separator="/"):
+    """Return the current travel origins as prompt text, e.g. "Sinseol/Dongdaemun"."""
+    return separator.join(origin.replace("_", " ").title() for origin in travel_origins())
+
+
+def normalize_inputs(user_inputs, kind="fallback"):
+    """
+    Validate user inputs against the value sets and the current travel origins.
+
+    See query_builder.normalize_inputs. Inputs this already returned are passed
+    through as they are, so a request validated early (as the web endpoints do)
+    is not validated, or timed as query_build, a second time by the query.
+    """
+    if isinstance(user_inputs, query_builder.NormalizedInputs) and user_inputs.kind == kind:
+        return user_inputs
+    with metrics.timed("query_build"):
+        return query_builder.normalize_inputs(user_inputs, kind, travel_origins())
+
+
+def _query_engine(engine, user_inputs):
+    """Return the engine that will answer a query, and its cache key tag."""
+    # Exact travel times and coordinates are only known to the Python engines
+    if TRAVEL_MODE == "graph" or user_inputs.get("radius_m") is not None:
+        engine = "python"
+    engine = engine or ENGINE
+    return engine, f"{engine}:{TRAVEL_MODE}"
+
+
+def _candidates(user_inputs):
+    """Indices of the spots inside the query's search area, or None if it has none."""
+    if user_inputs.get("radius_m") is None:
+        return None
+    return get_spatial_index().candidates(user_inputs["lat"], user_inputs["lon"], user_inputs["radius_m"])
+
+
+def _travel_row(origin):
+    """Exact minutes from an origin to every spot in graph mode, else None."""
+    return get_travel_matrix().row(origin) if TRAVEL_MODE == "graph" else None
 
 
 def get_weights(attribute, value):
@@ -143,8 +756,8 @@ def get_user_input():
 
         # Get origin and travel time
         while True:
-            origin = input("\nWhere are you coming from? (Sinseol/Dongdaemun)\n> ").strip().lower()
-            if origin in ["sinseol", "dongdaemun"]:
+            origin = input(f"\nWhere are you coming from? ({origin_names()})\n> ").strip().lower().replace(" ", "_")
+            if origin in travel_origins():
                 break
             print("❌ Invalid input.")
         user_prefs["origin"] = origin
@@ -232,15 +845,15 @@ def full_guided_input():
     """
     # --- Origin selection ---
     while True:
-        origin = input("Where are you coming from? (Sinseol/Dongdaemun)\n").strip().lower()
-        if origin in ["sinseol", 'dongdaemun']:
+        origin = input(f"Where are you coming from? ({origin_names()})\n").strip().lower().replace(" ", "_")
+        if origin in travel_origins():
             if origin == "sinseol":
                 print("I hope you had some free coffee from B2 today")
-            else:
+            elif origin == "dongdaemun":
                 print("You should really try SorryNotSorry's Espresso")
             break
         else:
-            print("❌ Please enter 'Sinseol' or 'Dongdaemun' (Not case-sensitive).")
+            print(f"❌ Please enter one of: {origin_names(', ')} (Not case-sensitive).")
 
     # --- Max travel time ---
     comment_map = {
@@ -379,7 +992,7 @@ def full_guided_input():
     }
 
 
-def run_strict_query(user_inputs):
+def run_strict_query(user_inputs, engine=None):
     """
     Run a strict Prolog query that finds only study spots matching all user preferences exactly.
 
@@ -387,29 +1000,42 @@ def run_strict_query(user_inputs):
     ----------
     user_inputs : dict
         A dictionary containing user preferences such as location, travel time, and other attributes.
+    engine : str, optional
+        "prolog", "python" or "sqlite"; defaults to the module-level ENGINE. Graph
+        travel mode and queries with a search area (lat, lon, radius_m) always use "python".
 
     Returns
     -------
     list of dict
         A list of Prolog solutions (each with a study spot's name and link), or an empty list if no match is found.
+        Results are cached and shared between callers, so treat them as read-only.
+
+    Raises
+    ------
+    query_builder.InvalidQuery
+        If an input is outside the knowledge base's value sets.
     """
-    q = f"""
-        recommend_spot(
-            '{user_inputs["origin"]}',
-            {user_inputs["max_minutes"]},
-            '{user_inputs['work_type']}',
-            '{user_inputs['outlet_pref']}',
-            '{user_inputs['vibe_pref']}',
-            '{user_inputs['seating_pref']}',
-            '{user_inputs['price_pref']}',
-            '{user_inputs['open_late']}',
-            Name, Link)
-    """
+    with _kb_lock.reading():
+        user_inputs = normalize_inputs(user_inputs, "strict")
+        engine, tag = _query_engine(engine, user_inputs)
+        key = query_key("strict", tag, user_inputs)
+        return strict_cache.get_or_compute(key, lambda: _strict_query(user_inputs, engine), _result_version(engine))
+
+
+@metrics.timed("strict_engine")
+def _strict_query(user_inputs, engine):
+    """Run an uncached strict query on the given engine."""
+    if engine == "sqlite":
+        return get_kb_store().recommend_spot(user_inputs)
+    if engine == "python":
+        return get_strict_index().recommend_spot(
+            user_inputs, _travel_row(user_inputs["origin"]), _candidates(user_inputs)
+        )
 
-    results = list(prolog.query(q))
+    results = _prolog_query(strict_goal(user_inputs))
     return results
 
-def run_fallback_query(user_inputs):
+def run_fallback_query(user_inputs, engine=None):
     """
     Run a fallback Prolog query that scores and ranks study spots based on how well they match user preferences.
 
@@ -419,54 +1045,65 @@ def run_fallback_query(user_inputs):
     ----------
     user_inputs : dict
         A dictionary of user preferences and their associated weights, explanation mode, and top_n result count.
+    engine : str, optional
+        "prolog", "python" or "sqlite"; defaults to the module-level ENGINE. Graph
+        travel mode and queries with a search area (lat, lon, radius_m) always use "python".
 
     Returns
     -------
     list of dict
-        A list containing one dictionary with the key "Results" mapped to a list of tuples:
-        (score, name, link, explanation).
-    """
-    q = f"""
-        find_top_study_spots({user_inputs['origin']},
-                             {user_inputs['max_minutes']},
-                             {user_inputs["travel_weight"]},
-                             {user_inputs['work_type']},
-                             {user_inputs['work_weight']},
-                             {user_inputs['outlet_pref']},
-                             {user_inputs['outlet_weight']},
-                             {user_inputs['vibe_pref']},
-                             {user_inputs['vibe_weight']},
-                             {user_inputs['seating_pref']},
-                             {user_inputs['seating_weight']},
-                             {user_inputs['price_pref']},
-                             {user_inputs['price_weight']},
-                             {user_inputs['open_late']},
-                             {user_inputs['late_weight']},
-                             "{user_inputs['explain_mode']}",
-                             {user_inputs['top_n']},
-                             Results)
-    """
-    raw_results = list(prolog.query(q))
-    return raw_results
-
-
-def compute_match_info(user_inputs, score, explanation):
+        A list containing one dictionary with the key "Results" mapped to a list of rows:
+        (score, name, link, explanation, matches), where matches holds one
+        explanations.MATCHED/MISSED/SKIPPED state per attribute.
+        Results are cached and shared between callers, so treat them as read-only.
+
+    Raises
+    ------
+    query_builder.InvalidQuery
+        If an input is outside the knowledge base's value sets.
+    """
+    with _kb_lock.reading():
+        user_inputs = normalize_inputs(user_inputs, "fallback")
+        engine, tag = _query_engine(engine, user_inputs)
+        key = query_key("fallback", tag, user_inputs)
+        return fallback_cache.get_or_compute(
+            key, lambda: _fallback_query(user_inputs, engine), _result_version(engine)
+        )
+
+
+@metrics.timed("fallback_engine")
+def _fallback_query(user_inputs, engine):
+    """Run an uncached fallback query on the given engine."""
+    if engine == "sqlite":
+        return get_kb_store().find_top_study_spots(user_inputs)
+    if engine == "python":
+        return get_vector_scorer().find_top_study_spots(
+            user_inputs, _travel_row(user_inputs["origin"]), _candidates(user_inputs)
+        )
+
+    raw_results = _prolog_query(fallback_goal(user_inputs))
+    # Match states come back as atoms; store them as the same codes the Python engine uses
+    return [
+        {"Results": [
+            [score, name, link, explanation, tuple(STATE_CODES[state] for state in states)]
+            for score, name, link, explanation, states in solution["Results"]
+        ]}
+        for solution in raw_results
+    ]
+
+
+def compute_match_info(matches):
     """
     Compute a visual and textual summary of how many user preferences were matched in a recommendation.
 
-    Parses the explanation string from Prolog and checks which attributes matched.
+    Reads the per-attribute match vector returned with each fallback result.
     Used to generate match bars (✔ ✘ ➖) and an overall match percentage.
 
     Parameters
     ----------
-    user_inputs : dict
-        A dictionary of user preferences and weights.
-
-    score : int
-        The final score assigned to a study spot.
-
-    explanation : str
-        A string explanation from Prolog describing which preferences matched.
+    matches : sequence of int
+        One state per attribute (travel, work, outlet, vibe, seating, price, late):
+        explanations.MATCHED, MISSED or SKIPPED.
 
     Returns
     -------
@@ -477,45 +1114,11 @@ def compute_match_info(user_inputs, score, explanation):
         - skipped_count is the number of skipped preferences
         - match_bar_str is a string like '✔✘✔➖✔✔✘'
     """
-    attr_to_pref_key = {
-        "travel": "max_minutes",
-        "work": "work_type",
-        "outlet": "outlet_pref",
-        "vibe": "vibe_pref",
-        "seating": "seating_pref",
-        "price": "price_pref",
-        "late": "open_late"
-    }
-
-    attributes = list(attr_to_pref_key.keys())
-    total_weight = 0
-    skipped = 0
-    matches = []
-
-    explanation_lower = explanation.lower()
-    expl_lines = [e.strip() for e in explanation_lower.split(".") if e.strip()]
-
-    for attr in attributes:
-        pref_key = attr_to_pref_key[attr]
-        weight_key = f"{attr}_weight"
-        pref = user_inputs[pref_key]
-        weight = user_inputs[weight_key]
-
-        if pref == "skip":
-            skipped += 1
-            matches.append("➖")
-        else:
-            total_weight += weight
-            matched_line = next((line for line in expl_lines if attr in line), "")
-            if "matched" in matched_line and "not" not in matched_line:
-                matches.append("✔")
-            else:
-                matches.append("✘")
-
-    match_count = matches.count("✔")
-    total_considered = 7 - skipped
+    match_bar = "".join(_MATCH_ICONS[state] for state in matches)
+    match_count = match_bar.count("✔")
+    skipped = match_bar.count("➖")
+    total_considered = len(match_bar) - skipped
     percent = int((match_count / total_considered) * 100) if total_considered > 0 else 0
-    match_bar = "".join(matches)
 
     return f"🔎 Matched {match_count} out of {total_considered} preferences ({percent}% match)", skipped, match_bar
 
@@ -536,6 +1139,7 @@ def display_results(user_inputs, results):
         Strict mode: list of dicts with keys 'Name' and 'Link'.
         Fallback mode: list containing a dict with a 'Results' key mapping to ranked recommendations.
     """
+    _init_colors()
     print("\n📍 Here are your top study spot recommendations:\n")
     
     if user_inputs["mode"] == "strict":
@@ -563,9 +1167,9 @@ def display_results(user_inputs, results):
         if len(result_list) < user_inputs['top_n']:
             print(f"\n⚠️ Only {len(result_list)} result(s) matched your fallback preferences (requested {user_inputs['top_n']}).\n")
 
-        for i, (score, name, link, explanation) in enumerate(result_list, 1):
+        for i, (score, name, link, explanation, matches) in enumerate(result_list, 1):
             explanation_list = (explanation.split("  "))
-            match_info, skipped, match_bar = compute_match_info(user_inputs, score, explanation)
+            match_info, skipped, match_bar = compute_match_info(matches)
 
             star = "🌟" if i == 1 else ""
             print(f"{Fore.CYAN}{i}. {name}{star}, Score: {Fore.YELLOW}{score}  ({match_info})")
@@ -592,7 +1196,21 @@ if __name__ == "__main__":
     # Main entry point for running the Study Spot Finder CLI.
     # This loop enables users to run multiple queries in a single session,
     # view strict vs fallback results, and retry with new preferences if desired.
-    
+    parser = argparse.ArgumentParser(description="Seoul Study Spot Finder CLI")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE,
+                        help="recommendation engine for strict and fallback queries")
+    parser.add_argument("--travel", choices=TRAVEL_MODES, default=TRAVEL_MODE,
+                        help="travel times from travel/3 bands or from the transit graph")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile Prolog queries and print a per-predicate report on exit")
+    args = parser.parse_args()
+    ENGINE = args.engine
+    TRAVEL_MODE = args.travel
+    if args.profile:
+        enable_profiling()
+    if KB_WATCH_INTERVAL > 0:
+        watch_kb(KB_WATCH_INTERVAL)
+
     while True:  # Outer loop for full reruns
         try:
             # Get user preferences via CLI or natural language
@@ -617,10 +1235,12 @@ if __name__ == "__main__":
                 if switch in ["yes", "y"]:
                     user_inputs["mode"] = "fallback"
                     display_results(user_inputs, fallback_results)
+                    log_recommendations(user_inputs, fallback_results)
                     break
                 elif switch in ["no", "n"]:
                     user_inputs["mode"] = "strict"
                     display_results(user_inputs, strict_results)
+                    log_recommendations(user_inputs, strict_results)
                     break
                 else:
                     print("❌ Please enter 'yes' or 'no'")
@@ -641,4 +1261,6 @@ if __name__ == "__main__":
             if retry != "y":
                 break
 
-    print("👋 Goodbye! Happy studying!")
\ No newline at end of file
+    print("👋 Goodbye! Happy studying!")
+    if prolog_profile.is_enabled():
+        print("\n" + prolog_profile.format_report(profile_report()))
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Columnar Knowledge Base Snapshot
+--------------------------------
+A binary, fixed-width columnar copy of the spot facts in study_system.pl that
+the Python-side engines open with mmap instead of parsing the Prolog source.
+
+The file (study_system.columns, next to the source) holds:
+- a JSON header: the source's content hash, spot count, value vocabularies
+  and the offset, dtype and shape of every column
+- integer-coded enums: travel bands per origin, outlets, price, open_late
+- bitsets for the list attributes: one uint32 mask per spot for work, vibe
+  and seating (bit i set for the i-th value of the vocabulary)
+- the name order used to break score ties, and the coordinates
+- a string table (offsets + UTF-8 bytes) each for spot ids, names and links
+
+Columns are 64-byte aligned and read with np.frombuffer straight from the
+memory map, so opening a snapshot costs the same for any KB size and every
+worker process shares one page-cache copy of the data. Strings are only
+decoded when a result needs them. The codes are the ones VectorizedScorer
+builds from the facts, so scores, ties and explanations are identical.
+
+A snapshot is only used while its source hash matches the loaded knowledge
+base, so rebuild after editing the KB.
+
+Usage:
+$ python3 kb_columns.py build              # write study_system.columns
+$ python3 kb_columns.py info               # header, column sizes and freshness
+
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from knowledge_base import KB_PATH, ORIGINS, load_spots
+from result_cache import kb_content_hash
+
+
+MAGIC = b"STUDYKB\x01"
+ALIGNMENT = 64
+
+# Header length prefix after the magic bytes
+_LENGTH = struct.Struct("<Q")
+
+# Column name -> (VectorizedScorer attribute, vocabulary attribute)
+ENUM_COLUMNS = {
+    "travel": ("travel", "band_codes"),
+    "work": ("work", "work_codes"),
+    "vibe": ("vibe", "vibe_codes"),
+    "seating": ("seating", "seating_codes"),
+    "outlets": ("outlets", "outlet_codes"),
+    "price": ("price", "price_codes"),
+    "open_late": ("open_late", "late_codes"),
+}
+BITSET_COLUMNS = ("work", "vibe", "seating")
+STRING_TABLES = ("keys", "names", "links")
+
+
+def columns_path(path=KB_PATH):
+    """
+    Return the path of the columnar snapshot built from a Prolog source file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog source.
+
+    Returns
+    -------
+    str
+        The .columns path next to the source.
+    """
+    return os.path.splitext(path)[0] + ".columns"
+
+
+def _enum_dtype(vocab):
+    return np.int8 if len(vocab) <= np.iinfo(np.int8).max else np.int16
+
+
+def _string_table(values):
+    """Encode strings as (uint64 end offsets with a leading 0, UTF-8 bytes)."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum(np.array([len(value) for value in encoded], dtype=np.uint64))
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_columns(path, source=KB_PATH):
+    """
+    Build a columnar snapshot of a knowledge base.
+
+    The file is written next to its destination and renamed into place, so
+    processes that have the old snapshot mapped keep reading a complete file.
+
+    Parameters
+    ----------
+    path : str
+        Output path.
+    source : str
+        Path to the Prolog knowledge base.
+
+    Returns
+    -------
+    int
+        Number of spots written.
+    """
+    from scoring_engine import VectorizedScorer
+
+    spots = load_spots(source)
+    scorer = VectorizedScorer(spots)
+    arrays = {}
+    vocab = {}
+    for column, (attribute, codes) in ENUM_COLUMNS.items():
+        codes = getattr(scorer, codes)
+        vocab[column] = sorted(codes, key=codes.get)
+        values = getattr(scorer, attribute)
+        arrays[column] = values if column in BITSET_COLUMNS else values.astype(_enum_dtype(codes))
+    arrays["name_rank"] = scorer.name_rank.astype(np.uint32 if len(spots) < 2 ** 32 else np.uint64)
+    arrays["lat"] = np.array([s["location"][0] if "location" in s else np.nan for s in spots], dtype=np.float64)
+    arrays["lon"] = np.array([s["location"][1] if "location" in s else np.nan for s in spots], dtype=np.float64)
+    for table in STRING_TABLES:
+        arrays[f"{table}.offsets"], arrays[f"{table}.data"] = _string_table(getattr(scorer, table))
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({
+        "source_hash": kb_content_hash(source),
+        "count": len(spots),
+        "origins": list(ORIGINS),
+        "vocab": vocab,
+        "columns": layout,
+    }).encode("utf-8")
+    data_start = -(-(len(MAGIC) + _LENGTH.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        for name, array in arrays.items():
+            out.seek(data_start + layout[name]["offset"])
+            out.write(np.ascontiguousarray(array).tobytes())
+        out.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return len(spots)
+
+
+class StringTable:
+    """
+    Read-only sequence of strings stored as offsets into a UTF-8 buffer.
+
+    Items are decoded on access, so unused names and links cost nothing.
+    """
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self._data.tobytes()
+        offsets = self._offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+
+class KBColumns:
+    """
+    A memory-mapped columnar snapshot.
+
+    Attributes
+    ----------
+    path : str
+        The snapshot file.
+    source_hash : str
+        Content hash of the knowledge base it was built from.
+    count : int
+        Number of spots.
+    origins : list of str
+        Origin of each travel row.
+    vocab : dict
+        Column -> list of values, indexed by code (bit position for bitsets).
+    """
+
+    def __init__(self, path):
+        """
+        Map a snapshot file.
+
+        Parameters
+        ----------
+        path : str
+            Path written by write_columns.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a columnar snapshot.
+        """
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        prefix = len(MAGIC) + _LENGTH.size
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a knowledge base snapshot")
+        (length,) = _LENGTH.unpack(self._map[len(MAGIC):prefix])
+        header = json.loads(self._map[prefix:prefix + length].decode("utf-8"))
+        self._data_start = -(-(prefix + length) // ALIGNMENT) * ALIGNMENT
+        self._layout = header["columns"]
+        self.source_hash = header["source_hash"]
+        self.count = header["count"]
+        self.origins = header["origins"]
+        self.vocab = header["vocab"]
+
+    @classmethod
+    def open_fresh(cls, path, source_hash):
+        """
+        Map a snapshot only if it was built from a given knowledge base version.
+
+        Parameters
+        ----------
+        path : str
+            Snapshot path.
+        source_hash : str
+            Content hash of the loaded knowledge base.
+
+        Returns
+        -------
+        KBColumns or None
+            None if the snapshot is missing, unreadable or stale.
+        """
+        try:
+            columns = cls(path)
+        except (OSError, ValueError):
+            return None
+        if columns.source_hash != source_hash or tuple(columns.origins) != ORIGINS:
+            return None
+        return columns
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        """
+        Return a column as a read-only array backed by the memory map.
+
+        Parameters
+        ----------
+        name : str
+            A column name, e.g. "travel", "work" or "lat".
+
+        Returns
+        -------
+        np.ndarray
+        """
+        spec = self._layout[name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        array = np.frombuffer(self._map, dtype=dtype, count=count, offset=self._data_start + spec["offset"])
+        return array.reshape(spec["shape"])
+
+    def codes(self, name):
+        """Return the value -> code mapping of an enum or bitset column."""
+        return {value: code for code, value in enumerate(self.vocab[name])}
+
+    def strings(self, table):
+        """
+        Return one of the string tables ("keys", "names" or "links").
+
+        Returns
+        -------
+        StringTable
+        """
+        return StringTable(self.column(f"{table}.offsets"), self.column(f"{table}.data"))
+
+    def nbytes(self):
+        """Return the size of every column in bytes."""
+        return {name: self.column(name).nbytes for name in self._layout}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and inspect the columnar knowledge base snapshot")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--kb", default=KB_PATH, help="path to the Prolog knowledge base")
+    parser.add_argument("--output", help="snapshot path (default: next to the knowledge base)")
+    args = parser.parse_args()
+
+    path = args.output or columns_path(args.kb)
+    if args.command == "build":
+        count = write_columns(path, args.kb)
+        print(f"✅ Wrote {path}: {count} spots, {os.path.getsize(path)} bytes")
+    else:
+        columns = KBColumns(path)
+        fresh = columns.source_hash == kb_content_hash(args.kb)
+        print(f"{path}: {len(columns)} spots, {'fresh' if fresh else 'STALE'} for {args.kb}")
+        for name, size in columns.nbytes().items():
+            print(f"{size:>12}  {name}")
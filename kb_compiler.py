@@ -0,0 +1,180 @@
+"""
+Knowledge Base Compiler
+-----------------------
+Precompiles study_system.pl into an SWI-Prolog Quick Load File (.qlf) so that
+CLI runs, GUI launches and web workers load the compiled KB instead of
+re-parsing the source on every start.
+
+Usage:
+$ python3 kb_compiler.py build             # write study_system.qlf
+$ python3 kb_compiler.py report            # consult vs .qlf load timings
+
+"""
+
+import argparse
+import os
+
+from knowledge_base import KB_PATH
+
+
+SWIPL = os.environ.get("SWIPL", "swipl")
+
+
+def qlf_path(path=KB_PATH):
+    """
+    Return the path of the Quick Load File compiled from a Prolog source file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog source.
+
+    Returns
+    -------
+    str
+        The .qlf path next to the source, as written by qcompile/1.
+    """
+    return os.path.splitext(path)[0] + ".qlf"
+
+
+def _prolog_path(path):
+    """Quote a file path as a Prolog atom."""
+    escaped = os.path.abspath(path).replace("\\", "/").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def qlf_is_fresh(path=KB_PATH):
+    """
+    Check whether a compiled artifact exists and is at least as new as its source.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog source.
+
+    Returns
+    -------
+    bool
+        True if the .qlf can be loaded in place of the source.
+    """
+    compiled = qlf_path(path)
+    return os.path.exists(compiled) and os.path.getmtime(compiled) >= os.path.getmtime(path)
+
+
+def compile_kb(path=KB_PATH):
+    """
+    Compile a knowledge base into a .qlf file with qcompile/1.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog source.
+
+    Returns
+    -------
+    str
+        Path of the written .qlf file.
+
+    Raises
+    ------
+    RuntimeError
+        If swipl exits with an error.
+    """
+    import subprocess
+    goal = f"qcompile({_prolog_path(path)})"
+    proc = subprocess.run([SWIPL, "-q", "-g", goal, "-t", "halt"], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"qcompile failed for {path}:\n{proc.stderr}")
+    return qlf_path(path)
+
+
+def consult_kb(prolog, path=KB_PATH):
+    """
+    Load the knowledge base into a PySWIP engine, preferring the compiled artifact.
+
+    The .qlf is loaded when it is newer than the source; otherwise the source is consulted.
+
+    Parameters
+    ----------
+    prolog : pyswip.Prolog
+        The engine to load into.
+    path : str
+        Path to the Prolog source.
+
+    Returns
+    -------
+    str
+        The file that was loaded.
+    """
+    if qlf_is_fresh(path):
+        compiled = qlf_path(path)
+        list(prolog.query(f"load_files({_prolog_path(compiled)}, [])"))
+        return compiled
+    prolog.consult(path)
+    return path
+
+
+def _time_load(goal, repeat):
+    """Run a load goal in fresh swipl processes and return the load times in ms."""
+    timed = (
+        f"get_time(T0), {goal}, get_time(T1), "
+        f"Ms is (T1 - T0) * 1000, format('~6f~n', [Ms])"
+    )
+    import subprocess
+    times = []
+    for _ in range(repeat):
+        proc = subprocess.run([SWIPL, "-q", "-g", timed, "-t", "halt"], capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"swipl failed running {goal}:\n{proc.stderr}")
+        times.append(float(proc.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def timing_report(path=KB_PATH, repeat=5):
+    """
+    Time consulting the source against loading the compiled artifact.
+
+    Each load runs in a fresh swipl process so both start cold.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog source.
+    repeat : int
+        Number of runs per method.
+
+    Returns
+    -------
+    dict
+        Median and best load time (ms) for 'consult' and 'qlf', plus the speedup.
+    """
+    import statistics
+    if not qlf_is_fresh(path):
+        compile_kb(path)
+
+    report = {}
+    for method, goal in (
+        ("consult", f"consult({_prolog_path(path)})"),
+        ("qlf", f"load_files({_prolog_path(qlf_path(path))}, [])"),
+    ):
+        times = _time_load(goal, repeat)
+        report[method] = {"median_ms": statistics.median(times), "min_ms": min(times)}
+    report["speedup"] = report["consult"]["median_ms"] / max(report["qlf"]["median_ms"], 1e-9)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompile the study spot knowledge base")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--kb", default=KB_PATH, help="path to the Prolog knowledge base")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per method for the report")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"✅ Wrote {compile_kb(args.kb)}")
+    else:
+        report = timing_report(args.kb, args.repeat)
+        print(f"{'Method':<10}{'Median (ms)':>14}{'Best (ms)':>12}")
+        for method in ("consult", "qlf"):
+            print(f"{method:<10}{report[method]['median_ms']:>14.2f}{report[method]['min_ms']:>12.2f}")
+        print(f"⚡ .qlf load is {report['speedup']:.1f}x faster than consult")
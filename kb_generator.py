@@ -0,0 +1,219 @@
+"""
+Synthetic Knowledge Base Generator
+----------------------------------
+Writes large knowledge bases in the exact fact schema of study_system.pl
+(study_spot/1, study_spot_name/2, type/2, travel/3, work/2, outlets/2, vibe/2,
+seating/2, price/2, open_late/2, link/2, location/3) for scale and capacity testing.
+
+Attribute values are drawn from configurable distributions (by default the
+value frequencies of the shipped knowledge base) with a seeded random
+generator, so the same size, seed and distributions always give the same file.
+Facts are streamed to disk one spot at a time, with dynamic/1 and
+discontiguous/1 declarations so that each spot's facts can be written together
+(and hot-reloaded like the shipped knowledge base), and the rules
+of the source knowledge base are appended so the output can be consulted
+directly.
+
+Usage:
+$ python3 kb_generator.py kb_10k.pl --size 10000 --seed 7
+$ python3 kb_generator.py --print-distributions > dist.json
+$ python3 kb_generator.py kb_1m.pl --size 1000000 --distributions dist.json
+
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+from collections import Counter
+
+from knowledge_base import (
+    KB_PATH, FACT_PREDICATES, ORIGINS, SPOT_TYPES, TRAVEL_BANDS, WORK_TYPES,
+    OUTLET_OPTIONS, VIBES, SEATING_TYPES, PRICES, LATE_OPTIONS, format_atom, iter_rule_lines, load_spots
+)
+
+
+# Distribution keys: categorical attributes take relative weights per value;
+# multi-valued attributes take the probability that a spot has each value
+CATEGORICAL = {"type": SPOT_TYPES, "outlets": OUTLET_OPTIONS, "price": PRICES, "open_late": LATE_OPTIONS}
+MULTI_VALUED = {"work": WORK_TYPES, "vibe": VIBES, "seating": SEATING_TYPES}
+
+# Latitude and longitude ranges that spot coordinates are drawn from (Seoul)
+SEOUL_BOUNDS = ((37.43, 37.70), (126.80, 127.18))
+
+_NAME_WORDS = (
+    ("Quiet", "Cozy", "Sunny", "Hidden", "Maple", "Hanok", "Urban", "Moon", "Blue", "Green"),
+    ("Cafe", "Study Cafe", "Library", "Lounge", "Coffee", "Workspace", "Reading Room", "Books"),
+    ("Seongsu", "Hongdae", "Sinchon", "Jongno", "Itaewon", "Gangnam", "Mapo", "Euljiro", "Hyehwa", "Jamsil"),
+)
+
+
+def empirical_distributions(path=KB_PATH):
+    """
+    Measure attribute value frequencies in an existing knowledge base.
+
+    Parameters
+    ----------
+    path : str
+        Knowledge base to measure.
+
+    Returns
+    -------
+    dict
+        Distributions in the format taken by generate_kb: weights per value for
+        type/outlets/price/open_late, per-origin band weights under "travel",
+        and per-value inclusion probabilities for work/vibe/seating.
+    """
+    spots = load_spots(path)
+    distributions = {}
+    for attribute, values in CATEGORICAL.items():
+        counts = Counter(spot[attribute] for spot in spots)
+        distributions[attribute] = {value: counts[value] for value in values}
+    distributions["travel"] = {
+        origin: {band: sum(spot["travel"][origin] == band for spot in spots) for band in TRAVEL_BANDS}
+        for origin in ORIGINS
+    }
+    for attribute, values in MULTI_VALUED.items():
+        distributions[attribute] = {
+            value: sum(value in spot[attribute] for spot in spots) / max(len(spots), 1) for value in values
+        }
+    return distributions
+
+
+def _weighted(distribution):
+    """Split a {value: weight} mapping into parallel tuples for random.choices."""
+    values = tuple(value for value, weight in distribution.items() if weight > 0)
+    if not values:
+        raise ValueError(f"Distribution has no positive weights: {distribution}")
+    return values, tuple(distribution[value] for value in values)
+
+
+def iter_spot_facts(size, seed=0, distributions=None):
+    """
+    Generate the facts of `size` synthetic spots, one spot at a time.
+
+    Parameters
+    ----------
+    size : int
+        Number of spots.
+    seed : int
+        Random seed.
+    distributions : dict, optional
+        Overrides for empirical_distributions(); keys that are left out keep
+        their default distribution.
+
+    Yields
+    ------
+    str
+        All fact lines of one spot, joined.
+    """
+    config = empirical_distributions()
+    config.update(distributions or {})
+    rng = random.Random(seed)
+    # Coordinates use their own stream so the attribute draws match older KBs of the same seed
+    geo = random.Random(f"{seed}:location")
+    (lat_min, lat_max), (lon_min, lon_max) = SEOUL_BOUNDS
+
+    categorical = {attribute: _weighted(config[attribute]) for attribute in CATEGORICAL}
+    travel = [_weighted(config["travel"][origin]) for origin in ORIGINS]
+    multi_valued = {attribute: config[attribute] for attribute in MULTI_VALUED}
+    width = len(str(max(size - 1, 0)))
+
+    for i in range(size):
+        spot = f"spot_{i:0{width}d}"
+        words = [rng.choice(group) for group in _NAME_WORDS]
+        name = f"{words[0]} {words[1]} {words[2]} #{i}"
+        code = "".join(rng.choices(string.ascii_letters + string.digits, k=8))
+
+        def pick(attribute):
+            values, weights = categorical[attribute]
+            return rng.choices(values, weights)[0]
+
+        bands = [rng.choices(values, weights)[0] for values, weights in travel]
+        multi = {}
+        for attribute, probabilities in multi_valued.items():
+            chosen = [value for value, p in probabilities.items() if rng.random() < p]
+            if not chosen:
+                chosen = rng.choices(*_weighted(probabilities))
+            multi[attribute] = "[" + ", ".join(map(format_atom, chosen)) + "]"
+
+        yield (
+            f"study_spot({spot}).\n"
+            f"study_spot_name({spot}, {format_atom(name)}).\n"
+            f"type({spot}, {format_atom(pick('type'))}).\n"
+            f"travel({spot}, {', '.join(map(format_atom, bands))}).\n"
+            f"work({spot}, {multi['work']}).\n"
+            f"outlets({spot}, {format_atom(pick('outlets'))}).\n"
+            f"vibe({spot}, {multi['vibe']}).\n"
+            f"seating({spot}, {multi['seating']}).\n"
+            f"price({spot}, {format_atom(pick('price'))}).\n"
+            f"open_late({spot}, {format_atom(pick('open_late'))}).\n"
+            f"link({spot}, 'https://naver.me/{code}').\n"
+            f"location({spot}, {geo.uniform(lat_min, lat_max):.6f}, {geo.uniform(lon_min, lon_max):.6f}).\n"
+        )
+
+
+def generate_kb(path, size, seed=0, distributions=None, rules_from=KB_PATH):
+    """
+    Write a synthetic knowledge base to disk, streaming it spot by spot.
+
+    Parameters
+    ----------
+    path : str
+        Output file, or "-" for stdout.
+    size : int
+        Number of spots.
+    seed : int
+        Random seed.
+    distributions : dict, optional
+        Attribute distribution overrides (see empirical_distributions).
+    rules_from : str or None
+        Knowledge base whose rules are appended after the facts; None writes facts only.
+
+    Returns
+    -------
+    int
+        Number of spots written.
+    """
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    try:
+        out.write(f"% Synthetic study spot knowledge base: {size} spots, seed {seed}\n")
+        for predicate, arity in FACT_PREDICATES.items():
+            out.write(f":- dynamic {predicate}/{arity}.\n")
+            out.write(f":- discontiguous {predicate}/{arity}.\n")
+        out.write("\n")
+        for facts in iter_spot_facts(size, seed, distributions):
+            out.write(facts)
+        if rules_from:
+            out.write("\n")
+            out.writelines(iter_rule_lines(rules_from))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic study spot knowledge base")
+    parser.add_argument("output", nargs="?", default="-", help="output .pl file, or - for stdout")
+    parser.add_argument("--size", type=int, default=10000, help="number of spots")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--distributions", help="JSON file of attribute distribution overrides")
+    parser.add_argument("--facts-only", action="store_true", help="do not append the source KB's rules")
+    parser.add_argument("--print-distributions", action="store_true",
+                        help="print the default distributions as JSON and exit")
+    args = parser.parse_args()
+
+    if args.print_distributions:
+        print(json.dumps(empirical_distributions(), indent=2))
+        sys.exit(0)
+
+    overrides = None
+    if args.distributions:
+        with open(args.distributions, encoding="utf-8") as dist_file:
+            overrides = json.load(dist_file)
+
+    written = generate_kb(args.output, args.size, args.seed, overrides, None if args.facts_only else KB_PATH)
+    if args.output != "-":
+        print(f"✅ Wrote {written} spots to {args.output}", file=sys.stderr)
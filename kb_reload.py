@@ -0,0 +1,230 @@
+"""
+Knowledge Base Hot Reload
+-------------------------
+Applies edits to study_system.pl to a running process without restarting it.
+
+The schema facts of the file are kept as a multiset; when the file changes, the
+new multiset is diffed against the loaded one and only the facts that differ
+are retracted or asserted (the fact predicates are declared dynamic in the
+knowledge base for this). If anything other than facts changed, such as a
+rule, the file is re-consulted instead.
+
+- KBSnapshot: the facts and a hash of the rules of one version of the file
+- diff_facts / update_goal: the retracts and asserts between two snapshots,
+  as one Prolog goal
+- ReadWriteLock: lets queries run side by side while a reload waits for them
+  to finish and holds new ones back until it is done
+- KBWatcher: a polling thread that calls back once a changed file has stopped
+  changing (so a half-written file is never loaded)
+
+interface.reload_kb puts these together; set STUDY_KB_WATCH to a polling
+interval in seconds to watch the knowledge base in the CLI, GUI and web app
+(their entry points start the watcher; importing interface does not).
+
+"""
+
+import hashlib
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from knowledge_base import format_fact, parse_fact
+
+
+class KBSnapshot:
+    """
+    The schema facts and rule text of one version of a knowledge base file.
+
+    Attributes
+    ----------
+    facts : collections.Counter
+        (predicate, args) -> number of copies in the file.
+    rules_hash : str
+        SHA-256 of every line that is not a schema fact.
+    """
+
+    def __init__(self, facts, rules_hash):
+        self.facts = facts
+        self.rules_hash = rules_hash
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Read a knowledge base file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the Prolog knowledge base.
+
+        Returns
+        -------
+        KBSnapshot
+        """
+        facts = Counter()
+        rules = hashlib.sha256()
+        with open(path, encoding="utf-8") as kb_file:
+            for line in kb_file:
+                fact = parse_fact(line)
+                if fact is None:
+                    rules.update(line.rstrip().encode("utf-8") + b"\n")
+                else:
+                    facts[fact] += 1
+        return cls(facts, rules.hexdigest())
+
+
+def diff_facts(old, new):
+    """
+    Compute the facts to retract and assert to turn one snapshot into another.
+
+    Parameters
+    ----------
+    old, new : KBSnapshot
+        The loaded and the edited version.
+
+    Returns
+    -------
+    tuple
+        (retracts, asserts): lists of (predicate, args), one entry per copy.
+    """
+    return list((old.facts - new.facts).elements()), list((new.facts - old.facts).elements())
+
+
+def update_goal(retracts, asserts):
+    """
+    Build one Prolog goal that applies a fact diff.
+
+    Parameters
+    ----------
+    retracts, asserts : list of tuple
+        (predicate, args) facts, as returned by diff_facts.
+
+    Returns
+    -------
+    str
+        A goal that retracts and then asserts (at the end) every listed fact.
+    """
+    def fact_list(facts):
+        return "[" + ", ".join(format_fact(predicate, args) for predicate, args in facts) + "]"
+
+    return (
+        f"forall(member(F, {fact_list(retracts)}), ignore(retract(F))), "
+        f"forall(member(F, {fact_list(asserts)}), assertz(F))"
+    )
+
+
+class ReadWriteLock:
+    """
+    A lock shared by many readers or held by one writer.
+
+    Writers are preferred: once a writer is waiting, new readers wait too, so
+    a steady stream of queries cannot hold a reload off forever.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        """Hold the lock as one of any number of readers."""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """Hold the lock alone, once every current reader has finished."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class KBWatcher:
+    """
+    Polls a knowledge base file and calls back when it has changed.
+
+    A change is only reported once the file's size and modification time are
+    the same on two polls in a row, so editors that write in several steps do
+    not trigger a reload of a half-written file.
+
+    Attributes
+    ----------
+    path : str
+        The watched file.
+    interval : float
+        Seconds between polls.
+    """
+
+    def __init__(self, path, callback, interval=1.0):
+        """
+        Parameters
+        ----------
+        path : str
+            File to watch.
+        callback : callable
+            Called with the path after each settled change; exceptions it
+            raises are reported and the watcher keeps running.
+        interval : float
+            Seconds between polls.
+        """
+        self.path = path
+        self.interval = interval
+        self._callback = callback
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+        self._seen = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.interval):
+            current = self._stat()
+            if current is None or current == self._seen:
+                pending = None
+                continue
+            if current != pending:
+                pending = current  # changed since the last poll: wait for it to settle
+                continue
+            self._seen, pending = current, None
+            try:
+                self._callback(self.path)
+            except Exception as e:
+                print(f"⚠️ Knowledge base reload failed: {type(e).__name__}: {e}")
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
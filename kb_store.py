@@ -0,0 +1,382 @@
+"""
+SQLite Knowledge Store
+----------------------
+An optional on-disk backend for the study spot facts, so that the knowledge
+base does not have to be resident in every process and several processes can
+share one copy.
+
+Spots are stored one row each, with the multi-valued attributes (work, vibe,
+seating) and the per-origin travel bands in their own tables, and every
+attribute that queries filter on is indexed. Strict and fallback queries are
+answered in SQL with bound parameters and return the same shapes as the other
+engines (see interface.run_strict_query / run_fallback_query):
+- strict: every spot matching all preferences, in study_spot/1 order
+- fallback: per-attribute match states and weighted scores computed in SQL,
+  ranked by score then name (both descending) with the top_n cut done by
+  SQLite, and explanations built only for the returned rows
+
+Usage:
+$ python3 kb_store.py import                      # study_system.pl -> study_system.db
+$ python3 kb_store.py export out.pl               # study_system.db -> Prolog facts + rules
+$ python3 kb_store.py stats
+
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+
+from explanations import ATTRIBUTES, MATCHED, build_explanation
+from knowledge_base import (
+    KB_PATH, FACT_PREDICATES, ORIGINS, format_fact, iter_rule_lines, load_spots, map_travel_times
+)
+
+
+# Default database, next to the knowledge base it is imported from
+DB_PATH = os.path.splitext(KB_PATH)[0] + ".db"
+
+MULTI_VALUED = ("work", "vibe", "seating")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spots (
+    id        INTEGER PRIMARY KEY,  -- position in study_spot/1 order
+    key       TEXT NOT NULL UNIQUE,
+    name      TEXT NOT NULL,
+    type      TEXT NOT NULL,
+    outlets   TEXT NOT NULL,
+    price     TEXT NOT NULL,
+    open_late TEXT NOT NULL,
+    link      TEXT NOT NULL,
+    lat       REAL,
+    lon       REAL
+);
+CREATE TABLE IF NOT EXISTS spot_travel (
+    spot_id INTEGER NOT NULL REFERENCES spots(id),
+    origin  TEXT NOT NULL,
+    band    TEXT NOT NULL,
+    PRIMARY KEY (spot_id, origin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spot_work (
+    spot_id INTEGER NOT NULL REFERENCES spots(id),
+    value   TEXT NOT NULL,
+    rank    INTEGER NOT NULL,  -- position in the fact's list
+    PRIMARY KEY (spot_id, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spot_vibe (
+    spot_id INTEGER NOT NULL REFERENCES spots(id),
+    value   TEXT NOT NULL,
+    rank    INTEGER NOT NULL,  -- position in the fact's list
+    PRIMARY KEY (spot_id, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spot_seating (
+    spot_id INTEGER NOT NULL REFERENCES spots(id),
+    value   TEXT NOT NULL,
+    rank    INTEGER NOT NULL,  -- position in the fact's list
+    PRIMARY KEY (spot_id, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS spots_outlets ON spots(outlets);
+CREATE INDEX IF NOT EXISTS spots_price ON spots(price);
+CREATE INDEX IF NOT EXISTS spots_open_late ON spots(open_late);
+CREATE INDEX IF NOT EXISTS travel_band ON spot_travel(origin, band, spot_id);
+CREATE INDEX IF NOT EXISTS work_value ON spot_work(value, spot_id);
+CREATE INDEX IF NOT EXISTS vibe_value ON spot_vibe(value, spot_id);
+CREATE INDEX IF NOT EXISTS seating_value ON spot_seating(value, spot_id);
+"""
+
+# Match state of each attribute for one spot row `s` and the travel row `t`,
+# in ATTRIBUTES order; travel takes the band, the others (preference, preference)
+_STATE_SQL = {
+    "travel": "CASE WHEN t.band = ? THEN 1 ELSE 0 END",
+    "work": "CASE WHEN ? = 'skip' THEN -1 WHEN EXISTS "
+            "(SELECT 1 FROM spot_work WHERE spot_id = s.id AND value = ?) THEN 1 ELSE 0 END",
+    "outlet": "CASE WHEN ? = 'skip' THEN -1 WHEN s.outlets = ? THEN 1 ELSE 0 END",
+    "vibe": "CASE WHEN ? = 'skip' THEN -1 WHEN EXISTS "
+            "(SELECT 1 FROM spot_vibe WHERE spot_id = s.id AND value = ?) THEN 1 ELSE 0 END",
+    "seating": "CASE WHEN ? = 'skip' THEN -1 WHEN EXISTS "
+               "(SELECT 1 FROM spot_seating WHERE spot_id = s.id AND value = ?) THEN 1 ELSE 0 END",
+    "price": "CASE WHEN ? = 'skip' THEN -1 WHEN s.price = ? THEN 1 ELSE 0 END",
+    "late": "CASE WHEN ? = 'skip' THEN -1 WHEN s.open_late = ? THEN 1 ELSE 0 END",
+}
+
+# user_inputs preference key for each attribute, in ATTRIBUTES order
+_PREFERENCE_KEYS = ("max_minutes", "work_type", "outlet_pref", "vibe_pref", "seating_pref", "price_pref", "open_late")
+
+
+def import_kb(db_path=DB_PATH, source=KB_PATH):
+    """
+    Load the facts of a Prolog knowledge base into a new SQLite database.
+
+    Parameters
+    ----------
+    db_path : str
+        Database file to write; an existing file is replaced.
+    source : str
+        Prolog knowledge base to read.
+
+    Returns
+    -------
+    int
+        Number of spots imported.
+    """
+    spots = load_spots(source)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT INTO spots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (i, s["id"], s["name"], s["type"], s["outlets"], s["price"], s["open_late"], s["link"],
+                     *s.get("location", (None, None)))
+                    for i, s in enumerate(spots)
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO spot_travel VALUES (?, ?, ?)",
+                ((i, origin, s["travel"][origin]) for i, s in enumerate(spots) for origin in ORIGINS),
+            )
+            for attribute in MULTI_VALUED:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO spot_{attribute} VALUES (?, ?, ?)",
+                    ((i, value, rank) for i, s in enumerate(spots) for rank, value in enumerate(s[attribute])),
+                )
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    # Swap the finished file in so readers never open a half-built database
+    os.replace(tmp_path, db_path)
+    return len(spots)
+
+
+def export_kb(path, db_path=DB_PATH, rules_from=KB_PATH):
+    """
+    Write the spots of a database back out as a Prolog knowledge base.
+
+    Facts are grouped by predicate, in the layout of study_system.pl, and the
+    rules of `rules_from` are appended so the output can be consulted directly.
+
+    Parameters
+    ----------
+    path : str
+        Output .pl file, or "-" for stdout.
+    db_path : str
+        Database to read.
+    rules_from : str or None
+        Knowledge base whose rules are appended; None writes facts only.
+
+    Returns
+    -------
+    int
+        Number of spots written.
+    """
+    store = SQLiteStore(db_path)
+    spots = store.spots()
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    try:
+        out.write(f"% Study spot knowledge base exported from {os.path.basename(db_path)}\n")
+        for predicate, arity in FACT_PREDICATES.items():
+            out.write(f":- dynamic {predicate}/{arity}.\n")
+        for predicate in FACT_PREDICATES:
+            out.write("\n")
+            for spot in spots:
+                args = _fact_args(predicate, spot)
+                if args is not None:
+                    out.write(format_fact(predicate, args) + ".\n")
+        if rules_from:
+            out.write("\n")
+            out.writelines(iter_rule_lines(rules_from))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return len(spots)
+
+
+def _fact_args(predicate, spot):
+    """Arguments of one spot's fact for a predicate, or None if it has none."""
+    if predicate == "study_spot":
+        return (spot["id"],)
+    if predicate == "study_spot_name":
+        return (spot["id"], spot["name"])
+    if predicate == "travel":
+        return (spot["id"],) + tuple(spot["travel"][origin] for origin in ORIGINS)
+    if predicate == "location":
+        return (spot["id"],) + spot["location"] if "location" in spot else None
+    if predicate in MULTI_VALUED:
+        return (spot["id"], tuple(spot[predicate]))
+    return (spot["id"], spot[predicate])
+
+
+class SQLiteStore:
+    """
+    Strict and fallback queries against a database written by import_kb.
+
+    Connections are opened read-only, one per thread, so the store can be
+    shared by request threads and by any number of processes.
+
+    Attributes
+    ----------
+    path : str
+        Database file.
+    """
+
+    def __init__(self, path=DB_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No knowledge store at {path}; run 'python3 kb_store.py import' first")
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = "file:" + os.path.abspath(self.path) + "?mode=ro"
+            conn = self._local.conn = sqlite3.connect(uri, uri=True)
+        return conn
+
+    def version(self):
+        """
+        Return a token that changes whenever the database file is rewritten.
+
+        Returns
+        -------
+        str
+            The file's inode, size and modification time.
+        """
+        stat = os.stat(self.path)
+        return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM spots").fetchone()[0]
+
+    def spots(self):
+        """
+        Read every spot record back, in study_spot/1 order.
+
+        Returns
+        -------
+        list of dict
+            Records in the format of knowledge_base.load_spots.
+        """
+        conn = self.conn
+        spots = []
+        by_id = {}
+        for row in conn.execute("SELECT id, key, name, type, outlets, price, open_late, link, lat, lon "
+                                "FROM spots ORDER BY id"):
+            spot_id, key, name, type_, outlets, price, open_late, link, lat, lon = row
+            spot = {"id": key, "name": name, "type": type_, "travel": {}, "work": [], "outlets": outlets,
+                    "vibe": [], "seating": [], "price": price, "open_late": open_late, "link": link}
+            if lat is not None:
+                spot["location"] = (lat, lon)
+            spots.append(spot)
+            by_id[spot_id] = spot
+        for spot_id, origin, band in conn.execute("SELECT spot_id, origin, band FROM spot_travel"):
+            by_id[spot_id]["travel"][origin] = band
+        for attribute in MULTI_VALUED:
+            for spot_id, value in conn.execute(f"SELECT spot_id, value FROM spot_{attribute} ORDER BY spot_id, rank"):
+                by_id[spot_id][attribute].append(value)
+        return spots
+
+    def recommend_spot(self, user_inputs):
+        """
+        Return every spot matching all preferences exactly, like recommend_spot/10.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            Inputs returned by query_builder.normalize_inputs(..., "strict").
+
+        Returns
+        -------
+        list of dict
+            One {"Name": ..., "Link": ...} dict per match, in study_spot/1 order.
+        """
+        band = map_travel_times(int(user_inputs["max_minutes"]))
+        rows = self.conn.execute(
+            """
+            SELECT s.name, s.link FROM spot_travel t JOIN spots s ON s.id = t.spot_id
+            WHERE t.origin = ? AND t.band = ?
+              AND s.outlets = ? AND s.price = ? AND s.open_late = ?
+              AND EXISTS (SELECT 1 FROM spot_work WHERE spot_id = s.id AND value = ?)
+              AND EXISTS (SELECT 1 FROM spot_vibe WHERE spot_id = s.id AND value = ?)
+              AND EXISTS (SELECT 1 FROM spot_seating WHERE spot_id = s.id AND value = ?)
+            ORDER BY s.id
+            """,
+            (user_inputs["origin"], band, user_inputs["outlet_pref"], user_inputs["price_pref"],
+             user_inputs["open_late"], user_inputs["work_type"], user_inputs["vibe_pref"],
+             user_inputs["seating_pref"]),
+        )
+        return [{"Name": name, "Link": link} for name, link in rows]
+
+    def find_top_study_spots(self, user_inputs):
+        """
+        Rank spots like ranked_study_spots/18.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            Inputs returned by query_builder.normalize_inputs(..., "fallback").
+
+        Returns
+        -------
+        list of dict
+            A single dict with key "Results" mapped to [score, name, link, explanation, matches]
+            lists, as returned by VectorizedScorer.find_top_study_spots.
+        """
+        # Parameters bind in the order their placeholders appear in the text:
+        # score weights, match state preferences, origin, limit
+        params = [int(user_inputs[f"{attribute}_weight"]) for attribute in ATTRIBUTES]
+        states = []
+        for attribute, key in zip(ATTRIBUTES, _PREFERENCE_KEYS):
+            states.append(_STATE_SQL[attribute])
+            if attribute == "travel":
+                params.append(map_travel_times(int(user_inputs["max_minutes"])))
+            else:
+                params += [user_inputs[key], user_inputs[key]]
+        params.append(user_inputs["origin"])
+        score = " + ".join(f"? * (m{i} = {MATCHED})" for i in range(len(ATTRIBUTES)))
+
+        top_n = user_inputs.get("top_n")
+        rows = self.conn.execute(
+            f"""
+            SELECT name, link, {", ".join(f"m{i}" for i in range(len(ATTRIBUTES)))}, {score} AS score
+            FROM (
+                SELECT s.id, s.name, s.link, {", ".join(f"{sql} AS m{i}" for i, sql in enumerate(states))}
+                FROM spots s JOIN spot_travel t ON t.spot_id = s.id AND t.origin = ?
+            )
+            ORDER BY score DESC, name DESC, id DESC
+            LIMIT ?
+            """,
+            params + [-1 if top_n is None else int(top_n)],
+        )
+
+        explain_mode = user_inputs.get("explain_mode", "long")
+        results = []
+        for name, link, *rest in rows:
+            matches, score = tuple(rest[:-1]), rest[-1]
+            results.append([score, name, link, build_explanation(matches, explain_mode), matches])
+        return [{"Results": results}]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite storage for the study spot knowledge base")
+    parser.add_argument("command", choices=["import", "export", "stats"])
+    parser.add_argument("output", nargs="?", default="-", help="output .pl file for export, or - for stdout")
+    parser.add_argument("--kb", default=KB_PATH, help="Prolog knowledge base to import, or whose rules to export")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--facts-only", action="store_true", help="export facts without the KB's rules")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"✅ Imported {import_kb(args.db, args.kb)} spots into {args.db}")
+    elif args.command == "export":
+        written = export_kb(args.output, args.db, None if args.facts_only else args.kb)
+        if args.output != "-":
+            print(f"✅ Exported {written} spots to {args.output}", file=sys.stderr)
+    else:
+        store = SQLiteStore(args.db)
+        print(f"{len(store)} spots in {args.db} ({os.path.getsize(args.db) / 1024:.0f} KiB)")
@@ -0,0 +1,305 @@
+"""
+Knowledge Base Reader
+---------------------
+Reads the ground facts of the study spot knowledge base (study_system.pl) into
+plain Python records so that Python-side engines can work on the same data as
+the Prolog rules without going through PySWIP.
+
+Only the fact schema is read (study_spot/1, study_spot_name/2, type/2, travel/3,
+work/2, outlets/2, vibe/2, seating/2, price/2, open_late/2, link/2 and the
+optional location/3); rules are left to Prolog.
+
+"""
+
+import os
+import re
+import string
+
+
+# Path of the knowledge base shipped with the project
+KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "study_system.pl")
+
+# Value vocabularies used by the knowledge base (see study_system.pl)
+ORIGINS = ("sinseol", "dongdaemun")
+SPOT_TYPES = ("cafe", "study_cafe", "library", "coworking")
+TRAVEL_BANDS = ("t0_5", "t6_15", "t16_30", "t31")
+WORK_TYPES = ("deep_focus", "casual", "group")
+OUTLET_OPTIONS = ("yes", "limited", "no")
+VIBES = ("quiet", "cozy", "lively")
+SEATING_TYPES = ("individual_desk", "open_table", "booth", "lounge")
+PRICES = ("free", "low", "medium", "high")
+LATE_OPTIONS = ("yes", "no")
+
+# Fact predicates that make up a spot record, with their arities
+FACT_PREDICATES = {
+    "study_spot": 1,
+    "study_spot_name": 2,
+    "type": 2,
+    "travel": 3,
+    "work": 2,
+    "outlets": 2,
+    "vibe": 2,
+    "seating": 2,
+    "price": 2,
+    "open_late": 2,
+    "link": 2,
+    "location": 3,
+}
+
+# Fact predicates a spot record may leave out
+OPTIONAL_PREDICATES = ("location",)
+
+_FACT_LINE = re.compile(r"^([a-z]\w*)\((.*)\)\.\s*(?:%.*)?$")
+_TOKEN = re.compile(r"\s*(?:('(?:[^'\\]|\\.|'')*')|(-?\d+(?:\.\d+)?)|([a-z]\w*)|([\[\],]))")
+
+
+def map_travel_times(minutes):
+    """
+    Python mirror of map_travel_times/2: bucket a travel time into its time band.
+
+    Parameters
+    ----------
+    minutes : int
+        The maximum travel time in minutes.
+
+    Returns
+    -------
+    str
+        One of 't0_5', 't6_15', 't16_30' or 't31'.
+    """
+    if minutes <= 5:
+        return "t0_5"
+    if minutes <= 15:
+        return "t6_15"
+    if minutes <= 30:
+        return "t16_30"
+    return "t31"
+
+
+def format_atom(value):
+    """
+    Write a Python string as a Prolog atom, quoting it when needed.
+
+    Parameters
+    ----------
+    value : str
+        The atom text.
+
+    Returns
+    -------
+    str
+        Prolog source for the atom.
+    """
+    if value and value[0] in string.ascii_lowercase and all(c.isalnum() or c == "_" for c in value):
+        return value
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def format_fact(predicate, args):
+    """
+    Write a parsed fact back as Prolog source (the inverse of parse_fact).
+
+    Parameters
+    ----------
+    predicate : str
+        Fact predicate name.
+    args : tuple
+        Arguments as returned by parse_arguments: strings, numbers and tuples (lists).
+
+    Returns
+    -------
+    str
+        The fact term without the trailing full stop, e.g. "price(endlong, low)".
+    """
+    def term(value):
+        if isinstance(value, tuple):
+            return "[" + ", ".join(map(term, value)) + "]"
+        if isinstance(value, (int, float)):
+            return repr(value)
+        return format_atom(value)
+
+    return f"{predicate}({', '.join(map(term, args))})"
+
+
+def _unquote(token):
+    body = token[1:-1].replace("''", "'")
+    return re.sub(r"\\(.)", r"\1", body)
+
+
+def parse_arguments(text):
+    """
+    Parse the argument list of a ground fact.
+
+    Supports atoms, quoted atoms, numbers and flat lists, which is everything
+    the fact schema uses. Lists are returned as tuples so facts stay hashable.
+
+    Parameters
+    ----------
+    text : str
+        The text between the outer parentheses of a fact, e.g. "x, [a, b]".
+
+    Returns
+    -------
+    tuple
+        The parsed arguments.
+    """
+    args = []
+    stack = [args]
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            if text[pos:].strip():
+                raise ValueError(f"Cannot parse fact arguments: {text!r}")
+            break
+        pos = match.end()
+        quoted, number, atom, punct = match.groups()
+        if quoted is not None:
+            stack[-1].append(_unquote(quoted))
+        elif number is not None:
+            stack[-1].append(float(number) if "." in number else int(number))
+        elif atom is not None:
+            stack[-1].append(atom)
+        elif punct == "[":
+            stack.append([])
+        elif punct == "]":
+            items = stack.pop()
+            stack[-1].append(tuple(items))
+    if len(stack) != 1:
+        raise ValueError(f"Unbalanced list in fact arguments: {text!r}")
+    return tuple(args)
+
+
+def parse_fact(line):
+    """
+    Parse one line of the knowledge base as a schema fact.
+
+    Parameters
+    ----------
+    line : str
+        A single source line.
+
+    Returns
+    -------
+    tuple or None
+        (predicate, args) for schema facts, or None for comments, rules and blanks.
+    """
+    match = _FACT_LINE.match(line.strip()) if line[:1].isalpha() else None
+    if not match or ":-" in line:
+        return None
+    predicate = match.group(1)
+    if predicate not in FACT_PREDICATES:
+        return None
+    args = parse_arguments(match.group(2))
+    if len(args) != FACT_PREDICATES[predicate]:
+        return None
+    return predicate, args
+
+
+def iter_facts(path=KB_PATH):
+    """
+    Stream the schema facts of a knowledge base file in source order.
+
+    Parameters
+    ----------
+    path : str
+        Path to a Prolog file using the study spot fact schema.
+
+    Yields
+    ------
+    tuple
+        (predicate, args) for each fact.
+    """
+    with open(path, encoding="utf-8") as kb_file:
+        for line in kb_file:
+            fact = parse_fact(line)
+            if fact is not None:
+                yield fact
+
+
+def iter_rule_lines(path=KB_PATH):
+    """
+    Stream the lines of a knowledge base that are not schema facts or their dynamic/1 declarations.
+
+    Used to write the rules of one knowledge base after facts from another source.
+
+    Parameters
+    ----------
+    path : str
+        Path to a Prolog knowledge base.
+
+    Yields
+    ------
+    str
+        Source lines, including their newlines.
+    """
+    with open(path, encoding="utf-8") as kb_file:
+        for line in kb_file:
+            if parse_fact(line) is None and not line.startswith(":- dynamic "):
+                yield line
+
+
+def spots_from_facts(facts):
+    """
+    Group schema facts into one record per spot.
+
+    Spots are returned in study_spot/1 order, and only spots that have every
+    attribute fact are kept, mirroring the conjunction in score_spot/20.
+
+    Parameters
+    ----------
+    facts : iterable of tuple
+        (predicate, args) pairs as produced by iter_facts.
+
+    Returns
+    -------
+    list of dict
+        One dict per spot with keys 'id', 'name', 'type', 'travel', 'work',
+        'outlets', 'vibe', 'seating', 'price', 'open_late' and 'link', plus
+        'location' as a (latitude, longitude) tuple when the spot has a location/3 fact.
+    """
+    order = []
+    attrs = {}
+    for predicate, args in facts:
+        if predicate == "study_spot":
+            order.append(args[0])
+            continue
+        record = attrs.setdefault(args[0], {})
+        if predicate == "travel":
+            record.setdefault("travel", dict(zip(ORIGINS, args[1:])))
+        elif predicate == "location":
+            record.setdefault("location", (float(args[1]), float(args[2])))
+        elif predicate == "study_spot_name":
+            record.setdefault("name", args[1])
+        elif predicate in ("work", "vibe", "seating"):
+            record.setdefault(predicate, list(args[1]))
+        else:
+            record.setdefault(predicate, args[1])
+
+    required = [
+        p if p != "study_spot_name" else "name"
+        for p in FACT_PREDICATES if p != "study_spot" and p not in OPTIONAL_PREDICATES
+    ]
+    spots = []
+    for spot_id in order:
+        record = attrs.get(spot_id, {})
+        if all(key in record for key in required):
+            spots.append(dict(id=spot_id, **record))
+    return spots
+
+
+def load_spots(path=KB_PATH):
+    """
+    Load every complete study spot record from a knowledge base file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Prolog knowledge base.
+
+    Returns
+    -------
+    list of dict
+        Spot records in study_spot/1 order (see spots_from_facts).
+    """
+    return spots_from_facts(iter_facts(path))
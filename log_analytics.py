@@ -0,0 +1,372 @@
+"""
+Recommendation Log Analytics
+----------------------------
+Streams recommendation_log.csv (and its rotated backups) and reports which
+spots get recommended, how well they score, and which preferences the
+fallback results miss most often, to show where the knowledge base needs
+more spots.
+
+- per-spot recommendation counts, and per-spot misses by attribute
+- score distribution, in points and as a share of the query's total weight
+- per-attribute miss rates, from the match states column, or parsed from the
+  explanation in rows logged without one (a preference counts when it was
+  asked for, i.e. matched or missed; short-mode "✔" text, which reads the
+  same for matched and skipped, is not counted)
+- recommendation volume per hour, day or month
+
+Files are read row by row in byte-range chunks that start and end on line
+boundaries, so memory does not grow with the size of the log (only with the
+number of distinct spots and time buckets). With --processes the chunks of
+every file are analyzed in parallel and the partial results merged; rankings
+break ties by name, so the report does not depend on the merge order.
+
+Usage:
+$ python3 log_analytics.py                            # recommendation_log.csv + rotated files
+$ python3 log_analytics.py big.csv --processes 4 --bucket day
+$ python3 log_analytics.py --json > report.json
+
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+from collections import Counter
+
+from explanations import ATTRIBUTES, MATCHED, MISSED, SKIPPED, parse_explanation, parse_states
+from recommendation_log import LOG_PATH, rotated_files
+
+
+# Timestamp prefix length for each time bucket ("YYYY-MM-DD HH:MM:SS" rows)
+BUCKETS = {"hour": 13, "day": 10, "month": 7}
+
+# Bytes per work unit when a file is split across processes
+CHUNK_BYTES = 64 * 1024 * 1024
+
+_STATE_NAMES = {MATCHED: "matched", MISSED: "missed", SKIPPED: "skipped"}
+
+
+class LogStats:
+    """
+    Aggregates over recommendation log rows; partial results can be merged.
+
+    Attributes
+    ----------
+    rows, strict_rows, bad_rows : int
+        Rows read, rows from strict results (no score), and unparseable rows.
+    spots : collections.Counter
+        Spot name -> times recommended.
+    spot_misses : dict
+        Spot name -> Counter of attribute -> fallback results that missed it.
+    scores : collections.Counter
+        Score -> fallback results with that score.
+    score_shares : collections.Counter
+        Tenth of the total weight (0-10) -> fallback results scoring in it.
+    attributes : dict
+        Attribute -> Counter of "matched"/"missed"/"skipped".
+    volume : collections.Counter
+        Time bucket -> rows.
+    """
+
+    def __init__(self, bucket="hour"):
+        self.bucket = bucket
+        self.rows = 0
+        self.strict_rows = 0
+        self.bad_rows = 0
+        self.spots = Counter()
+        self.spot_misses = {}
+        self.scores = Counter()
+        self.score_shares = Counter()
+        self.attributes = {attribute: Counter() for attribute in ATTRIBUTES}
+        self.volume = Counter()
+
+    def add(self, row):
+        """
+        Add one [timestamp, name, score, weight, explanation, states] row.
+
+        Rows logged before the states column was added have five fields; their
+        match states are parsed from the explanation.
+
+        Parameters
+        ----------
+        row : list of str
+            A parsed CSV row.
+        """
+        if len(row) < 5 or not row[1]:
+            self.bad_rows += 1
+            return
+        timestamp, name, score, weight, explanation = row[:5]
+        self.rows += 1
+        self.spots[name] += 1
+        self.volume[timestamp[:BUCKETS[self.bucket]]] += 1
+        if not score.strip():
+            self.strict_rows += 1
+            return
+        try:
+            score = int(score)
+            weight = int(weight) if weight.strip() else 0
+        except ValueError:
+            self.bad_rows += 1
+            return
+        self.scores[score] += 1
+        if weight > 0:
+            self.score_shares[min(10 * score // weight, 10)] += 1
+        try:
+            states = parse_states(row[5]) if len(row) > 5 and row[5].strip() else parse_explanation(explanation)
+        except ValueError:
+            states = parse_explanation(explanation)
+        misses = None
+        for attribute, state in states.items():
+            self.attributes[attribute][_STATE_NAMES[state]] += 1
+            if state == MISSED:
+                if misses is None:
+                    misses = self.spot_misses.setdefault(name, Counter())
+                misses[attribute] += 1
+
+    def merge(self, other):
+        """Add the counts of another LogStats (with the same bucket) into this one."""
+        self.rows += other.rows
+        self.strict_rows += other.strict_rows
+        self.bad_rows += other.bad_rows
+        self.spots.update(other.spots)
+        for name, misses in other.spot_misses.items():
+            self.spot_misses.setdefault(name, Counter()).update(misses)
+        self.scores.update(other.scores)
+        self.score_shares.update(other.score_shares)
+        for attribute, counts in other.attributes.items():
+            self.attributes[attribute].update(counts)
+        self.volume.update(other.volume)
+        return self
+
+    def miss_rates(self):
+        """
+        Return the share of fallback results that missed each attribute when it was asked for.
+
+        Returns
+        -------
+        dict
+            attribute -> miss rate in [0, 1], or None if it was never asked for.
+        """
+        rates = {}
+        for attribute, counts in self.attributes.items():
+            asked = counts["matched"] + counts["missed"]
+            rates[attribute] = counts["missed"] / asked if asked else None
+        return rates
+
+    def score_summary(self):
+        """
+        Summarize the score distribution.
+
+        Returns
+        -------
+        dict
+            count, mean, min, p50, p90 and max of the fallback scores (None when there are none).
+        """
+        count = sum(self.scores.values())
+        if not count:
+            return {"count": 0, "mean": None, "min": None, "p50": None, "p90": None, "max": None}
+        ordered = sorted(self.scores.items())
+
+        def percentile(p):
+            rank = p * (count - 1)
+            seen = 0
+            for score, n in ordered:
+                seen += n
+                if seen > rank:
+                    return score
+            return ordered[-1][0]
+
+        return {
+            "count": count,
+            "mean": sum(score * n for score, n in ordered) / count,
+            "min": ordered[0][0],
+            "p50": percentile(0.5),
+            "p90": percentile(0.9),
+            "max": ordered[-1][0],
+        }
+
+    def report(self, top=10):
+        """
+        Build the analytics report.
+
+        Parameters
+        ----------
+        top : int
+            Number of spots to list in each ranking.
+
+        Returns
+        -------
+        dict
+            JSON-ready report.
+        """
+        total_misses = Counter({name: sum(misses.values()) for name, misses in self.spot_misses.items()})
+        return {
+            "rows": self.rows,
+            "strict_rows": self.strict_rows,
+            "bad_rows": self.bad_rows,
+            "distinct_spots": len(self.spots),
+            "top_spots": [{"name": name, "count": n} for name, n in _ranked(self.spots, top)],
+            "top_missing_spots": [
+                {"name": name, "misses": n, "by_attribute": dict(_ranked(self.spot_misses[name]))}
+                for name, n in _ranked(total_misses, top)
+            ],
+            "miss_rates": self.miss_rates(),
+            "attributes": {attribute: dict(counts) for attribute, counts in self.attributes.items()},
+            "scores": self.score_summary(),
+            "score_histogram": {str(score): n for score, n in sorted(self.scores.items())},
+            "score_share_histogram": {f"{10 * tenth}%": self.score_shares[tenth] for tenth in range(11)},
+            "volume": {self.bucket: dict(sorted(self.volume.items()))},
+        }
+
+
+def _ranked(counts, top=None):
+    """Counter items by count, highest first, ties by key, so merge order never shows."""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def file_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Split a file into byte ranges for parallel reading.
+
+    Parameters
+    ----------
+    path : str
+        Log file.
+    chunk_bytes : int
+        Approximate size of each range.
+
+    Returns
+    -------
+    list of tuple
+        (path, start, end) ranges covering the file. A range owns the lines
+        that start inside it, so ranges need not fall on line boundaries.
+    """
+    size = os.path.getsize(path)
+    starts = range(0, max(size, 1), max(int(chunk_bytes), 1))
+    return [(path, start, min(start + chunk_bytes, size)) for start in starts]
+
+
+def _chunk_lines(path, start, end):
+    """Yield the decoded lines that start in [start, end) of a file."""
+    with open(path, "rb") as log_file:
+        position = start
+        if start > 0:
+            # The line running into the range belongs to the previous one
+            log_file.seek(start - 1)
+            position = start - 1 + len(log_file.readline())
+        while position < end:
+            line = log_file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode("utf-8", errors="replace")
+
+
+def analyze_chunk(chunk, bucket="hour"):
+    """
+    Aggregate one byte range of a log file.
+
+    Parameters
+    ----------
+    chunk : tuple
+        (path, start, end) as returned by file_chunks.
+    bucket : str
+        Time bucket: "hour", "day" or "month".
+
+    Returns
+    -------
+    LogStats
+    """
+    stats = LogStats(bucket)
+    for row in csv.reader(_chunk_lines(*chunk)):
+        stats.add(row)
+    return stats
+
+
+def _analyze_chunk(args):
+    return analyze_chunk(*args)
+
+
+def analyze(paths, processes=None, bucket="hour", chunk_bytes=CHUNK_BYTES):
+    """
+    Aggregate one or more log files.
+
+    Parameters
+    ----------
+    paths : list of str
+        Log files, e.g. from recommendation_log.rotated_files.
+    processes : int, optional
+        Worker processes; None or 1 reads in the calling process.
+    bucket : str
+        Time bucket: "hour", "day" or "month".
+    chunk_bytes : int
+        Bytes per work unit when files are split across processes.
+
+    Returns
+    -------
+    LogStats
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown time bucket {bucket!r}; expected one of {', '.join(BUCKETS)}")
+    total = LogStats(bucket)
+    if not processes or processes <= 1:
+        for path in paths:
+            total.merge(analyze_chunk((path, 0, os.path.getsize(path)), bucket))
+        return total
+    chunks = [(chunk, bucket) for path in paths for chunk in file_chunks(path, chunk_bytes)]
+    with multiprocessing.Pool(processes) as pool:
+        for stats in pool.imap_unordered(_analyze_chunk, chunks):
+            total.merge(stats)
+    return total
+
+
+def print_report(report):
+    """Print a report as text."""
+    scores = report["scores"]
+    print(f"📄 {report['rows']} recommendations ({report['strict_rows']} strict, "
+          f"{report['bad_rows']} unreadable rows), {report['distinct_spots']} spots")
+    if scores["count"]:
+        print(f"📊 Fallback scores: mean {scores['mean']:.1f}, p50 {scores['p50']}, p90 {scores['p90']}, "
+              f"range {scores['min']}-{scores['max']}")
+        print("   Share of total weight: " + ", ".join(
+            f"{share} {n}" for share, n in report["score_share_histogram"].items() if n))
+
+    print("\n✘ Miss rate by preference (when asked for):")
+    for attribute, rate in sorted(report["miss_rates"].items(), key=lambda item: (-(item[1] or 0), item[0])):
+        counts = report["attributes"][attribute]
+        asked = counts.get("matched", 0) + counts.get("missed", 0)
+        shown = f"{'n/a':>6}" if rate is None else f"{rate:6.1%}"
+        print(f"   {attribute:<8} {shown}  ({counts.get('missed', 0)} of {asked})")
+
+    print("\n🏆 Most recommended spots:")
+    for spot in report["top_spots"]:
+        print(f"   {spot['count']:>8}  {spot['name']}")
+    print("\n⚠️ Spots with the most fallback misses:")
+    for spot in report["top_missing_spots"]:
+        by_attribute = ", ".join(f"{attribute} {n}" for attribute, n in spot["by_attribute"].items())
+        print(f"   {spot['misses']:>8}  {spot['name']}  ({by_attribute})")
+
+    (bucket, volume), = report["volume"].items()
+    print(f"\n🕒 Recommendations per {bucket}:")
+    for when, n in volume.items():
+        print(f"   {when:<13}  {n}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze the recommendation log")
+    parser.add_argument("paths", nargs="*", help="log files (default: recommendation_log.csv and its rotated files)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes across files and chunks")
+    parser.add_argument("--bucket", choices=list(BUCKETS), default="hour", help="time bucket for volume")
+    parser.add_argument("--top", type=int, default=10, help="spots listed per ranking")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    paths = args.paths or rotated_files(LOG_PATH)
+    if not paths:
+        parser.error(f"no log files found at {LOG_PATH}")
+    report = analyze(paths, args.processes, args.bucket).report(args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
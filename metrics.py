@@ -0,0 +1,292 @@
+"""
+Request Metrics
+---------------
+In-process latency histograms, request counters and gauges for the study spot
+app, exposed by the web apps at /metrics (Prometheus text format) and
+/metrics.json.
+
+Stages timed (histogram label "stage"):
+- nl_parse: natural_language_parser.parse_preferences
+- query_build: input validation and canonicalization (interface.normalize_inputs)
+- strict_engine / fallback_engine: engine time of queries the result cache missed
+- format: compute_match_info and result formatting for the web pages and API
+- render: HTML template rendering
+
+Histograms use fixed buckets, so recording a sample is a bisect and a few
+additions under a lock (one to two microseconds) and memory does not grow with
+traffic. Gauges (cache, pool and log counters) are read from callbacks only
+when metrics are scraped. Set STUDY_METRICS=0 to turn timing off.
+
+Metrics are per process: with several server processes, scrape each one.
+
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+
+
+ENABLED = os.environ.get("STUDY_METRICS", "1") != "0"
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGES = ("nl_parse", "query_build", "strict_engine", "fallback_engine", "format", "render")
+
+PREFIX = "study_spot"
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram.
+
+    Attributes
+    ----------
+    bounds : tuple of float
+        Bucket upper bounds in seconds; an implicit +Inf bucket follows.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one duration."""
+        i = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+
+    def snapshot(self):
+        """
+        Return the histogram's current values.
+
+        Returns
+        -------
+        dict
+            count, sum (seconds), cumulative bucket counts keyed by upper bound
+            ("+Inf" last), and p50/p95/p99 estimated as the upper bound of the
+            bucket they fall in (None without samples, "+Inf" past the last bound).
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total_seconds = self._sum
+        cumulative = []
+        running = 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        labels = [repr(bound) for bound in self.bounds] + ["+Inf"]
+
+        def quantile(q):
+            if not running:
+                return None
+            rank = q * running
+            for bound, seen in zip(self.bounds, cumulative):
+                if seen >= rank:
+                    return bound
+            return "+Inf"
+
+        return {
+            "count": running,
+            "sum": total_seconds,
+            "buckets": dict(zip(labels, cumulative)),
+            "p50": quantile(0.5),
+            "p95": quantile(0.95),
+            "p99": quantile(0.99),
+        }
+
+
+_lock = threading.Lock()
+_histograms = {stage: Histogram() for stage in STAGES}
+_requests = {}
+_gauges = {}
+
+
+def observe(stage, seconds):
+    """
+    Record the duration of one stage.
+
+    Parameters
+    ----------
+    stage : str
+        One of STAGES (other names get their own histogram).
+    seconds : float
+        Duration.
+    """
+    if not ENABLED:
+        return
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(stage, Histogram())
+    histogram.observe(seconds)
+
+
+class _Timer:
+    """Records the time spent in a with block, or in each call of a decorated function."""
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call, so decorated functions are reentrant and thread-safe
+            with _Timer(self.stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def timed(stage):
+    """
+    Time a block (with timed(stage): ...) or every call of a function (@timed(stage)).
+
+    Parameters
+    ----------
+    stage : str
+        The stage the samples are recorded under.
+    """
+    return _Timer(stage)
+
+
+def count_request(endpoint, mode):
+    """
+    Count one request.
+
+    Parameters
+    ----------
+    endpoint : str
+        Route name, e.g. "search" or "api_recommend".
+    mode : str
+        "strict" or "fallback".
+    """
+    key = (endpoint, mode)
+    with _lock:
+        _requests[key] = _requests.get(key, 0) + 1
+
+
+def register_gauges(name, callback):
+    """
+    Publish the numeric values a callback returns as gauges.
+
+    Parameters
+    ----------
+    name : str
+        Gauge group, used in the metric names (e.g. "pool" -> study_spot_pool_idle).
+    callback : callable
+        Returns a flat dict of numbers, or a dict of label value -> flat dict
+        (e.g. cache_stats: {"strict": {...}, "fallback": {...}}) which is
+        published with the label "<name>". Called on every scrape.
+    """
+    with _lock:
+        _gauges[name] = callback
+
+
+def _gauge_samples():
+    """Yield (group, metric, label value or None, value) for every registered gauge."""
+    with _lock:
+        gauges = list(_gauges.items())
+    for group, callback in gauges:
+        try:
+            values = callback()
+        except Exception:
+            continue  # a failing source must not break the scrape
+        for key, value in (values or {}).items():
+            if isinstance(value, dict):
+                for metric, number in value.items():
+                    if isinstance(number, (int, float)) and not isinstance(number, bool):
+                        yield group, metric, key, number
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield group, key, None, value
+
+
+def snapshot():
+    """
+    Return every metric as JSON-ready data.
+
+    Returns
+    -------
+    dict
+        {"stages": {stage: histogram snapshot}, "requests": {endpoint: {mode: n}},
+        "gauges": {group: {...}}}.
+    """
+    with _lock:
+        histograms = dict(_histograms)
+        requests = dict(_requests)
+    gauges = {}
+    for group, metric, label, value in _gauge_samples():
+        target = gauges.setdefault(group, {})
+        if label is not None:
+            target = target.setdefault(label, {})
+        target[metric] = value
+    by_endpoint = {}
+    for (endpoint, mode), n in sorted(requests.items()):
+        by_endpoint.setdefault(endpoint, {})[mode] = n
+    return {
+        "stages": {stage: histogram.snapshot() for stage, histogram in histograms.items()},
+        "requests": by_endpoint,
+        "gauges": gauges,
+    }
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """
+    Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+    Returns
+    -------
+    str
+    """
+    lines = []
+    with _lock:
+        histograms = dict(_histograms)
+        requests = dict(_requests)
+
+    name = f"{PREFIX}_stage_seconds"
+    lines += [f"# HELP {name} Latency of each request stage.", f"# TYPE {name} histogram"]
+    for stage, histogram in histograms.items():
+        data = histogram.snapshot()
+        for bound, n in data["buckets"].items():
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {n}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {_number(data["sum"])}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {data["count"]}')
+
+    name = f"{PREFIX}_requests_total"
+    lines += [f"# HELP {name} Recommendation requests by endpoint and mode.", f"# TYPE {name} counter"]
+    for (endpoint, mode), n in sorted(requests.items()):
+        lines.append(f'{name}{{endpoint="{endpoint}",mode="{mode}"}} {n}')
+
+    # Samples of one metric must be contiguous, after its TYPE line
+    gauges = {}
+    for group, metric, label, value in _gauge_samples():
+        labels = f'{{{group}="{label}"}}' if label is not None else ""
+        gauges.setdefault(f"{PREFIX}_{group}_{metric}", []).append(f"{labels} {_number(value)}")
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines += [name + sample for sample in samples]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Clear every histogram and request counter (gauges stay registered)."""
+    with _lock:
+        for stage in list(_histograms):
+            _histograms[stage] = Histogram()
+        _requests.clear()
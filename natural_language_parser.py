@@ -1,4 +1,206 @@
+import argparse
+import json
 import re
+import sys
+from functools import lru_cache
+from itertools import islice
+
+import metrics
+
+
+# Keyword maps: keywords or regex patterns -> canonical preference values.
+# Within each map the first key (in insertion order) found in the text wins.
+WORK_MAP = {
+    # Direct matches
+    "deep": "deep_focus",
+    "lock in": "deep_focus",
+    "quiet work": "deep_focus",
+    "focus": "deep_focus",
+    "deep focus": "deep_focus",
+    "casual": "casual",
+    "chill": "casual",
+    "group": "group",
+    "team": "group",
+    "collab": "group",
+    # Regex patterns
+    r"(deep\s+concentration|intense\s+focus|study\s+grind)": "deep_focus",
+    r"\b(chill(ed)?|relaxed?)\b": "casual",
+    r"(collaborative|team work|working together)": "group"
+}
+
+OUTLET_MAP = {
+    "no": "no",
+    "few": "limited",
+    "plug": "yes",
+    "socket": "yes",
+    "outlet": "yes",
+    "charging": "yes",
+    "no plug": "no",
+    "no outlet": "no",
+    "limited": "limited",
+    "charge": "yes",
+    r"(power outlet|charging spot|need.*power)": "yes",
+    r"(no\s+(power|plug|charging))": "no"
+}
+
+VIBE_MAP = {
+    "quiet": "quiet",
+    "serene": "quiet",
+    "cozy": "cozy",
+    "aesthetic": "cozy",
+    "lively": "lively",
+    "busy": "lively",
+    "cool": "cozy",
+    r"(peaceful|relaxing|low noise)": "quiet",
+    r"(buzzy|buzzing|active)": "lively"
+}
+
+SEATING_MAP = {
+    "booth": "booth",
+    "table": "open_table",
+    "open table": "open_table",
+    "lounge": "lounge",
+    "couch": "lounge",
+    "desk": "individual_desk",
+    "individual": "individual_desk",
+    "solo": "individual_desk",
+    r"(personal desk|single seat|quiet corner)": "individual_desk",
+    r"(open seating|tables everywhere)": "open_table"
+}
+
+PRICE_MAP = {
+    "free": "free",
+    "cheap": "low",
+    "zero": "free", 
+    "affordable": "low",
+    "medium": "medium",
+    "pricey": "medium",
+    r"(don.?t\s+mind\s+price|any\s+budget)": "skip",
+    r"(okay with (any|whatever)\s+(cost|price))": "skip"
+}
+
+LATE_MAP = {
+    "open late": "yes",
+    "24/7": "yes",
+    "all day": "yes",
+    "late night": "yes",
+    "open 24": "yes",
+    "closes late": "yes",
+    "not late": "no",
+    "closes early": "no",
+    "midnight": "yes",
+    r"(night\s+owl|open\s+at\s+night|night\s+time)": "yes",
+    r"(closes\s+early|not\s+open\s+late)": "no"
+}
+
+
+# Preference attribute -> keyword map, in the order parse_preferences reports them
+PREFERENCE_MAPS = (
+    ("work_type", WORK_MAP),
+    ("outlet_pref", OUTLET_MAP),
+    ("vibe_pref", VIBE_MAP),
+    ("seating_pref", SEATING_MAP),
+    ("price_pref", PRICE_MAP),
+    ("open_late", LATE_MAP),
+)
+
+
+def _keyword_pattern(keyword):
+    """Regex for one key: the word-bounded literal or the key itself as a pattern."""
+    return rf"\b{re.escape(keyword)}\b|{keyword}"
+
+
+class KeywordMatcher:
+    """
+    Resolves several keyword maps against a text in one scan.
+
+    Plain keywords (the vast majority) are found by a single lookahead scan over
+    every literal of every map, longest literal first at each position; since all
+    literals found at one position are prefixes of the longest, those are derived
+    from a precomputed table. A plain keyword's word-bounded search is implied by
+    its raw substring search, so substring presence is the exact test.
+
+    Regex-valued keys are only searched when they could still beat the best plain
+    keyword found for their attribute, which keeps today's first-key-wins precedence.
+
+    Attributes
+    ----------
+    attributes : list of str
+        Attribute names, in the order of the maps given.
+    """
+
+    def __init__(self, preference_maps):
+        """
+        Compile the keyword maps.
+
+        Parameters
+        ----------
+        preference_maps : sequence of tuple
+            (attribute, keyword_map) pairs.
+        """
+        self.attributes = [attribute for attribute, _ in preference_maps]
+        self._values = [list(keyword_map.values()) for _, keyword_map in preference_maps]
+        self._regex_keys = [[] for _ in preference_maps]
+        literal_slots = {}
+
+        for attr_pos, (_, keyword_map) in enumerate(preference_maps):
+            for key_pos, keyword in enumerate(keyword_map):
+                if re.escape(keyword) == keyword:
+                    literal_slots.setdefault(keyword, []).append((attr_pos, key_pos))
+                else:
+                    self._regex_keys[attr_pos].append((key_pos, re.compile(_keyword_pattern(keyword))))
+
+        literals = sorted(literal_slots, key=len, reverse=True)
+        self._scanner = re.compile("(?=(" + "|".join(literals) + "))") if literals else None
+        # literal -> slots of every literal that is a prefix of it (itself included)
+        self._covers = {
+            literal: [slot for other in literals if literal.startswith(other) for slot in literal_slots[other]]
+            for literal in literals
+        }
+
+    def match(self, text):
+        """
+        Resolve every attribute for a text.
+
+        Parameters
+        ----------
+        text : str
+            The (lower-cased) text to search.
+
+        Returns
+        -------
+        dict
+            attribute -> matched value, or "skip" when no key matched.
+        """
+        best = [None] * len(self.attributes)
+        if self._scanner is not None:
+            for found in self._scanner.finditer(text):
+                for attr_pos, key_pos in self._covers[found.group(1)]:
+                    if best[attr_pos] is None or key_pos < best[attr_pos]:
+                        best[attr_pos] = key_pos
+
+        for attr_pos, regex_keys in enumerate(self._regex_keys):
+            for key_pos, pattern in regex_keys:
+                if best[attr_pos] is not None and key_pos > best[attr_pos]:
+                    break
+                if pattern.search(text):
+                    best[attr_pos] = key_pos
+                    break
+
+        return {
+            attribute: "skip" if key_pos is None else self._values[attr_pos][key_pos]
+            for attr_pos, (attribute, key_pos) in enumerate(zip(self.attributes, best))
+        }
+
+
+# Compiled once at import: one scan resolves all six attributes
+_MATCHER = KeywordMatcher(PREFERENCE_MAPS)
+
+
+@lru_cache(maxsize=32)
+def _single_map_matcher(items):
+    return KeywordMatcher((("value", dict(items)),))
+
 
 def match_value(text, keyword_map):
     """
@@ -16,10 +218,8 @@ def match_value(text, keyword_map):
     str
         The matched value if a keyword is found, otherwise "skip".
     """
-    for keyword, value in keyword_map.items():
-        if re.search(rf"\b{re.escape(keyword)}\b", text) or re.search(keyword, text):
-            return value
-    return "skip"
+    return _single_map_matcher(tuple(keyword_map.items())).match(text)["value"]
+
 
 def parse_preferences(user_input):
     """
@@ -36,100 +236,78 @@ def parse_preferences(user_input):
     dict
         A dictionary containing normalized preferences and a fallback_prompt flag.
     """
-    text = user_input.lower()
-
-    work_map = {
-        # Direct matches
-        "deep": "deep_focus",
-        "lock in": "deep_focus",
-        "quiet work": "deep_focus",
-        "focus": "deep_focus",
-        "deep focus": "deep_focus",
-        "casual": "casual",
-        "chill": "casual",
-        "group": "group",
-        "team": "group",
-        "collab": "group",
-        # Regex patterns
-        r"(deep\s+concentration|intense\s+focus|study\s+grind)": "deep_focus",
-        r"\b(chill(ed)?|relaxed?)\b": "casual",
-        r"(collaborative|team work|working together)": "group"
-    }
-
-    outlet_map = {
-        "no": "no",
-        "few": "limited",
-        "plug": "yes",
-        "socket": "yes",
-        "outlet": "yes",
-        "charging": "yes",
-        "no plug": "no",
-        "no outlet": "no",
-        "limited": "limited",
-        "charge": "yes",
-        r"(power outlet|charging spot|need.*power)": "yes",
-        r"(no\s+(power|plug|charging))": "no"
-    }
-
-    vibe_map = {
-        "quiet": "quiet",
-        "serene": "quiet",
-        "cozy": "cozy",
-        "aesthetic": "cozy",
-        "lively": "lively",
-        "busy": "lively",
-        "cool": "cozy",
-        r"(peaceful|relaxing|low noise)": "quiet",
-        r"(buzzy|buzzing|active)": "lively"
-    }
-
-    seating_map = {
-        "booth": "booth",
-        "table": "open_table",
-        "open table": "open_table",
-        "lounge": "lounge",
-        "couch": "lounge",
-        "desk": "individual_desk",
-        "individual": "individual_desk",
-        "solo": "individual_desk",
-        r"(personal desk|single seat|quiet corner)": "individual_desk",
-        r"(open seating|tables everywhere)": "open_table"
-    }
-
-    price_map = {
-        "free": "free",
-        "cheap": "low",
-        "zero": "free", 
-        "affordable": "low",
-        "medium": "medium",
-        "pricey": "medium",
-        r"(don.?t\s+mind\s+price|any\s+budget)": "skip",
-        r"(okay with (any|whatever)\s+(cost|price))": "skip"
-    }
-
-    late_map = {
-        "open late": "yes",
-        "24/7": "yes",
-        "all day": "yes",
-        "late night": "yes",
-        "open 24": "yes",
-        "closes late": "yes",
-        "not late": "no",
-        "closes early": "no",
-        "midnight": "yes",
-        r"(night\s+owl|open\s+at\s+night|night\s+time)": "yes",
-        r"(closes\s+early|not\s+open\s+late)": "no"
-    }
-
-    result = {
-        "work_type": match_value(text, work_map),
-        "outlet_pref": match_value(text, outlet_map),
-        "vibe_pref": match_value(text, vibe_map),
-        "seating_pref": match_value(text, seating_map),
-        "price_pref": match_value(text, price_map),
-        "open_late": match_value(text, late_map)
-    }
-
-    # Flag for when too many preferences are missing
-    result["fallback_prompt"] = list(result.values()).count("skip") >= 4
+    with metrics.timed("nl_parse"):
+        text = user_input.lower()
+
+        result = _MATCHER.match(text)
+
+        # Flag for when too many preferences are missing
+        result["fallback_prompt"] = list(result.values()).count("skip") >= 4
     return result
+
+
+def parse_preferences_batch(texts, processes=None, chunksize=256):
+    """
+    Lazily parse many natural language requests.
+
+    Texts are consumed from the iterable as results are requested, so generators
+    over very large files are never loaded into memory. With processes > 1 the
+    texts are parsed by a process pool in bounded windows (at most two windows
+    are in flight), and results are still yielded in input order.
+
+    Parameters
+    ----------
+    texts : iterable of str
+        The natural language strings to parse.
+    processes : int, optional
+        Number of worker processes; None or 1 parses in the calling process.
+    chunksize : int
+        Number of texts sent to a worker at a time in pool mode.
+
+    Yields
+    ------
+    dict
+        The result of parse_preferences for each text, in order.
+    """
+    if not processes or processes <= 1:
+        for text in texts:
+            yield parse_preferences(text)
+        return
+
+    import multiprocessing
+    texts = iter(texts)
+    window = processes * chunksize * 4
+    with multiprocessing.Pool(processes) as pool:
+        batch = list(islice(texts, window))
+        pending = pool.imap(parse_preferences, batch, chunksize) if batch else None
+        while pending is not None:
+            # Queue the next window before draining the current one to keep workers busy
+            batch = list(islice(texts, window))
+            queued = pool.imap(parse_preferences, batch, chunksize) if batch else None
+            yield from pending
+            pending = queued
+
+
+def _read_texts(lines, field):
+    """Yield one text per input line, taken from a JSON field when one is given."""
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        yield json.loads(line)[field] if field else line
+
+
+if __name__ == "__main__":
+    # Batch mode: parse one request per line (plain text or JSONL) into JSONL on stdout
+    parser = argparse.ArgumentParser(description="Parse natural language study spot requests in bulk")
+    parser.add_argument("input", help="input file with one request per line, or - for stdin")
+    parser.add_argument("--field", help="read the text from this field of JSONL input")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes for large files")
+    parser.add_argument("--chunksize", type=int, default=256, help="texts per worker task")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source:
+        texts = _read_texts(source, args.field)
+        for parsed in parse_preferences_batch(texts, args.processes, args.chunksize):
+            sys.stdout.write(json.dumps(parsed) + "\n")
@@ -0,0 +1,52 @@
+% =============================================
+% Profiling Helpers (loaded by prolog_profile.py)
+% =============================================
+% Only consulted when query profiling is turned on (STUDY_PROLOG_PROFILE=1 or
+% --profile). Each profiled query runs between study_profile_begin/1 and
+% study_profile_end/1, so the profiler only samples recommendation queries.
+
+:- use_module(library(statistics)).
+
+% study_profile_begin(-Inferences): read the inference counter, then start the profiler
+study_profile_begin(Inferences) :-
+    statistics(inferences, Inferences),
+    profiler(_, true).
+
+% study_profile_end(-Inferences): stop the profiler, then read the inference counter
+study_profile_end(Inferences) :-
+    profiler(_, false),
+    statistics(inferences, Inferences).
+
+% study_profile_reset: drop the profile data collected so far
+study_profile_reset :-
+    reset_profiler.
+
+% study_profile_rows(-Rows, -Seconds, -Samples): one row per profiled predicate,
+% [Predicate, Calls, Redos, Exits, SelfSeconds, TotalSeconds], where the times
+% split the sampled CPU time by the predicate's own ticks and its ticks
+% including callees
+study_profile_rows(Rows, Seconds, Samples) :-
+    profile_data(Data),
+    get_dict(summary, Data, Summary),
+    get_dict(time, Summary, Seconds),
+    get_dict(samples, Summary, Samples),
+    get_dict(ticks, Summary, Ticks),
+    get_dict(nodes, Data, Nodes),
+    findall([Name, Calls, Redos, Exits, Self, Total],
+            ( member(Node, Nodes),
+              get_dict(predicate, Node, Predicate),
+              format(atom(Name), '~q', [Predicate]),
+              get_dict(call, Node, Calls),
+              get_dict(redo, Node, Redos),
+              get_dict(exit, Node, Exits),
+              get_dict(ticks_self, Node, SelfTicks),
+              get_dict(ticks_siblings, Node, ChildTicks),
+              profile_seconds(SelfTicks, Ticks, Seconds, Self),
+              profile_seconds(SelfTicks + ChildTicks, Ticks, Seconds, Total)
+            ),
+            Rows).
+
+% profile_seconds(+NodeTicks, +AllTicks, +AllSeconds, -Seconds)
+profile_seconds(_, 0, _, 0.0) :- !.
+profile_seconds(NodeTicks, Ticks, AllSeconds, Seconds) :-
+    Seconds is NodeTicks / Ticks * AllSeconds.
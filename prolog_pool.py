@@ -0,0 +1,501 @@
+"""
+Prolog Engine Pool
+------------------
+A thread-safe pool of Prolog engines for serving queries concurrently.
+
+PySWIP embeds a single SWI-Prolog runtime per process and allows only one open
+query at a time (Prolog._queryIsOpen is class-level), so Prolog() objects in
+one process cannot run queries side by side. Each engine in this pool is
+therefore a worker process with its own runtime and the knowledge base
+preloaded. A request checks an engine out, runs its goals and returns it;
+checkout waits are bounded by a configurable timeout and recorded. Engines that
+do not start, or do not answer a query, within their own timeouts are killed
+and replaced, as are engines whose process has died.
+
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from knowledge_base import KB_PATH
+
+
+class PoolTimeout(Exception):
+    """Raised when no engine becomes free within the acquire timeout."""
+
+
+class EngineError(RuntimeError):
+    """Raised when a query fails inside an engine process, or the engine dies or stops answering."""
+
+
+def _engine_main(conn, kb_path, profile=False):
+    """
+    Entry point of an engine process: load the KB, then answer queries until told to stop.
+
+    Parameters
+    ----------
+    conn : multiprocessing.connection.Connection
+        The engine's end of the pipe to the pool.
+    kb_path : str
+        Path to the knowledge base to preload.
+    profile : bool
+        Run every query under the Prolog profiler (see prolog_profile).
+    """
+    try:
+        from pyswip import Prolog
+        from kb_compiler import consult_kb
+        import prolog_profile
+        from prolog_profile import run_goal
+
+        prolog = Prolog()
+        consult_kb(prolog, kb_path)
+        if profile:
+            prolog_profile.enable(prolog)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            command, payload = conn.recv()
+        except EOFError:
+            break
+        if command == "stop":
+            break
+        try:
+            if command == "profile":
+                conn.send(("ok", prolog_profile.report(reset=payload)))
+            elif isinstance(payload, str):
+                conn.send(("ok", list(prolog.query(payload))))
+            else:
+                conn.send(("ok", run_goal(payload)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class PrologEngineProcess:
+    """
+    One Prolog engine running in its own process.
+
+    Attributes
+    ----------
+    process : multiprocessing.Process
+        The worker process.
+    """
+
+    def __init__(self, context, kb_path=KB_PATH, profile=False, start_timeout=None):
+        """
+        Start the worker process and wait until its knowledge base is loaded.
+
+        Parameters
+        ----------
+        context : multiprocessing context
+            Context used to create the process and pipe.
+        kb_path : str
+            Path to the knowledge base to preload.
+        profile : bool
+            Profile every query the engine runs.
+        start_timeout : float, optional
+            Seconds to wait for the knowledge base to load; None waits forever.
+
+        Raises
+        ------
+        EngineError
+            If the worker could not load the knowledge base in time.
+        """
+        self._conn, child_conn = context.Pipe()
+        self._broken = False
+        self.process = context.Process(target=_engine_main, args=(child_conn, kb_path, profile), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        status, payload = self._receive(start_timeout)
+        if status != "ready":
+            self.close()
+            raise EngineError(f"Engine failed to start: {payload}")
+
+    def _receive(self, timeout=None):
+        """Wait for the engine's next message; an engine that does not answer in time is killed."""
+        try:
+            if timeout is not None and not self._conn.poll(timeout):
+                self.kill()
+                return "error", f"engine did not answer within {timeout:.2f}s"
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._broken = True
+            return "error", "engine process exited"
+
+    @property
+    def alive(self):
+        return not self._broken and self.process.is_alive()
+
+    def query(self, goal, timeout=None):
+        """
+        Run a query and return all of its solutions.
+
+        Parameters
+        ----------
+        goal : query_builder.Goal or str
+            A structured goal, or Prolog query text.
+        timeout : float, optional
+            Seconds to wait for the answer (see result).
+
+        Returns
+        -------
+        list of dict
+            The solutions, as returned by Prolog.query.
+
+        Raises
+        ------
+        EngineError
+            If the query raised an error, or the engine died or did not answer in time.
+        """
+        self.submit(goal)
+        return self.result(timeout)
+
+    def submit(self, goal, command="query"):
+        """
+        Send a query without waiting for it; collect the answer with result().
+
+        Other commands ("profile", with a reset flag as the payload) are answered the same way.
+        """
+        try:
+            self._conn.send((command, goal))
+        except (BrokenPipeError, OSError):
+            self._broken = True
+            raise EngineError("engine process exited") from None
+
+    def result(self, timeout=None):
+        """
+        Wait for the answer to the last submitted query (see query).
+
+        An engine that does not answer within timeout seconds is killed, since
+        its answer could still arrive and be taken for the next query's.
+        """
+        status, payload = self._receive(timeout)
+        if status != "ok":
+            raise EngineError(payload)
+        return payload
+
+    def kill(self):
+        """Terminate the worker process at once, e.g. when it is stuck in a query."""
+        self._broken = True
+        self.process.kill()
+        self.process.join(timeout=1)
+        self._conn.close()
+
+    def close(self):
+        """Stop the worker process."""
+        if self._conn.closed:
+            return
+        try:
+            self._conn.send(("stop", None))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+
+class PrologEnginePool:
+    """
+    A bounded pool of preloaded Prolog engines.
+
+    Engines are started on demand up to `size`, or all at once with warm();
+    once all are busy, callers wait up to the acquire timeout for one to be
+    returned. Engines that die, or are killed for not answering within the
+    start or query timeout, are replaced on a later checkout.
+
+    Attributes
+    ----------
+    size : int
+        Maximum number of engines.
+    acquire_timeout : float
+        Default seconds to wait for a free engine.
+    start_timeout : float or None
+        Seconds an engine may take to load the knowledge base.
+    query_timeout : float or None
+        Seconds an engine may take to answer a query or broadcast goal.
+    """
+
+    def __init__(self, size=4, kb_path=KB_PATH, acquire_timeout=5.0, profile=False, start_timeout=60.0,
+                 query_timeout=30.0):
+        self.size = size
+        self.kb_path = kb_path
+        self.acquire_timeout = acquire_timeout
+        self.profile = profile
+        self.start_timeout = start_timeout
+        self.query_timeout = query_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._engines = []
+        self._lock = threading.Lock()
+        self._started = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _start_engine(self):
+        """Start one more engine if the pool is not full; return it, or None when full."""
+        with self._lock:
+            if self._started >= self.size:
+                return None
+            self._started += 1
+        try:
+            engine = PrologEngineProcess(self._context, self.kb_path, self.profile, self.start_timeout)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+        with self._lock:
+            self._engines.append(engine)
+        return engine
+
+    def _discard(self, engine):
+        """Forget a dead engine so a replacement can be started."""
+        with self._lock:
+            self._started -= 1
+            if engine in self._engines:
+                self._engines.remove(engine)
+        engine.close()
+
+    def _checkout(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                engine = self._idle.get_nowait()
+            except queue.Empty:
+                engine = self._start_engine()
+                if engine is not None:
+                    return engine
+                try:
+                    engine = self._idle.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise PoolTimeout(f"No Prolog engine free after {timeout:.2f}s") from None
+            if engine.alive:
+                return engine
+            # Its process died while idle: drop it and start a replacement or take another
+            self._discard(engine)
+
+    def warm(self):
+        """
+        Start engines until the pool is full, so no request waits for a knowledge base to load.
+
+        Returns
+        -------
+        int
+            Number of engines started.
+
+        Raises
+        ------
+        EngineError
+            If an engine failed to start; the engines started before it are kept.
+        """
+        started = 0
+        while True:
+            engine = self._start_engine()
+            if engine is None:
+                return started
+            self._idle.put(engine)
+            started += 1
+
+    def acquire(self, timeout=None):
+        """
+        Check an engine out of the pool.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for a free engine; defaults to acquire_timeout.
+
+        Returns
+        -------
+        PrologEngineProcess
+            An engine that must be given back with release().
+
+        Raises
+        ------
+        PoolTimeout
+            If no engine became free in time.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            engine = self._checkout(timeout)
+        except PoolTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._waiting -= 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+        with self._lock:
+            self._acquired += 1
+        return engine
+
+    def release(self, engine):
+        """
+        Return an engine to the pool, dropping it if its process has died.
+
+        Parameters
+        ----------
+        engine : PrologEngineProcess
+            An engine obtained from acquire().
+        """
+        if engine.alive:
+            self._idle.put(engine)
+        else:
+            self._discard(engine)
+
+    @contextmanager
+    def engine(self, timeout=None):
+        """Context manager that checks an engine out and always gives it back."""
+        engine = self.acquire(timeout)
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+    def query(self, goal, timeout=None):
+        """
+        Run a query on a pooled engine.
+
+        Parameters
+        ----------
+        goal : query_builder.Goal or str
+            A structured goal, or Prolog query text.
+        timeout : float, optional
+            Seconds to wait for a free engine.
+
+        Returns
+        -------
+        list of dict
+            The query's solutions.
+
+        Raises
+        ------
+        PoolTimeout
+            If no engine became free in time.
+        EngineError
+            If the query failed, or the engine did not answer within query_timeout
+            (it is then killed and replaced).
+        """
+        with self.engine(timeout) as engine:
+            return engine.query(goal, self.query_timeout)
+
+    def broadcast(self, goal, timeout=None):
+        """
+        Run a goal on every started engine, e.g. to update their knowledge bases.
+
+        All started engines are checked out before the goal is sent to any of
+        them, so no query can run on an updated engine while another engine
+        still has the old state. Engines started later load the KB from disk.
+
+        Parameters
+        ----------
+        goal : query_builder.Goal or str
+            A structured goal, or Prolog query text.
+        timeout : float, optional
+            Seconds to wait for each engine to become free.
+
+        Returns
+        -------
+        int
+            Number of engines the goal ran on.
+
+        Raises
+        ------
+        PoolTimeout
+            If an engine was not returned in time; no engine has run the goal then.
+        EngineError
+            If the goal failed on an engine; the other engines have run it.
+        """
+        return len(self._on_every_engine("query", goal, timeout))
+
+    def profile_reports(self, reset=False, timeout=None):
+        """
+        Collect the query profile of every started engine (see prolog_profile.report).
+
+        Parameters
+        ----------
+        reset : bool
+            Clear each engine's profile after reading it.
+        timeout : float, optional
+            Seconds to wait for each engine to become free.
+
+        Returns
+        -------
+        list of dict
+            One report per engine; empty for engines started without profiling.
+        """
+        return self._on_every_engine("profile", reset, timeout)
+
+    def _on_every_engine(self, command, payload, timeout):
+        """Check out every started engine, send them all the command, and collect the answers."""
+        with self._lock:
+            count = len(self._engines)
+        engines = []
+        try:
+            for _ in range(count):
+                engines.append(self.acquire(timeout))
+            for engine in engines:
+                engine.submit(payload, command)
+            results, errors = [], []
+            for engine in engines:
+                try:
+                    results.append(engine.result(self.query_timeout))
+                except EngineError as e:
+                    errors.append(str(e))
+            if errors:
+                raise EngineError(f"{len(errors)} of {len(engines)} engines failed: {errors[0]}")
+        finally:
+            for engine in engines:
+                self.release(engine)
+        return results
+
+    def stats(self):
+        """
+        Return pool gauges and checkout wait times.
+
+        Returns
+        -------
+        dict
+            size, started, idle, in_use, waiting, acquired, timeouts and
+            wait_ms_avg / wait_ms_max / wait_ms_total.
+        """
+        with self._lock:
+            attempts = self._acquired + self._timeouts
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "started": self._started,
+                "idle": idle,
+                "in_use": self._started - idle,
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "wait_ms_total": self._wait_total * 1000,
+                "wait_ms_avg": self._wait_total * 1000 / attempts if attempts else 0.0,
+                "wait_ms_max": self._wait_max * 1000,
+            }
+
+    def close(self):
+        """Stop every engine process."""
+        with self._lock:
+            engines, self._engines = self._engines, []
+            self._started = 0
+        for engine in engines:
+            engine.close()
+        self._idle = queue.Queue()
@@ -0,0 +1,229 @@
+"""
+Prolog Query Profiling
+----------------------
+Opt-in profiling of the Prolog recommendation queries (recommend_spot/10 and
+ranked_study_spots/18, which calls score_spot/20 for every spot).
+
+When enabled, every Prolog query runs under SWI-Prolog's profiler:
+- per query: the inferences it took (from statistics/2) and its wall time,
+  aggregated per goal predicate, with the most recent queries kept
+- per predicate: calls, redos, exits, inferences (calls + redos, which is how
+  SWI-Prolog counts inferences) and sampled CPU time, self and including callees
+
+Turn it on with STUDY_PROLOG_PROFILE=1 (CLI, GUI and web app) or
+`python3 interface.py --profile`. The CLI prints the report when it exits;
+the web app serves it at /api/profile. Pooled engines profile their own
+queries and their reports are merged.
+
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import query_builder
+from query_builder import Goal
+
+
+ENABLED = os.environ.get("STUDY_PROLOG_PROFILE", "0") == "1"
+
+PROFILE_PL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiling.pl")
+
+# Most recent queries kept with their individual counts
+RECENT_QUERIES = 50
+
+_BEGIN = Goal("study_profile_begin", (), ("Inferences",))
+_END = Goal("study_profile_end", (), ("Inferences",))
+_RESET = Goal("study_profile_reset", (), ())
+_ROWS = Goal("study_profile_rows", (), ("Rows", "Seconds", "Samples"))
+
+_lock = threading.Lock()
+_enabled = False
+_overhead = 0
+_queries = {}
+_recent = deque(maxlen=RECENT_QUERIES)
+
+
+def enable(prolog):
+    """
+    Load the profiling helpers into an engine and profile its queries from now on.
+
+    Parameters
+    ----------
+    prolog : pyswip.Prolog
+        The engine the queries run on.
+    """
+    global _enabled, _overhead
+    prolog.consult(PROFILE_PL)
+    # Inferences counted between the two counter reads themselves, subtracted from every query
+    with query_builder.query_lock():
+        start = query_builder.run_goal(_BEGIN)[0]["Inferences"]
+        end = query_builder.run_goal(_END)[0]["Inferences"]
+    _overhead = max(int(end) - int(start), 0)
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def run_goal(goal):
+    """
+    Run a goal like query_builder.run_goal, under the profiler when profiling is enabled.
+
+    Parameters
+    ----------
+    goal : query_builder.Goal
+        The goal to run.
+
+    Returns
+    -------
+    list of dict
+        The goal's solutions.
+    """
+    if not _enabled:
+        return query_builder.run_goal(goal)
+    with query_builder.query_lock():
+        start = time.perf_counter()
+        before = query_builder.run_goal(_BEGIN)[0]["Inferences"]
+        try:
+            return query_builder.run_goal(goal)
+        finally:
+            after = query_builder.run_goal(_END)[0]["Inferences"]
+            _record(goal.name, max(int(after) - int(before) - _overhead, 0), time.perf_counter() - start)
+
+
+def _record(name, inferences, seconds):
+    with _lock:
+        stats = _queries.setdefault(name, {"count": 0, "inferences": 0, "inferences_max": 0, "seconds": 0.0})
+        stats["count"] += 1
+        stats["inferences"] += inferences
+        stats["inferences_max"] = max(stats["inferences_max"], inferences)
+        stats["seconds"] += seconds
+        _recent.append({"goal": name, "inferences": inferences, "seconds": seconds})
+
+
+def _predicate_rows():
+    solution = query_builder.run_goal(_ROWS)[0]
+    rows = [
+        {
+            "predicate": str(name),
+            "calls": int(calls),
+            "redos": int(redos),
+            "exits": int(exits),
+            "inferences": int(calls) + int(redos),
+            "seconds_self": float(self_seconds),
+            "seconds_total": float(total_seconds),
+        }
+        for name, calls, redos, exits, self_seconds, total_seconds in solution["Rows"]
+    ]
+    return rows, float(solution["Seconds"]), int(solution["Samples"])
+
+
+def report(reset=False):
+    """
+    Return the profile collected by this process's engine.
+
+    Parameters
+    ----------
+    reset : bool
+        Clear the collected data after reading it.
+
+    Returns
+    -------
+    dict
+        {"queries": {goal: {count, inferences, inferences_max, seconds}},
+        "recent": [...], "predicates": [...], "cpu_seconds": s, "samples": n};
+        empty when profiling is not enabled.
+    """
+    if not _enabled:
+        return {}
+    with query_builder.query_lock():
+        predicates, cpu_seconds, samples = _predicate_rows()
+        if reset:
+            query_builder.run_goal(_RESET)
+    with _lock:
+        queries = {name: dict(stats) for name, stats in _queries.items()}
+        recent = list(_recent)
+        if reset:
+            _queries.clear()
+            _recent.clear()
+    return {
+        "queries": queries,
+        "recent": recent,
+        "predicates": predicates,
+        "cpu_seconds": cpu_seconds,
+        "samples": samples,
+    }
+
+
+def merge_reports(reports):
+    """
+    Combine the reports of several engines into one.
+
+    Parameters
+    ----------
+    reports : iterable of dict
+        Reports as returned by report(); empty ones are skipped.
+
+    Returns
+    -------
+    dict
+        The summed report, with predicates sorted by self time (then inferences).
+    """
+    queries, predicates = {}, {}
+    merged = {"recent": [], "cpu_seconds": 0.0, "samples": 0, "engines": 0}
+    for engine_report in reports:
+        if not engine_report:
+            continue
+        merged["engines"] += 1
+        merged["cpu_seconds"] += engine_report["cpu_seconds"]
+        merged["samples"] += engine_report["samples"]
+        merged["recent"] += engine_report["recent"]
+        for name, stats in engine_report["queries"].items():
+            total = queries.setdefault(name, {"count": 0, "inferences": 0, "inferences_max": 0, "seconds": 0.0})
+            for key in ("count", "inferences", "seconds"):
+                total[key] += stats[key]
+            total["inferences_max"] = max(total["inferences_max"], stats["inferences_max"])
+        for row in engine_report["predicates"]:
+            total = predicates.setdefault(row["predicate"], dict(row, calls=0, redos=0, exits=0, inferences=0,
+                                                                 seconds_self=0.0, seconds_total=0.0))
+            for key in ("calls", "redos", "exits", "inferences", "seconds_self", "seconds_total"):
+                total[key] += row[key]
+    merged["queries"] = queries
+    merged["predicates"] = sorted(predicates.values(), key=lambda row: (-row["seconds_self"], -row["inferences"]))
+    return merged
+
+
+def format_report(merged, top=25):
+    """
+    Format a merged report as text.
+
+    Parameters
+    ----------
+    merged : dict
+        As returned by merge_reports.
+    top : int
+        Number of predicates to list.
+
+    Returns
+    -------
+    str
+    """
+    lines = [f"🔬 Prolog profile ({merged['engines']} engine(s), {merged['samples']} samples, "
+             f"{merged['cpu_seconds']:.3f}s CPU)"]
+    for name, stats in sorted(merged["queries"].items()):
+        count = stats["count"]
+        lines.append(
+            f"   {name}: {count} quer{'y' if count == 1 else 'ies'}, "
+            f"{stats['inferences'] / count:,.0f} inferences avg ({stats['inferences_max']:,} max), "
+            f"{stats['seconds'] * 1000 / count:.1f} ms avg"
+        )
+    lines.append(f"\n   {'Predicate':<36}{'Calls':>10}{'Redos':>10}{'Inferences':>12}{'Self s':>9}{'Total s':>9}")
+    for row in merged["predicates"][:top]:
+        lines.append(
+            f"   {row['predicate'][:35]:<36}{row['calls']:>10,}{row['redos']:>10,}{row['inferences']:>12,}"
+            f"{row['seconds_self']:>9.3f}{row['seconds_total']:>9.3f}"
+        )
+    return "\n".join(lines)
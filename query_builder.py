@@ -0,0 +1,362 @@
+"""
+Structured Query Builder
+------------------------
+One query layer for strict and fallback recommendations.
+
+User inputs (from the CLI, the GUI or the Flask form) are validated against the
+value sets of the knowledge base before any engine is called, and goals are
+built as a predicate name plus bound arguments instead of Prolog source text.
+Goals are run through the SWI-Prolog foreign interface directly, so no query
+goes through the Prolog reader and no form value can become part of a goal.
+
+"""
+
+import threading
+from collections import namedtuple
+
+from explanations import ATTRIBUTES
+from knowledge_base import (
+    ORIGINS, WORK_TYPES, OUTLET_OPTIONS, VIBES, SEATING_TYPES, PRICES, LATE_OPTIONS
+)
+
+
+class InvalidQuery(ValueError):
+    """Raised when user inputs fall outside the values the knowledge base knows."""
+
+
+class NormalizedInputs(dict):
+    """Inputs returned by normalize_inputs; kind records which query they were validated for."""
+
+    def __init__(self, inputs, kind):
+        super().__init__(inputs)
+        self.kind = kind
+
+
+# A goal to run: predicate name, input arguments (None leaves an argument
+# unbound) and the names of the output variables appended after them
+Goal = namedtuple("Goal", ["name", "args", "outputs"])
+
+# Allowed values for each preference; "skip" means no preference
+PREFERENCE_VALUES = {
+    "work_type": WORK_TYPES,
+    "outlet_pref": OUTLET_OPTIONS,
+    "vibe_pref": VIBES,
+    "seating_pref": SEATING_TYPES,
+    "price_pref": PRICES,
+    "open_late": LATE_OPTIONS,
+}
+EXPLAIN_MODES = ("short", "long")
+
+# Preference key and weight key for each attribute, in ATTRIBUTES order
+PREFERENCE_KEYS = ("max_minutes", "work_type", "outlet_pref", "vibe_pref", "seating_pref", "price_pref", "open_late")
+WEIGHT_FIELDS = tuple(f"{attr}_weight" for attr in ATTRIBUTES)
+
+# Weight field names used by the web form, mapped to the names used everywhere else
+FORM_ALIASES = {"work_type_weight": "work_weight", "open_late_weight": "late_weight"}
+
+DEFAULT_WEIGHT = 1
+DEFAULT_TOP_N = 3
+
+# Optional search area: a query point and a radius in metres (see geo_index)
+GEO_FIELDS = ("lat", "lon", "radius_m")
+
+
+def _as_int(field, value, minimum=0):
+    """Parse an integer field, rejecting anything that is not a whole number >= minimum."""
+    if isinstance(value, bool):
+        raise InvalidQuery(f"{field} must be a whole number")
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise InvalidQuery(f"{field} must be a whole number, got {value!r}") from None
+    if number < minimum:
+        raise InvalidQuery(f"{field} must be at least {minimum}, got {number}")
+    return number
+
+
+def _as_float(field, value, minimum, maximum):
+    """Parse a number field, rejecting values outside [minimum, maximum]."""
+    if isinstance(value, bool):
+        raise InvalidQuery(f"{field} must be a number")
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidQuery(f"{field} must be a number, got {value!r}") from None
+    if not minimum <= number <= maximum:
+        raise InvalidQuery(f"{field} must be between {minimum} and {maximum}, got {number}")
+    return number
+
+
+def normalize_location(lat, lon, radius_m=None):
+    """
+    Validate a query point and an optional search radius.
+
+    Parameters
+    ----------
+    lat, lon : float or str
+        Latitude and longitude in degrees.
+    radius_m : float or str, optional
+        Search radius in metres.
+
+    Returns
+    -------
+    tuple
+        (lat, lon, radius_m) as floats; radius_m stays None if not given.
+
+    Raises
+    ------
+    InvalidQuery
+        If a value is missing, not a number or out of range.
+    """
+    lat = _as_float("lat", lat, -90.0, 90.0)
+    lon = _as_float("lon", lon, -180.0, 180.0)
+    if radius_m is not None and radius_m != "":
+        radius_m = _as_float("radius_m", radius_m, 0.0, 50_000.0)
+    else:
+        radius_m = None
+    return lat, lon, radius_m
+
+
+def normalize_nearby(lat, lon, k=5, radius_m=None):
+    """
+    Validate a nearest-spot query.
+
+    Parameters
+    ----------
+    lat, lon : float or str
+        Query point in degrees.
+    k : int or str
+        Number of spots wanted; at least 1.
+    radius_m : float or str, optional
+        Search radius in metres.
+
+    Returns
+    -------
+    tuple
+        (lat, lon, k, radius_m).
+
+    Raises
+    ------
+    InvalidQuery
+        If a value is missing, malformed or out of range.
+    """
+    lat, lon, radius_m = normalize_location(lat, lon, radius_m)
+    return lat, lon, _as_int("k", k, 1), radius_m
+
+
+def _as_choice(field, value, choices, default):
+    """Lower-case a text field and check it against its allowed values."""
+    value = default if value is None else str(value).strip().lower()
+    if value == "":
+        value = default
+    if value not in choices:
+        raise InvalidQuery(f"Unknown {field} {value!r}; expected one of: {', '.join(choices)}")
+    return value
+
+
+def normalize_inputs(user_inputs, kind="fallback", origins=ORIGINS):
+    """
+    Validate user inputs and bring them into canonical form.
+
+    Text values are stripped and lower-cased, blank preferences become "skip",
+    numbers given as strings become ints, web form weight names are mapped to
+    their canonical names and missing weights get defaults. Fields that are not
+    part of the query (such as 'mode') are passed through unchanged. lat, lon
+    and radius_m restrict the query to spots within radius_m metres of a point;
+    they are all None when no area is given.
+
+    Parameters
+    ----------
+    user_inputs : dict
+        User preferences as collected by the CLI, GUI or web form.
+    kind : str
+        "strict" or "fallback"; only fallback queries need weights, explain_mode and top_n.
+    origins : sequence of str
+        Valid origins; the travel/3 origins by default, or the stations of the
+        transit graph when travel times come from transit_graph.
+
+    Returns
+    -------
+    NormalizedInputs
+        A new dict with validated, canonical values.
+
+    Raises
+    ------
+    InvalidQuery
+        If any value is outside the knowledge base's value sets.
+    """
+    inputs = dict(user_inputs)
+    for alias, field in FORM_ALIASES.items():
+        if alias in inputs:
+            value = inputs.pop(alias)
+            inputs.setdefault(field, value)
+
+    inputs["origin"] = _as_choice("origin", inputs.get("origin"), tuple(origins), "")
+    inputs["max_minutes"] = _as_int("max_minutes", inputs.get("max_minutes"))
+    for field, values in PREFERENCE_VALUES.items():
+        inputs[field] = _as_choice(field, inputs.get(field), values + ("skip",), "skip")
+
+    area = [inputs.get(field) for field in GEO_FIELDS]
+    if any(value is not None and value != "" for value in area):
+        inputs.update(zip(GEO_FIELDS, normalize_location(*area)))
+        if inputs["radius_m"] is None:
+            raise InvalidQuery("radius_m is required when searching near a point")
+    else:
+        inputs.update(dict.fromkeys(GEO_FIELDS))
+
+    if kind == "strict":
+        return NormalizedInputs(inputs, kind)
+
+    for pref_key, weight_key in zip(PREFERENCE_KEYS, WEIGHT_FIELDS):
+        weight = inputs.get(weight_key)
+        if weight is None or weight == "":
+            inputs[weight_key] = 0 if inputs[pref_key] == "skip" else DEFAULT_WEIGHT
+        else:
+            inputs[weight_key] = _as_int(weight_key, weight)
+
+    inputs["explain_mode"] = _as_choice("explain_mode", inputs.get("explain_mode"), EXPLAIN_MODES, "long")
+    top_n = inputs.get("top_n", DEFAULT_TOP_N)
+    inputs["top_n"] = None if top_n is None else _as_int("top_n", DEFAULT_TOP_N if top_n == "" else top_n, 1)
+    return NormalizedInputs(inputs, kind)
+
+
+def strict_goal(inputs):
+    """
+    Build the recommend_spot/10 goal for validated inputs.
+
+    Parameters
+    ----------
+    inputs : dict
+        Inputs returned by normalize_inputs(..., "strict").
+
+    Returns
+    -------
+    Goal
+        Solutions bind Name and Link.
+    """
+    args = (inputs["origin"], inputs["max_minutes"]) + tuple(inputs[field] for field in PREFERENCE_VALUES)
+    return Goal("recommend_spot", args, ("Name", "Link"))
+
+
+def fallback_goal(inputs):
+    """
+    Build the ranked_study_spots/18 goal for validated inputs.
+
+    Parameters
+    ----------
+    inputs : dict
+        Inputs returned by normalize_inputs(..., "fallback"). A top_n of None
+        leaves TopN unbound, which ranks every spot.
+
+    Returns
+    -------
+    Goal
+        The single solution binds Results to [Score, Name, Link, Explanation, States] rows.
+    """
+    args = []
+    for pref_key, weight_key in zip(PREFERENCE_KEYS, WEIGHT_FIELDS):
+        if pref_key == "max_minutes":
+            args += [inputs["origin"], inputs["max_minutes"], inputs[weight_key]]
+        else:
+            args += [inputs[pref_key], inputs[weight_key]]
+    args += [inputs["explain_mode"], inputs["top_n"]]
+    return Goal("ranked_study_spots", tuple(args), ("Results",))
+
+
+# Predicate handles looked up once per process, and a lock so threads sharing
+# the in-process engine never open two queries at once (reentrant, so a caller
+# can hold it across several goals; see query_lock)
+_predicates = {}
+_query_lock = threading.RLock()
+
+
+def query_lock():
+    """
+    Return the lock run_goal holds while a query is open.
+
+    Holding it runs several goals back to back with no other thread's query in
+    between (e.g. reading counters before and after a query).
+    """
+    return _query_lock
+
+
+def _to_python(value):
+    """Convert a term read back from Prolog into plain Python values."""
+    from pyswip.prolog import normalize_values
+
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if isinstance(value, list):
+        return [_to_python(v) for v in value]
+    return normalize_values(value)
+
+
+def run_goal(goal):
+    """
+    Run a goal on the in-process Prolog engine and return all of its solutions.
+
+    Arguments are put into term references directly (strings as atoms, ints as
+    integers) and the predicate is called with PL_open_query, so the goal is
+    never parsed from text.
+
+    Parameters
+    ----------
+    goal : Goal
+        The goal to run.
+
+    Returns
+    -------
+    list of dict
+        One dict per solution, mapping each output name to its value.
+
+    Raises
+    ------
+    pyswip.prolog.PrologError
+        If the goal raised a Prolog exception.
+    """
+    from pyswip.core import (
+        PL_Q_CATCH_EXCEPTION, PL_Q_NODEBUG, PL_close_query, PL_discard_foreign_frame,
+        PL_exception, PL_new_term_refs, PL_next_solution, PL_open_foreign_frame,
+        PL_open_query, PL_predicate,
+    )
+    from pyswip.easy import getTerm, putTerm
+    from pyswip.prolog import Prolog, PrologError
+
+    name, args, outputs = goal
+    arity = len(args) + len(outputs)
+
+    with _query_lock:
+        Prolog._init_prolog_thread()
+        predicate = _predicates.get((name, arity))
+        if predicate is None:
+            predicate = _predicates[(name, arity)] = PL_predicate(name, arity, None)
+
+        frame = PL_open_foreign_frame()
+        try:
+            terms = PL_new_term_refs(arity)
+            for i, value in enumerate(args):
+                if value is not None:
+                    putTerm(terms + i, value)
+
+            qid = PL_open_query(None, PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION, predicate, terms)
+            Prolog._queryIsOpen = True
+            try:
+                solutions = []
+                while PL_next_solution(qid):
+                    solutions.append({
+                        output: _to_python(getTerm(terms + len(args) + i))
+                        for i, output in enumerate(outputs)
+                    })
+                error = PL_exception(qid)
+                if error:
+                    raise PrologError(f"Caused by: '{name}/{arity}'. Returned: '{getTerm(error)}'.")
+            finally:
+                PL_close_query(qid)
+                Prolog._queryIsOpen = False
+        finally:
+            PL_discard_foreign_frame(frame)
+    return solutions
@@ -0,0 +1,252 @@
+"""
+Recommendation Log
+------------------
+Records every recommendation shown by the CLI, GUI and web app in
+recommendation_log.csv (timestamp, name, score, weight, explanation, states),
+without putting disk writes on the request path.
+
+- log() turns a query's results into CSV rows and puts them on a bounded
+  in-memory queue; it never blocks: when the queue is full the rows are
+  dropped and counted instead
+- a background thread takes whatever is queued, writes it in one batch and
+  flushes, so many concurrent requests share one write
+- the file is rotated when it reaches a size limit or after a time interval,
+  keeping numbered backups (recommendation_log.csv.1 is the newest)
+- close() (also run at interpreter exit) writes everything still queued
+
+For fallback results, score is the spot's score, weight the query's total
+weight (the highest possible score) and states the per-attribute match states
+(explanations.format_states); strict results leave all three empty.
+
+"""
+
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from explanations import format_states
+
+
+# Log file shipped with the project
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendation_log.csv")
+
+# user_inputs weight keys summed into the weight column
+WEIGHT_KEYS = (
+    "travel_weight", "work_weight", "outlet_weight", "vibe_weight",
+    "seating_weight", "price_weight", "late_weight",
+)
+
+# Explanation logged for a strict result, which matched every preference asked for
+STRICT_EXPLANATION = "Exact match."
+
+_STOP = object()
+
+
+def result_rows(user_inputs, results, timestamp=None):
+    """
+    Turn the results of one query into log rows.
+
+    Parameters
+    ----------
+    user_inputs : dict
+        The query's preferences, with "mode" and (for fallback) the weights.
+    results : list
+        Results as returned by interface.run_strict_query or run_fallback_query.
+    timestamp : str, optional
+        Row timestamp; defaults to now, to the second.
+
+    Returns
+    -------
+    list of list
+        [timestamp, name, score, weight, explanation, states] per recommended spot.
+    """
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if user_inputs.get("mode") == "strict":
+        return [[timestamp, res["Name"], "", "", STRICT_EXPLANATION, ""] for res in results]
+    weight = sum(int(user_inputs.get(key, 0)) for key in WEIGHT_KEYS)
+    rows = results[0]["Results"] if results else []
+    return [[timestamp, row[1], row[0], weight, row[3], format_states(row[4])] for row in rows]
+
+
+class RecommendationLogger:
+    """
+    Buffered CSV writer for recommendation rows, fed from any thread.
+
+    Attributes
+    ----------
+    path : str
+        The active log file.
+    max_bytes : int
+        Rotate once the file reaches this size (0 = never).
+    rotate_seconds : float
+        Rotate once the file has been written to for this long (0 = never).
+    backups : int
+        Rotated files to keep.
+    """
+
+    def __init__(self, path=LOG_PATH, max_bytes=10 * 1024 * 1024, rotate_seconds=0, backups=5,
+                 queue_size=10000, flush_interval=1.0):
+        """
+        Parameters
+        ----------
+        path : str
+            CSV file to append to.
+        max_bytes : int
+            Size limit before rotating; 0 disables size rotation.
+        rotate_seconds : float
+            Age limit before rotating; 0 disables time rotation.
+        backups : int
+            Number of rotated files to keep.
+        queue_size : int
+            Queries held in memory before new ones are dropped.
+        flush_interval : float
+            Longest time a queued row waits before it is written.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._counts = {"written": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+        self._opened_at = time.time()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="recommendation-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, user_inputs, results):
+        """
+        Queue the results of one query for writing; never blocks.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            The query's preferences.
+        results : list
+            The query's results (see result_rows).
+
+        Returns
+        -------
+        bool
+            False if the rows were dropped because the queue is full or the logger is closed.
+        """
+        rows = result_rows(user_inputs, results)
+        if not rows:
+            return True
+        if not self._closed:
+            try:
+                self._queue.put_nowait(rows)
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self._counts["dropped"] += len(rows)
+        return False
+
+    def stats(self):
+        """
+        Return the logger's counters.
+
+        Returns
+        -------
+        dict
+            Rows written and dropped, batches written, rotations, write errors
+            and queries waiting in the queue.
+        """
+        with self._lock:
+            return dict(self._counts, queued=self._queue.qsize())
+
+    def close(self, timeout=5.0):
+        """Write everything queued so far and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while True:  # take everything already queued, so it goes out in one write
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [rows for rows in batch if rows is not _STOP]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        rows = [row for rows in batch for row in rows]
+        try:
+            if self._should_rotate():
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8", newline="") as log_file:
+                csv.writer(log_file).writerows(rows)
+        except OSError as e:
+            with self._lock:
+                self._counts["errors"] += 1
+                self._counts["dropped"] += len(rows)
+            print(f"⚠️ Could not write recommendation log: {e}")
+            return
+        with self._lock:
+            self._counts["written"] += len(rows)
+            self._counts["batches"] += 1
+
+    def _should_rotate(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False  # nothing to rotate yet
+        if self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds:
+            return size > 0
+        return bool(self.max_bytes) and size >= self.max_bytes
+
+    def _rotate(self):
+        """Shift path.1 .. path.(backups-1) up by one and move the active file to path.1."""
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._opened_at = time.time()
+        with self._lock:
+            self._counts["rotations"] += 1
+
+
+def rotated_files(path=LOG_PATH):
+    """
+    Return the active log file and its rotated backups that exist, oldest first.
+
+    Parameters
+    ----------
+    path : str
+        The active log file.
+
+    Returns
+    -------
+    list of str
+    """
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
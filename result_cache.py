@@ -0,0 +1,176 @@
+"""
+Query Result Cache
+------------------
+A bounded, thread-safe LRU cache for strict and fallback query results.
+
+Entries are tagged with the content hash of the knowledge base they were
+computed from; a lookup made against a different KB version clears the cache
+before anything is served from it.
+
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# user_inputs fields that determine the result of each query kind
+STRICT_FIELDS = (
+    "origin", "max_minutes", "work_type", "outlet_pref", "vibe_pref",
+    "seating_pref", "price_pref", "open_late", "lat", "lon", "radius_m",
+)
+FALLBACK_FIELDS = STRICT_FIELDS + (
+    "travel_weight", "work_weight", "outlet_weight", "vibe_weight",
+    "seating_weight", "price_weight", "late_weight", "explain_mode", "top_n",
+)
+_NUMERIC_FIELDS = {"max_minutes", "top_n"} | {f for f in FALLBACK_FIELDS if f.endswith("_weight")}
+
+
+def kb_content_hash(path):
+    """
+    Hash the contents of a knowledge base file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the knowledge base.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest of the file bytes.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as kb_file:
+        for block in iter(lambda: kb_file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _normalize(field, value):
+    """Collapse equivalent spellings of a value, e.g. form strings "3" and 3."""
+    if field in _NUMERIC_FIELDS and isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def query_key(kind, engine, user_inputs):
+    """
+    Build the cache key for a query.
+
+    Parameters
+    ----------
+    kind : str
+        "strict" or "fallback".
+    engine : str
+        The engine answering the query.
+    user_inputs : dict
+        The query's user preferences.
+
+    Returns
+    -------
+    tuple
+        (kind, engine, value per relevant field).
+    """
+    fields = STRICT_FIELDS if kind == "strict" else FALLBACK_FIELDS
+    return (kind, engine) + tuple(_normalize(f, user_inputs.get(f)) for f in fields)
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with hit/miss/eviction counters.
+
+    Cached values are shared between callers and must be treated as read-only.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of entries; 0 disables caching.
+    version : str or None
+        KB version the current entries were computed from.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get_or_compute(self, key, compute, version=None):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key, e.g. from query_key.
+        compute : callable
+            Zero-argument function producing the value; exceptions are not cached.
+        version : str, optional
+            Current KB version; a change clears every entry first.
+
+        Returns
+        -------
+        object
+            The cached or freshly computed value.
+        """
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        if self.maxsize <= 0:
+            return value
+
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns
+        -------
+        dict
+            size, maxsize, hits, misses, evictions, invalidations and hit_rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
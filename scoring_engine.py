@@ -0,0 +1,307 @@
+"""
+Vectorized Fallback Scoring Engine
+----------------------------------
+A NumPy implementation of the fallback ranking done by score_spot/20 and
+find_top_study_spots/18 in study_system.pl.
+
+The knowledge base is loaded once into per-attribute arrays:
+- travel bands per origin (one row of band codes per origin)
+- multi-hot work/vibe/seating, packed as one bitmask per spot
+- categorical outlets/price/open_late codes
+
+The arrays can also be mapped from a columnar snapshot (kb_columns.py)
+instead of being built from the facts. Every spot is then scored with one
+masked weighted sum, and results are returned
+in the same (score, name, link, explanation) shape as interface.run_fallback_query.
+A query can be limited to a subset of candidate spots (e.g. those near a point,
+from geo_index), in which case only those spots are scored.
+
+"""
+
+import numpy as np
+
+from explanations import ATTRIBUTES, MATCHED, MISSED, SKIPPED, build_explanation
+from knowledge_base import (
+    KB_PATH, ORIGINS, TRAVEL_BANDS, WORK_TYPES, OUTLET_OPTIONS, VIBES,
+    SEATING_TYPES, PRICES, LATE_OPTIONS, load_spots, map_travel_times
+)
+from transit_graph import UNREACHABLE
+
+
+# user_inputs weight key for each attribute, in ATTRIBUTES order
+WEIGHT_KEYS = tuple(f"{attr}_weight" for attr in ATTRIBUTES)
+
+
+def _vocabulary(defaults, values):
+    """Map every known value to a small integer code, keeping the default order first."""
+    vocab = {value: code for code, value in enumerate(defaults)}
+    for value in values:
+        vocab.setdefault(value, len(vocab))
+    return vocab
+
+
+class VectorizedScorer:
+    """
+    Scores every study spot at once for a fallback query.
+
+    Attributes
+    ----------
+    keys, names, links : list of str
+        Spot identifiers, display names and Naver links, in study_spot/1 order.
+    travel : np.ndarray
+        Band codes, shape (len(ORIGINS), n_spots).
+    work, vibe, seating : np.ndarray
+        Multi-hot bitmasks, one uint32 per spot.
+    outlets, price, open_late : np.ndarray
+        Categorical codes, one per spot.
+    """
+
+    def __init__(self, spots):
+        """
+        Build the attribute arrays from spot records.
+
+        Parameters
+        ----------
+        spots : list of dict
+            Spot records as returned by knowledge_base.load_spots.
+        """
+        self.keys = [s["id"] for s in spots]
+        self.names = [s["name"] for s in spots]
+        self.links = [s["link"] for s in spots]
+
+        self.band_codes = _vocabulary(TRAVEL_BANDS, (s["travel"][o] for s in spots for o in ORIGINS))
+        self.travel = np.array(
+            [[self.band_codes[s["travel"][o]] for s in spots] for o in ORIGINS], dtype=np.int16
+        ).reshape(len(ORIGINS), len(spots))
+
+        self.work_codes = _vocabulary(WORK_TYPES, (v for s in spots for v in s["work"]))
+        self.vibe_codes = _vocabulary(VIBES, (v for s in spots for v in s["vibe"]))
+        self.seating_codes = _vocabulary(SEATING_TYPES, (v for s in spots for v in s["seating"]))
+        self.work = self._multi_hot(spots, "work", self.work_codes)
+        self.vibe = self._multi_hot(spots, "vibe", self.vibe_codes)
+        self.seating = self._multi_hot(spots, "seating", self.seating_codes)
+
+        self.outlet_codes = _vocabulary(OUTLET_OPTIONS, (s["outlets"] for s in spots))
+        self.price_codes = _vocabulary(PRICES, (s["price"] for s in spots))
+        self.late_codes = _vocabulary(LATE_OPTIONS, (s["open_late"] for s in spots))
+        self.outlets = np.array([self.outlet_codes[s["outlets"]] for s in spots], dtype=np.int16)
+        self.price = np.array([self.price_codes[s["price"]] for s in spots], dtype=np.int16)
+        self.open_late = np.array([self.late_codes[s["open_late"]] for s in spots], dtype=np.int16)
+
+        # Rank of each name in standard order, used to break score ties the way
+        # sort/2 + reverse/2 does in find_top_study_spots/18
+        self.name_rank = np.empty(len(spots), dtype=np.int64)
+        self.name_rank[sorted(range(len(spots)), key=self.names.__getitem__)] = np.arange(len(spots))
+
+    @classmethod
+    def from_kb(cls, path=KB_PATH):
+        """
+        Load a knowledge base file and build a scorer from it.
+
+        Parameters
+        ----------
+        path : str
+            Path to the Prolog knowledge base.
+
+        Returns
+        -------
+        VectorizedScorer
+        """
+        return cls(load_spots(path))
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Build a scorer on the arrays of a memory-mapped columnar snapshot.
+
+        Nothing is parsed or copied: the attribute arrays are views of the
+        snapshot, and names and links are decoded only for returned spots.
+
+        Parameters
+        ----------
+        columns : kb_columns.KBColumns
+            An open snapshot.
+
+        Returns
+        -------
+        VectorizedScorer
+        """
+        scorer = cls.__new__(cls)
+        scorer.keys = columns.strings("keys")
+        scorer.names = columns.strings("names")
+        scorer.links = columns.strings("links")
+        scorer.band_codes = columns.codes("travel")
+        scorer.work_codes = columns.codes("work")
+        scorer.vibe_codes = columns.codes("vibe")
+        scorer.seating_codes = columns.codes("seating")
+        scorer.outlet_codes = columns.codes("outlets")
+        scorer.price_codes = columns.codes("price")
+        scorer.late_codes = columns.codes("open_late")
+        for attribute in ("travel", "work", "vibe", "seating", "outlets", "price", "open_late", "name_rank"):
+            setattr(scorer, attribute, columns.column(attribute))
+        return scorer
+
+    @staticmethod
+    def _multi_hot(spots, attribute, codes):
+        if len(codes) > 32:
+            raise ValueError(f"Too many distinct {attribute} values for a 32-bit mask")
+        masks = [sum(1 << codes[v] for v in set(s[attribute])) for s in spots]
+        return np.array(masks, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _match_matrix(self, user_inputs, travel_minutes=None, candidates=None):
+        """
+        Compute the per-attribute match states for every spot.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            User preferences.
+        travel_minutes : np.ndarray, optional
+            Exact minutes from the origin to every spot (a TravelMatrix row).
+            When given, travel matches if it is within max_minutes; otherwise
+            the travel/3 band must equal the band of max_minutes.
+        candidates : np.ndarray, optional
+            Indices of the spots to evaluate; all spots when None.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (len(ATTRIBUTES), n) of MATCHED/MISSED/SKIPPED, with one
+            column per candidate (or per spot).
+        """
+        def take(values):
+            return values if candidates is None else values[candidates]
+
+        n = len(self) if candidates is None else len(candidates)
+        states = np.full((len(ATTRIBUTES), n), MISSED, dtype=np.int8)
+
+        # Travel is never skipped: the spot must be reachable within max_minutes,
+        # or sit in the same band as max_minutes when only bands are known
+        origin = user_inputs["origin"]
+        if travel_minutes is not None:
+            minutes = take(travel_minutes)
+            states[0][(minutes <= int(user_inputs["max_minutes"])) & (minutes != UNREACHABLE)] = MATCHED
+        elif origin in ORIGINS:
+            band = self.band_codes.get(map_travel_times(int(user_inputs["max_minutes"])))
+            states[0][take(self.travel[ORIGINS.index(origin)]) == band] = MATCHED
+
+        multi_hot = (
+            (1, "work_type", self.work, self.work_codes),
+            (3, "vibe_pref", self.vibe, self.vibe_codes),
+            (4, "seating_pref", self.seating, self.seating_codes),
+        )
+        for row, key, masks, codes in multi_hot:
+            pref = user_inputs[key]
+            if pref == "skip":
+                states[row] = SKIPPED
+            elif pref in codes:
+                states[row][(take(masks) & np.uint32(1 << codes[pref])) != 0] = MATCHED
+
+        categorical = (
+            (2, "outlet_pref", self.outlets, self.outlet_codes),
+            (5, "price_pref", self.price, self.price_codes),
+            (6, "open_late", self.open_late, self.late_codes),
+        )
+        for row, key, values, codes in categorical:
+            pref = user_inputs[key]
+            if pref == "skip":
+                states[row] = SKIPPED
+            elif pref in codes:
+                states[row][take(values) == codes[pref]] = MATCHED
+
+        return states
+
+    def score(self, user_inputs, travel_minutes=None, candidates=None):
+        """
+        Score every spot for a fallback query.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            User preferences and weights, as collected by interface.get_user_input.
+        travel_minutes : np.ndarray, optional
+            Exact minutes from the origin to every spot (see _match_matrix).
+        candidates : np.ndarray, optional
+            Indices of the spots to score; all spots when None.
+
+        Returns
+        -------
+        tuple
+            (scores, states): an int64 array of scores and the match state matrix,
+            one entry per candidate (or per spot).
+        """
+        states = self._match_matrix(user_inputs, travel_minutes, candidates)
+        weights = np.array([int(user_inputs[key]) for key in WEIGHT_KEYS], dtype=np.int64)
+        scores = weights @ (states == MATCHED)
+        return scores, states
+
+    def top_k(self, scores, k=None, candidates=None):
+        """
+        Select the indices of the k best spots, best first.
+
+        Spots are ranked by score and then by name (both descending), using a
+        single unique key so the selection is deterministic.
+
+        Parameters
+        ----------
+        scores : np.ndarray
+            Score per spot, as returned by score.
+        k : int, optional
+            Number of spots to keep; None keeps every spot.
+        candidates : np.ndarray, optional
+            Spot index of each score, when only candidates were scored.
+
+        Returns
+        -------
+        np.ndarray
+            Positions in `scores` in rank order.
+        """
+        n = len(scores)
+        name_rank = self.name_rank if candidates is None else self.name_rank[candidates]
+        key = scores.astype(np.int64) * max(len(self), 1) + name_rank
+        if k is not None and int(k) < n:
+            k = max(int(k), 0)
+            if k == 0:
+                return np.empty(0, dtype=np.intp)
+            candidates = np.argpartition(key, n - k)[n - k:]
+            return candidates[np.argsort(key[candidates])[::-1]]
+        return np.argsort(key)[::-1]
+
+    def find_top_study_spots(self, user_inputs, travel_minutes=None, candidates=None):
+        """
+        Rank spots like ranked_study_spots/18.
+
+        Results are ordered by descending score, ties by descending name, and
+        explanations are only built for the spots that are returned. With a
+        top_n only the best top_n candidates are selected (np.argpartition) and
+        sorted, instead of sorting every spot.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            User preferences, weights, 'explain_mode' and 'top_n' (None for all).
+        travel_minutes : np.ndarray, optional
+            Exact minutes from the origin to every spot (see _match_matrix).
+        candidates : np.ndarray, optional
+            Indices of the spots to rank; all spots when None.
+
+        Returns
+        -------
+        list of dict
+            A single dict with key "Results" mapped to [score, name, link, explanation, matches]
+            lists, where matches holds one MATCHED/MISSED/SKIPPED state per attribute.
+        """
+        scores, states = self.score(user_inputs, travel_minutes, candidates)
+        order = self.top_k(scores, user_inputs.get("top_n"), candidates)
+        spots = order if candidates is None else candidates[order]
+
+        explain_mode = user_inputs.get("explain_mode", "long")
+        results = [
+            [int(scores[i]), self.names[spot], self.links[spot], build_explanation(states[:, i], explain_mode),
+             tuple(states[:, i].tolist())]
+            for i, spot in zip(order, spots)
+        ]
+        return [{"Results": results}]
@@ -0,0 +1,225 @@
+"""
+Startup Time Report
+-------------------
+Measures how long each entry point of the project takes to import, and where
+that time goes, so short-lived runs (CLI --help, test collection, one-off
+scripts) stay fast.
+
+Every entry point is imported in fresh interpreters under `python -X importtime`:
+- import time: wall time of the import statement, median over the runs
+- process time: interpreter start to exit, median over the runs
+- breakdown: self import time per top-level module, leaving out what a bare
+  interpreter imports anyway
+- first query (with --first-query, for entry points that import interface):
+  time of one fallback query right after the import, which is where the
+  engines now load, and the modules that query imported
+
+Web entry points are imported with STUDY_POOL_SIZE=0 unless it is set, so
+engine pool processes are not counted. With --budget the report exits with
+status 1 when an entry point's import takes longer than the budget.
+
+Usage:
+$ python3 startup_report.py
+$ python3 startup_report.py cli web --runs 10 --first-query
+$ python3 startup_report.py --budget 150 --json
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Entry point -> (directory put first on sys.path, module imported)
+ENTRY_POINTS = {
+    "cli": (PROJECT_DIR, "interface"),
+    "gui": (PROJECT_DIR, "gui_app"),
+    "web": (os.path.join(PROJECT_DIR, "api"), "index"),
+    "asgi": (os.path.join(PROJECT_DIR, "api"), "asgi"),
+    "test_runner": (PROJECT_DIR, "test_runner"),
+    "nl_parser": (PROJECT_DIR, "natural_language_parser"),
+    "benchmark": (PROJECT_DIR, "benchmark"),
+    "log_analytics": (PROJECT_DIR, "log_analytics"),
+    "kb_store": (PROJECT_DIR, "kb_store"),
+}
+
+# Query timed by --first-query (the strict test case of test_runner.py, in fallback mode)
+FIRST_QUERY = {
+    "origin": "sinseol", "max_minutes": 12, "work_type": "casual", "outlet_pref": "yes",
+    "vibe_pref": "cozy", "seating_pref": "individual_desk", "price_pref": "medium", "open_late": "yes",
+    "travel_weight": 1, "work_weight": 1, "outlet_weight": 1, "vibe_weight": 1,
+    "seating_weight": 1, "price_weight": 1, "late_weight": 1,
+    "explain_mode": "long", "top_n": 3,
+}
+
+# Run in the child: import the module, then optionally run one query; timings go to stdout as JSON
+_IMPORTED = "startup_report: imported"
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import {module}
+timings = {{"import_ms": (time.perf_counter() - start) * 1000}}
+sys.stderr.write({marker!r} + "\\n")
+if {first_query!r} and "interface" in sys.modules:
+    start = time.perf_counter()
+    sys.modules["interface"].run_fallback_query({query!r})
+    timings["first_query_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output.
+
+    Parameters
+    ----------
+    stderr : str
+        The interpreter's standard error, or the part of it to parse.
+
+    Returns
+    -------
+    dict
+        Module name -> self import time in microseconds.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].strip()
+        modules[name] = modules.get(name, 0) + int(fields[0])
+    return modules
+
+
+def _run(code, env):
+    """Run code in a fresh interpreter under -X importtime; return (seconds, stdout, stderr)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          env=env, cwd=PROJECT_DIR)
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+    return seconds, proc.stdout, proc.stderr
+
+
+def measure(entry, runs=5, first_query=False, top=10, env=None):
+    """
+    Measure the startup of one entry point.
+
+    Parameters
+    ----------
+    entry : str
+        A key of ENTRY_POINTS.
+    runs : int
+        Fresh interpreters to time; medians are reported.
+    first_query : bool
+        Also time one fallback query after the import.
+    top : int
+        Top-level modules listed in the breakdown.
+    env : dict, optional
+        Environment of the child interpreters; defaults to os.environ with
+        STUDY_POOL_SIZE=0 unless it is set.
+
+    Returns
+    -------
+    dict
+        import_ms, process_ms and first_query_ms (medians), plus "breakdown"
+        and "first_query_breakdown": [{"module", "ms"}] by self time, largest
+        first; or {"error": ...}.
+    """
+    path, module = ENTRY_POINTS[entry]
+    if env is None:
+        env = dict(os.environ)
+        env.setdefault("STUDY_POOL_SIZE", "0")
+    code = _CHILD.format(path=path, module=module, marker=_IMPORTED, first_query=first_query,
+                         query=dict(FIRST_QUERY, mode="fallback"))
+    try:
+        _, _, bare = _run("pass", env)
+        samples = []
+        for _ in range(max(runs, 1)):
+            seconds, stdout, stderr = _run(code, env)
+            samples.append(dict(json.loads(stdout.strip().splitlines()[-1]), process_ms=seconds * 1000))
+    except RuntimeError as e:
+        return {"module": module, "error": str(e)}
+
+    report = {"module": module, "runs": len(samples)}
+    for key in ("import_ms", "process_ms", "first_query_ms"):
+        values = [sample[key] for sample in samples if key in sample]
+        if values:
+            report[key] = statistics.median(values)
+    baseline = parse_importtime(bare)
+    imported, _, queried = stderr.partition(_IMPORTED)
+    report["breakdown"] = _top_packages(parse_importtime(imported), baseline, top)
+    if first_query:
+        report["first_query_breakdown"] = _top_packages(parse_importtime(queried), baseline, top)
+    return report
+
+
+def _top_packages(modules, baseline, top):
+    """Sum self import times per top-level package, leaving out modules in baseline."""
+    grouped = {}
+    for name, micros in modules.items():
+        if name not in baseline:
+            package = name.split(".")[0]
+            grouped[package] = grouped.get(package, 0) + micros
+    return [
+        {"module": name, "ms": micros / 1000}
+        for name, micros in sorted(grouped.items(), key=lambda item: -item[1])[:top]
+    ]
+
+
+def print_report(reports, budget_ms=None):
+    """Print startup reports as text."""
+    for entry, report in reports.items():
+        if "error" in report:
+            print(f"❌ {entry} ({report['module']}): {report['error']}")
+            continue
+        over = budget_ms is not None and report["import_ms"] > budget_ms
+        line = (f"{'⚠️' if over else '⏱'} {entry} ({report['module']}): import {report['import_ms']:.1f} ms, "
+                f"process {report['process_ms']:.1f} ms")
+        if "first_query_ms" in report:
+            line += f", first query {report['first_query_ms']:.1f} ms"
+        print(line + f"  (median of {report['runs']})")
+        for row in report["breakdown"]:
+            print(f"   {row['module']:<28}{row['ms']:>8.1f} ms")
+        if report.get("first_query_breakdown"):
+            print("   imported by the first query:")
+            for row in report["first_query_breakdown"]:
+                print(f"      {row['module']:<25}{row['ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import time per entry point")
+    parser.add_argument("entries", nargs="*", metavar="ENTRY",
+                        help=f"entry points to measure (default: all of {', '.join(ENTRY_POINTS)})")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point")
+    parser.add_argument("--top", type=int, default=10, help="modules listed per entry point")
+    parser.add_argument("--first-query", action="store_true", help="also time the first fallback query")
+    parser.add_argument("--budget", type=float, help="fail when an import takes longer than this (ms)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    unknown = [entry for entry in args.entries if entry not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point(s) {', '.join(unknown)}; choose from {', '.join(ENTRY_POINTS)}")
+
+    reports = {
+        entry: measure(entry, args.runs, args.first_query, args.top)
+        for entry in args.entries or ENTRY_POINTS
+    }
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_report(reports, args.budget)
+    if args.budget is not None and any(report.get("import_ms", 0) > args.budget for report in reports.values()):
+        sys.exit(1)
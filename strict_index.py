@@ -0,0 +1,215 @@
+"""
+Strict-Mode Bitset Index
+------------------------
+An inverted index over the knowledge base for strict (exact match) queries.
+
+Every (attribute, value) pair maps to a bitmask of the spots that have it, with
+one mask per (origin, time band) for travel. A strict query is the AND of seven
+masks, so its cost does not depend on how the spots are enumerated in Prolog.
+Bit i stands for the i-th spot in study_spot/1 order.
+
+With exact travel times from transit_graph, the travel mask is built from the
+origin's row of minutes instead of the band masks. A set of candidate spots
+(e.g. those near a point, from geo_index) is ANDed in as one more mask.
+
+The masks can also be built straight from the columns of a columnar snapshot
+(kb_columns.py) without parsing the knowledge base.
+
+"""
+
+import numpy as np
+
+from knowledge_base import KB_PATH, ORIGINS, load_spots, map_travel_times
+from transit_graph import UNREACHABLE
+
+
+# user_inputs key -> spot attribute, in recommend_spot/10 goal order
+_STRICT_KEYS = (
+    ("work_type", "work"),
+    ("outlet_pref", "outlets"),
+    ("vibe_pref", "vibe"),
+    ("seating_pref", "seating"),
+    ("price_pref", "price"),
+    ("open_late", "open_late"),
+)
+
+
+def _bitmask(flags):
+    """Pack a boolean array into an int with bit i set where flags[i] is True."""
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+class StrictIndex:
+    """
+    Bitset inverted index answering recommend_spot/10 queries.
+
+    Attributes
+    ----------
+    names, links : list of str
+        Display names and Naver links, indexed by bit position.
+    travel : dict
+        (origin, band) -> bitmask of spots in that band from that origin.
+    masks : dict
+        attribute -> {value: bitmask} for work, outlets, vibe, seating, price and open_late.
+    """
+
+    def __init__(self, spots):
+        """
+        Build the masks from spot records.
+
+        Parameters
+        ----------
+        spots : list of dict
+            Spot records as returned by knowledge_base.load_spots.
+        """
+        self.names = [s["name"] for s in spots]
+        self.links = [s["link"] for s in spots]
+
+        # Collect the spot positions of every key first and pack each mask once:
+        # OR-ing bits into a growing int per spot would copy it every time
+        travel = {}
+        positions = {attr: {} for _, attr in _STRICT_KEYS}
+        for i, spot in enumerate(spots):
+            for origin in ORIGINS:
+                travel.setdefault((origin, spot["travel"][origin]), []).append(i)
+            for _, attr in _STRICT_KEYS:
+                values = spot[attr] if isinstance(spot[attr], list) else [spot[attr]]
+                for value in values:
+                    positions[attr].setdefault(value, []).append(i)
+
+        def mask(indices):
+            flags = np.zeros(len(spots), dtype=bool)
+            flags[indices] = True
+            return _bitmask(flags)
+
+        self.travel = {key: mask(indices) for key, indices in travel.items()}
+        self.masks = {
+            attr: {value: mask(indices) for value, indices in by_value.items()}
+            for attr, by_value in positions.items()
+        }
+
+    @classmethod
+    def from_kb(cls, path=KB_PATH):
+        """
+        Load a knowledge base file and index it.
+
+        Parameters
+        ----------
+        path : str
+            Path to the Prolog knowledge base.
+
+        Returns
+        -------
+        StrictIndex
+        """
+        return cls(load_spots(path))
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Build the masks from the columns of a memory-mapped columnar snapshot.
+
+        Each mask is one vectorized comparison over a column, so no spot
+        records are created.
+
+        Parameters
+        ----------
+        columns : kb_columns.KBColumns
+            An open snapshot.
+
+        Returns
+        -------
+        StrictIndex
+        """
+        index = cls.__new__(cls)
+        index.names = columns.strings("names")
+        index.links = columns.strings("links")
+        travel = columns.column("travel")
+        index.travel = {
+            (origin, band): _bitmask(travel[row] == code)
+            for row, origin in enumerate(columns.origins)
+            for band, code in columns.codes("travel").items()
+        }
+        index.masks = {}
+        for _, attr in _STRICT_KEYS:
+            values = columns.column(attr)
+            if attr in ("work", "vibe", "seating"):
+                index.masks[attr] = {
+                    value: _bitmask((values & np.uint32(1 << code)) != 0)
+                    for value, code in columns.codes(attr).items()
+                }
+            else:
+                index.masks[attr] = {value: _bitmask(values == code) for value, code in columns.codes(attr).items()}
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def match_mask(self, user_inputs, travel_minutes=None, candidates=None):
+        """
+        AND together the masks for a strict query.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            User preferences with origin, max_minutes and the six attribute choices.
+        travel_minutes : np.ndarray, optional
+            Exact minutes from the origin to every spot (a TravelMatrix row); spots
+            within max_minutes match. Without it the travel/3 bands are used.
+        candidates : np.ndarray, optional
+            Indices of the only spots allowed to match.
+
+        Returns
+        -------
+        int
+            Bitmask of the spots matching every preference.
+
+        Raises
+        ------
+        ValueError
+            If the origin is unknown, like the invalid_origin error in recommend_spot/10.
+        """
+        max_minutes = int(user_inputs["max_minutes"])
+        if travel_minutes is not None:
+            mask = _bitmask((travel_minutes <= max_minutes) & (travel_minutes != UNREACHABLE))
+        else:
+            origin = user_inputs["origin"]
+            if origin not in ORIGINS:
+                raise ValueError(f"invalid_origin({origin})")
+            mask = self.travel.get((origin, map_travel_times(max_minutes)), 0)
+        if candidates is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[candidates] = True
+            mask &= _bitmask(allowed)
+        for key, attr in _STRICT_KEYS:
+            if not mask:
+                break
+            mask &= self.masks[attr].get(user_inputs[key], 0)
+        return mask
+
+    def recommend_spot(self, user_inputs, travel_minutes=None, candidates=None):
+        """
+        Return every spot matching all preferences exactly.
+
+        Parameters
+        ----------
+        user_inputs : dict
+            User preferences, as for interface.run_strict_query.
+        travel_minutes : np.ndarray, optional
+            Exact minutes from the origin to every spot (see match_mask).
+        candidates : np.ndarray, optional
+            Indices of the only spots allowed to match (see match_mask).
+
+        Returns
+        -------
+        list of dict
+            One {"Name": ..., "Link": ...} dict per match, in study_spot/1 order.
+        """
+        mask = self.match_mask(user_inputs, travel_minutes, candidates)
+        results = []
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            results.append({"Name": self.names[i], "Link": self.links[i]})
+            mask ^= low
+        return results
@@ -1,3 +1,25 @@
+% -----------------------------------------------------------------------------
+%     Dynamic Fact Declarations
+%     Spot facts are dynamic so that kb_reload.py can retract and assert only
+%     the facts that changed when this file is edited, without a re-consult
+% -----------------------------------------------------------------------------
+:- dynamic study_spot/1.
+:- dynamic study_spot_name/2.
+:- dynamic type/2.
+:- dynamic travel/3.
+:- dynamic work/2.
+:- dynamic outlets/2.
+:- dynamic vibe/2.
+:- dynamic seating/2.
+:- dynamic price/2.
+:- dynamic open_late/2.
+:- dynamic link/2.
+:- dynamic location/3.
+
+% Bounded heap for top-N ranking (ranked_study_spots/18)
+:- use_module(library(heaps)).
+
+
 % -----------------------------------------------------------------------------
 %     Study Spot Identifiers (Atomic Facts)
 %     These atoms are used as internal keys to identify each study spot
@@ -322,6 +344,35 @@ link(metcha_myeongdong, 'https://naver.me/GcWrD6IG').
 link(lang_study_cafe_sinchon, 'https://naver.me/GJTqa5Gx').
 
 
+% -----------------------------------------------------------------------------
+%                           Spot Coordinates
+% -----------------------------------------------------------------------------
+% WGS84 latitude and longitude of each study spot, used by the spatial index
+% (geo_index.py) for radius and nearest-spot queries.
+% Format: location(Spot, Latitude, Longitude).
+% -----------------------------------------------------------------------------
+location(jaksim_chungmuro, 37.5612, 126.9942).
+location(tongue_seongsu, 37.5446, 127.0557).
+location(mailroom_sindang, 37.5659, 127.0176).
+location(solbangul_bakery, 37.5644, 127.0290).
+location(coffee_smith_itaewon, 37.5345, 126.9946).
+location(mouse_rabbit, 37.5475, 127.0474).
+location(lang_study_cafe, 37.5668, 126.9980).
+location(starfield_library, 37.5102, 127.0598).
+location(burnt_seoul, 37.5543, 127.0107).
+location(from_hearts_coffee, 37.5762, 127.0247).
+location(conhas_ddp, 37.5673, 127.0095).
+location(endlong, 37.5755, 127.0262).
+location(mangrove_sinseol_20f, 37.5745, 127.0253).
+location(mangrove_sinseol_b2, 37.5745, 127.0253).
+location(mangrove_dongdaemun_15f, 37.5716, 127.0143).
+location(mangrove_dongdaemun_b1, 37.5716, 127.0143).
+location(left_coffee, 37.5663, 126.9918).
+location(eightstreet, 37.5558, 127.0436).
+location(metcha_myeongdong, 37.5636, 126.9850).
+location(lang_study_cafe_sinchon, 37.5560, 126.9370).
+
+
 
 
 
@@ -392,139 +443,111 @@ score_spot(
     OpenLate, LateWeight,
     Mode, Name, Link, 
     Score, Explanation) :-
-    
-    % Start with zero score and empty explanation list
-    Exp1 = [],
-    study_spot(Spot),
-    Score1 = 0,
-    
-    % Determine explanation verbosity (short/long)
-    (Mode == "" -> ExplainMode = long ; ExplainMode = Mode),
-
-    
-    % === Travel Time ===
-    map_travel_times(MaxMinutes, TimeCode),
-     (
-        (   (Origin == sinseol,    travel(Spot, TimeCode, _))
-    ;   (Origin == dongdaemun, travel(Spot, _, TimeCode))
-)
-        ->  Score2 is Score1 + TravelWeight,
-        (ExplainMode == short -> Msg2 = "✔ travel. " ; Msg2 = "Matched travel time. "),
-        % append explanation for matched travel time
-        append(Exp1, [Msg2], Exp2)
-        ;   Score2 is Score1,
-        (ExplainMode == short -> Msg2 = "✘ travel. " ; Msg2 = "Did not match travel time. "),
-        append(Exp1, [Msg2], Exp2)
-    ),
 
-    % === Work Type ===
-    work(Spot, WorkList), 
-    (   
-        WorkType == skip
-            -> Score3 is Score2, 
-            (ExplainMode == short -> Msg3 = "✔ work type. " ; Msg3 = "No work type preference. "),
-            append(Exp2, [Msg3], Exp3)
-            ; (member(WorkType, WorkList) 
-                -> Score3 is Score2 + WorkWeight,
-                (ExplainMode == short -> Msg3 = "✔ work type. " ; Msg3 = "Matched work type preferences. "),
-                append(Exp2, [Msg3], Exp3) 
-                ; Score3 is Score2, 
-                (ExplainMode == short -> Msg3 = "✘ work type. " ; Msg3 = "Did not match work type preferences. "),
-                append(Exp2, [Msg3], Exp3)
-            )
-    ),
+    spot_score(
+        Origin, MaxMinutes, TravelWeight,
+        WorkType, WorkWeight,
+        OutletPref, OutletWeight,
+        VibePref, VibeWeight,
+        SeatingPref, SeatingWeight,
+        PricePref, PriceWeight,
+        OpenLate, LateWeight,
+        Spot, Score, States),
+    study_spot_name(Spot, Name),
+    explain_states(States, Mode, Explanation),
+    % Get the link for the spot
+    link(Spot, Link).
 
-    % === Outlet Availability ===
-    outlets(Spot, OutletVal), 
-    (   
-        OutletPref == skip
-            -> Score4 is Score3, 
-            (ExplainMode == short -> Msg4 = "✔ outlet preference. " ; Msg4 = "No outlet preference. "),
-            append(Exp3, [Msg4], Exp4)
-            ; (OutletVal == OutletPref 
-                -> Score4 is Score3 + OutletWeight, 
-                (ExplainMode == short -> Msg4 = "✔ outlet preference. " ; Msg4 = "Matched outlets preferences. "),
-                append(Exp3, [Msg4], Exp4)
-                ; Score4 is Score3,
-                (ExplainMode == short -> Msg4 = "✘ outlet preference. " ; Msg4 = "Did not match outlet preferences. "),
-                append(Exp3, [Msg4], Exp4)
-            )
-        ),
-
-    % === Vibe Preference ===
-    vibe(Spot, VibeList),
-    (
-        VibePref == skip 
-        -> Score5 is Score4, 
-        (ExplainMode == short -> Msg5 = "✔ vibe preference. " ; Msg5 = "No vibe preference. "),
-        append(Exp4, [Msg5], Exp5)
-        ; (member(VibePref, VibeList) 
-            -> Score5 is Score4 + VibeWeight, 
-            (ExplainMode == short -> Msg5 = "✔ vibe preference. " ; Msg5 = "Matched vibe preferences. "),
-            append(Exp4, [Msg5], Exp5)
-            ; Score5 is Score4,
-            (ExplainMode == short -> Msg5 = "✘ vibe preference. " ; Msg5 = "Did not match vibe preferences. "),
-            append(Exp4, [Msg5], Exp5)
-        )
-    ),
 
-    % === Seating Preference ===
-    seating(Spot, SeatList),
-    (
-        SeatingPref == skip 
-        -> Score6 is Score5, 
-        (ExplainMode == short -> Msg6 = "✔ seating preference. " ; Msg6 = "No seating preference. "),
-        append(Exp5, [Msg6], Exp6)
-        ; (member(SeatingPref, SeatList) 
-            -> Score6 is Score5 + SeatingWeight,
-            (ExplainMode == short -> Msg6 = "✔ seating preference. " ; Msg6 = "Matched seating preferences. "),
-            append(Exp5, [Msg6], Exp6) 
-            ; Score6 is Score5,
-            (ExplainMode == short -> Msg6 = "✘ seating preference. " ; Msg6 = "Did not match seating preferences. "),
-            append(Exp5, [Msg6], Exp6)
+% spot_score/18 scores a spot without building its explanation (used while ranking)
+% States holds one of matched / missed / skipped per attribute, in the order
+% travel, work, outlet, vibe, seating, price, late
+spot_score(
+    Origin, MaxMinutes, TravelWeight,
+    WorkType, WorkWeight,
+    OutletPref, OutletWeight,
+    VibePref, VibeWeight,
+    SeatingPref, SeatingWeight,
+    PricePref, PriceWeight,
+    OpenLate, LateWeight,
+    Spot, Score, States) :-
+    study_spot(Spot),
+    spot_match_states(Spot, Origin, MaxMinutes, WorkType, OutletPref, VibePref, SeatingPref, PricePref, OpenLate, States),
+    foldl(add_state_weight, States,
+          [TravelWeight, WorkWeight, OutletWeight, VibeWeight, SeatingWeight, PriceWeight, LateWeight],
+          0, Score).
+
+% spot_match_states/10 works out which of the user's preferences a spot matches
+spot_match_states(Spot, Origin, MaxMinutes, WorkType, OutletPref, VibePref, SeatingPref, PricePref, OpenLate,
+                  [Travel, Work, Outlet, Vibe, Seating, Price, Late]) :-
+    % === Travel Time === (never skipped: the spot must be in the same time band)
+    map_travel_times(MaxMinutes, TimeCode),
+    (   (   (Origin == sinseol,    travel(Spot, TimeCode, _))
+        ;   (Origin == dongdaemun, travel(Spot, _, TimeCode))
         )
+    ->  Travel = matched
+    ;   Travel = missed
     ),
-
-    % === Price Preference ===
-    price(Spot, PriceVal),
-    (
-        PricePref == skip
-        -> Score7 is Score6, 
-        (ExplainMode == short -> Msg7 = "✔ price preference. " ; Msg7 = "No price preference. "),
-        append(Exp6, [Msg7], Exp7)
-        ; (PriceVal == PricePref 
-            -> Score7 is Score6 + PriceWeight, 
-            (ExplainMode == short -> Msg7 = "✔ price preference. " ; Msg7 = "Matched price preferences. "),
-            append(Exp6, [Msg7], Exp7)
-            ; Score7 is Score6, 
-            (ExplainMode == short -> Msg7 = "✘ price preference. " ; Msg7 = "Did not match price preferences. "),
-            append(Exp6, [Msg7], Exp7)
-        )
-        ),
-
-    % === Open Late Preference ===
-    open_late(Spot, OpenVal),
-    (
-        OpenLate == skip
-        -> Score8 is Score7,
-        (ExplainMode == short -> Msg8 = "✔ opening time preference. " ; Msg8 = "No opening time preference. "), 
-        append(Exp7, [Msg8], Exp8)
-        ; (OpenVal == OpenLate 
-            -> Score8 is Score7 + LateWeight,
-            (ExplainMode == short -> Msg8 = "✔ opening time preference. " ; Msg8 = "Matched opening time preferences. "),
-            append(Exp7, [Msg8], Exp8) 
-            ; Score8 is Score7, 
-            (ExplainMode == short -> Msg8 = "✘ opening time preference. " ; Msg8 = "Did not match opening time preferences. "),
-            append(Exp7, [Msg8], Exp8)
-        )
-        ),
-
-    % Final output
-    Score = Score8,
-    study_spot_name(Spot, Name),
-    atomic_list_concat(Exp8, " ", Explanation),
-    % Get the link for the spot
-    link(Spot, Link).
+    work(Spot, WorkList),       member_state(WorkType, WorkList, Work),
+    outlets(Spot, OutletVal),   value_state(OutletPref, OutletVal, Outlet),
+    vibe(Spot, VibeList),       member_state(VibePref, VibeList, Vibe),
+    seating(Spot, SeatList),    member_state(SeatingPref, SeatList, Seating),
+    price(Spot, PriceVal),      value_state(PricePref, PriceVal, Price),
+    open_late(Spot, OpenVal),   value_state(OpenLate, OpenVal, Late).
+
+% member_state/3: state of a preference checked against a list attribute (work, vibe, seating)
+member_state(Pref, Values, State) :-
+    (   Pref == skip -> State = skipped
+    ;   member(Pref, Values) -> State = matched
+    ;   State = missed
+    ).
+
+% value_state/3: state of a preference checked against a single-valued attribute
+value_state(Pref, Value, State) :-
+    (   Pref == skip -> State = skipped
+    ;   Value == Pref -> State = matched
+    ;   State = missed
+    ).
+
+% add_state_weight/4 adds an attribute's weight to the score when it matched
+add_state_weight(State, Weight, Score0, Score) :-
+    (   State == matched
+    ->  Score is Score0 + Weight
+    ;   Score = Score0
+    ).
+
+% explain_states/3 builds the explanation string for a spot's match states
+explain_states(States, Mode, Explanation) :-
+    % Determine explanation verbosity (short/long)
+    (Mode == "" -> ExplainMode = long ; ExplainMode = Mode),
+    maplist(state_message(ExplainMode), [travel, work, outlet, vibe, seating, price, late], States, Messages),
+    atomic_list_concat(Messages, " ", Explanation).
+
+state_message(ExplainMode, Attribute, State, Message) :-
+    attribute_message(Attribute, State, Short, Long),
+    (ExplainMode == short -> Message = Short ; Message = Long).
+
+% attribute_message(Attribute, State, ShortMessage, LongMessage)
+attribute_message(travel, matched, "✔ travel. ", "Matched travel time. ").
+attribute_message(travel, missed, "✘ travel. ", "Did not match travel time. ").
+attribute_message(work, skipped, "✔ work type. ", "No work type preference. ").
+attribute_message(work, matched, "✔ work type. ", "Matched work type preferences. ").
+attribute_message(work, missed, "✘ work type. ", "Did not match work type preferences. ").
+attribute_message(outlet, skipped, "✔ outlet preference. ", "No outlet preference. ").
+attribute_message(outlet, matched, "✔ outlet preference. ", "Matched outlets preferences. ").
+attribute_message(outlet, missed, "✘ outlet preference. ", "Did not match outlet preferences. ").
+attribute_message(vibe, skipped, "✔ vibe preference. ", "No vibe preference. ").
+attribute_message(vibe, matched, "✔ vibe preference. ", "Matched vibe preferences. ").
+attribute_message(vibe, missed, "✘ vibe preference. ", "Did not match vibe preferences. ").
+attribute_message(seating, skipped, "✔ seating preference. ", "No seating preference. ").
+attribute_message(seating, matched, "✔ seating preference. ", "Matched seating preferences. ").
+attribute_message(seating, missed, "✘ seating preference. ", "Did not match seating preferences. ").
+attribute_message(price, skipped, "✔ price preference. ", "No price preference. ").
+attribute_message(price, matched, "✔ price preference. ", "Matched price preferences. ").
+attribute_message(price, missed, "✘ price preference. ", "Did not match price preferences. ").
+attribute_message(late, skipped, "✔ opening time preference. ", "No opening time preference. ").
+attribute_message(late, matched, "✔ opening time preference. ", "Matched opening time preferences. ").
+attribute_message(late, missed, "✘ opening time preference. ", "Did not match opening time preferences. ").
 
 
 % % =========================================================
@@ -543,6 +566,7 @@ top_n(List, N, Output) :-
 % % ===================================
 
 % % find_top_study_spots/18 takes all user preferences and scoring weights, ranks all options, and returns the top N
+% % as [Score, Name, Link, Explanation] rows (see ranked_study_spots/18)
 find_top_study_spots(Origin, MaxMinutes, TravelWeight, 
     WorkType, WorkWeight,
     OutletPref, OutletWeight,
@@ -552,31 +576,111 @@ find_top_study_spots(Origin, MaxMinutes, TravelWeight,
     OpenLate, LateWeight,
     Mode, TopN, Results) :-
 
-    % Collect all scored results using score_spot/20
-    findall(
-        [Score, Name, Link, Explanation],
-        score_spot(
-            Origin, MaxMinutes, TravelWeight, 
-            WorkType, WorkWeight, 
-            OutletPref, OutletWeight, 
-            VibePref, VibeWeight, 
-            SeatingPref, SeatingWeight,
-            PricePref, PriceWeight,
-            OpenLate, LateWeight,
-            Mode, Name, Link, 
-            Score, Explanation) ,
-        AllResults
-    ),
-
-    % Sort by score ascending and reverse to get descending            
-    sort(AllResults, SortedAscending),
-    reverse(SortedAscending, SortedDescending),  % Sort by score descending
+    ranked_study_spots(Origin, MaxMinutes, TravelWeight,
+        WorkType, WorkWeight,
+        OutletPref, OutletWeight,
+        VibePref, VibeWeight,
+        SeatingPref, SeatingWeight,
+        PricePref, PriceWeight,
+        OpenLate, LateWeight,
+        Mode, TopN, Rows),
+    maplist(drop_states, Rows, Results).
+
+drop_states([Score, Name, Link, Explanation, _States], [Score, Name, Link, Explanation]).
+
+% % ranked_study_spots/18 ranks like find_top_study_spots/18 but keeps each row's match states:
+% % [Score, Name, Link, Explanation, States], where States lists matched / missed / skipped
+% % for travel, work, outlet, vibe, seating, price and late
+% % When TopN is bound only the best TopN rows are kept while scoring (bounded insertion),
+% % ordered by score descending and then by name in the same order sort/2 + reverse/2 gives,
+% % and only those rows get an explanation
+ranked_study_spots(Origin, MaxMinutes, TravelWeight,
+    WorkType, WorkWeight,
+    OutletPref, OutletWeight,
+    VibePref, VibeWeight,
+    SeatingPref, SeatingWeight,
+    PricePref, PriceWeight,
+    OpenLate, LateWeight,
+    Mode, TopN, Results) :-
 
     (
-        % Extract the top-N results (or all if TopN is not set)
+        % No TopN requested: collect every scored and explained spot
         var(TopN)
-        -> Results = SortedDescending
-        ; top_n(SortedDescending, TopN, Results)
+        ->  findall(
+                [Score, Name, Link, Explanation, States],
+                (   spot_score(
+                        Origin, MaxMinutes, TravelWeight,
+                        WorkType, WorkWeight,
+                        OutletPref, OutletWeight,
+                        VibePref, VibeWeight,
+                        SeatingPref, SeatingWeight,
+                        PricePref, PriceWeight,
+                        OpenLate, LateWeight,
+                        Spot, Score, States),
+                    study_spot_name(Spot, Name),
+                    explain_states(States, Mode, Explanation),
+                    link(Spot, Link)
+                ),
+                AllResults
+            ),
+
+            % Sort by score ascending and reverse to get descending            
+            sort(AllResults, SortedAscending),
+            reverse(SortedAscending, Results)  % Sort by score descending
+
+        % TopN requested: rank on scores alone, keeping only the best TopN rows,
+        % and build explanations just for the rows that made the cut
+        ;   empty_heap(Heap0),
+            State = top_k(Heap0),
+            forall(
+                (   spot_score(
+                        Origin, MaxMinutes, TravelWeight,
+                        WorkType, WorkWeight,
+                        OutletPref, OutletWeight,
+                        VibePref, VibeWeight,
+                        SeatingPref, SeatingWeight,
+                        PricePref, PriceWeight,
+                        OpenLate, LateWeight,
+                        Spot, Score, States),
+                    study_spot_name(Spot, Name),
+                    link(Spot, Link)
+                ),
+                (   arg(1, State, Best0),
+                    top_k_add([Score, Name, Link, States], TopN, Best0, Best),
+                    (Best == Best0 -> true ; nb_setarg(1, State, Best))
+                )
+            ),
+            arg(1, State, Heap),
+            top_k_rows(Heap, Ranked),
+            maplist(explain_row(Mode), Ranked, Results)
         ).
 
-    
\ No newline at end of file
+% explain_row/3 turns a ranked [Score, Name, Link, States] row into a result row
+explain_row(Mode, [Score, Name, Link, States], [Score, Name, Link, Explanation, States]) :-
+    explain_states(States, Mode, Explanation).
+
+
+% % =========================================================
+% % Utility Predicates for bounded top-N selection
+% % =========================================================
+
+% top_k_add/4 adds a [Score, Name | _] row to a heap of at most K rows, keyed
+% Score-Name so that the heap's minimum is the worst row kept (rows rank by score
+% descending, then by name descending, as in the unbounded branch's sort).
+% A row that does not beat the worst row of a full heap is dropped in O(1);
+% otherwise it replaces the worst row in O(log K), so ranking N spots is O(N log K)
+top_k_add(Row, K, Heap0, Heap) :-
+    Row = [Score, Name|_],
+    (   heap_size(Heap0, Size), Size < K
+    ->  add_to_heap(Heap0, Score-Name, Row, Heap)
+    ;   min_of_heap(Heap0, Worst, _), Score-Name @> Worst
+    ->  get_from_heap(Heap0, _, _, Heap1),
+        add_to_heap(Heap1, Score-Name, Row, Heap)
+    ;   Heap = Heap0
+    ).
+
+% top_k_rows/2 lists the rows of a top_k_add/4 heap, best first
+top_k_rows(Heap, Rows) :-
+    heap_to_list(Heap, Pairs),
+    pairs_values(Pairs, Ascending),
+    reverse(Ascending, Rows).
@@ -15,8 +15,6 @@ Date: April 20, 2025
 """
 
 import interface
-import gui_app
-import tkinter as tk
 
 
 def run_strict_test_case():
@@ -86,6 +84,9 @@ def launch_gui():
     Launches the Tkinter GUI for interactive expert system testing.
     Allows the demo facilitator or user to test the full pipeline via UI.
     """
+    import gui_app
+    import tkinter as tk
+
     print("\n🚀 Launching GUI mode...")
     root = tk.Tk()
     app = gui_app.StudySpotGUI(root)
@@ -0,0 +1,57 @@
+"""
+Shared fixtures: a seeded synthetic knowledge base and seeded random queries.
+
+The Python, columnar and SQLite engines are checked against each other and
+against plain reference implementations on the same generated facts, so the
+suite needs neither SWI-Prolog nor the shipped knowledge base.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_generator import generate_kb
+from knowledge_base import ORIGINS, load_spots
+from query_builder import PREFERENCE_VALUES, normalize_inputs
+
+
+KB_SIZE = 500
+QUERY_COUNT = 300
+
+
+@pytest.fixture(scope="session")
+def kb_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("kb") / "kb.pl")
+    generate_kb(path, KB_SIZE, seed=7)
+    return path
+
+
+@pytest.fixture(scope="session")
+def spots(kb_path):
+    return load_spots(kb_path)
+
+
+def random_query(rng, kind):
+    """One normalized query with random preferences (skips included), weights and top_n."""
+    inputs = {"origin": rng.choice(ORIGINS), "max_minutes": rng.randint(1, 45)}
+    for field, values in PREFERENCE_VALUES.items():
+        inputs[field] = rng.choice(values + ("skip",))
+    if kind == "fallback":
+        for attribute in ("travel", "work", "outlet", "vibe", "seating", "price", "late"):
+            inputs[f"{attribute}_weight"] = rng.randint(0, 5)
+        inputs["explain_mode"] = rng.choice(("short", "long"))
+        inputs["top_n"] = rng.choice((None, 1, 3, 10, KB_SIZE + 1))
+    return normalize_inputs(inputs, kind)
+
+
+@pytest.fixture
+def queries():
+    """Return a seeded list of random queries of a kind ("strict" or "fallback")."""
+    def make(kind, count=QUERY_COUNT, seed=0):
+        rng = random.Random(seed)
+        return [random_query(rng, kind) for _ in range(count)]
+    return make
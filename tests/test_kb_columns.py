@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from kb_columns import KBColumns, write_columns
+from result_cache import kb_content_hash
+from scoring_engine import VectorizedScorer
+from strict_index import StrictIndex
+
+
+@pytest.fixture(scope="module")
+def columns(kb_path, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("columns") / "kb.columns")
+    write_columns(path, kb_path)
+    return KBColumns(path)
+
+
+def test_snapshot_is_fresh_for_its_source(kb_path, columns):
+    assert len(columns) == len(VectorizedScorer.from_kb(kb_path))
+    assert KBColumns.open_fresh(columns.path, kb_content_hash(kb_path)) is not None
+    assert KBColumns.open_fresh(columns.path, "another version") is None
+
+
+def test_columns_scorer_matches_python(spots, columns, queries):
+    scorer, mapped = VectorizedScorer(spots), VectorizedScorer.from_columns(columns)
+    for query in queries("fallback"):
+        assert mapped.find_top_study_spots(query) == scorer.find_top_study_spots(query)
+
+
+def test_columns_index_matches_python(spots, columns, queries):
+    index, mapped = StrictIndex(spots), StrictIndex.from_columns(columns)
+    rng = np.random.default_rng(4)
+    for query in queries("strict"):
+        candidates = rng.choice(len(spots), size=len(spots) // 2, replace=False)
+        assert mapped.recommend_spot(query) == index.recommend_spot(query)
+        assert mapped.recommend_spot(query, candidates=candidates) == index.recommend_spot(query, candidates=candidates)
@@ -0,0 +1,36 @@
+import pytest
+
+from kb_store import SQLiteStore, export_kb, import_kb
+from knowledge_base import load_spots
+from scoring_engine import VectorizedScorer
+from strict_index import StrictIndex
+
+
+@pytest.fixture(scope="module")
+def db_path(kb_path, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("db") / "kb.db")
+    import_kb(path, kb_path)
+    return path
+
+
+def test_sqlite_strict_matches_python(spots, db_path, queries):
+    store, index = SQLiteStore(db_path), StrictIndex(spots)
+    for query in queries("strict"):
+        assert store.recommend_spot(query) == index.recommend_spot(query)
+
+
+def test_sqlite_fallback_matches_python(spots, db_path, queries):
+    store, scorer = SQLiteStore(db_path), VectorizedScorer(spots)
+    for query in queries("fallback"):
+        assert store.find_top_study_spots(query) == scorer.find_top_study_spots(query)
+
+
+def test_export_round_trip(kb_path, db_path, tmp_path):
+    exported = str(tmp_path / "exported.pl")
+    assert export_kb(exported, db_path) == len(load_spots(kb_path))
+    assert load_spots(exported) == load_spots(kb_path)
+
+    # Importing the export again gives the same database contents
+    again = str(tmp_path / "again.db")
+    import_kb(again, exported)
+    assert SQLiteStore(again).spots() == SQLiteStore(db_path).spots()
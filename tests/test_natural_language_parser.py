@@ -0,0 +1,45 @@
+import random
+import re
+
+from natural_language_parser import PREFERENCE_MAPS, KeywordMatcher, match_value
+
+
+# Phrases the regex-valued keys match, which no plain keyword spells out
+REGEX_PHRASES = (
+    "deep concentration", "intense  focus", "study grind", "relaxed", "chilled", "working together",
+    "power outlet", "need some power", "no  charging", "peaceful", "buzzing", "personal desk",
+    "tables everywhere", "don't mind price", "any budget", "okay with whatever price", "night owl",
+    "open at night", "not open late",
+)
+FILLER = ("i", "want", "a", "place", "with", "near", "station", "today", "and", "somewhere", "not", "nowhere")
+
+
+def old_match_value(text, keyword_map):
+    """The per-keyword loop KeywordMatcher replaced: first key (word-bounded or as a regex) found wins."""
+    for keyword, value in keyword_map.items():
+        if re.search(rf"\b{re.escape(keyword)}\b", text) or re.search(keyword, text):
+            return value
+    return "skip"
+
+
+def random_texts(count, seed=0):
+    rng = random.Random(seed)
+    keywords = [key for _, keyword_map in PREFERENCE_MAPS for key in keyword_map if re.fullmatch(r"[\w /]+", key)]
+    vocabulary = keywords + list(REGEX_PHRASES) + list(FILLER)
+    for _ in range(count):
+        words = rng.choices(vocabulary, k=rng.randint(0, 12))
+        # Join some words without a space so keywords also occur inside other words
+        yield "".join(word + rng.choice((" ", " ", " ", "", ", ")) for word in words).strip()
+
+
+def test_matcher_matches_old_loop():
+    matcher = KeywordMatcher(PREFERENCE_MAPS)
+    for text in random_texts(2000):
+        expected = {attribute: old_match_value(text, keyword_map) for attribute, keyword_map in PREFERENCE_MAPS}
+        assert matcher.match(text) == expected, text
+
+
+def test_match_value_matches_old_loop():
+    for text in random_texts(300, seed=1):
+        for _, keyword_map in PREFERENCE_MAPS:
+            assert match_value(text, keyword_map) == old_match_value(text, keyword_map), text
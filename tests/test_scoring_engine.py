@@ -0,0 +1,66 @@
+import numpy as np
+
+from explanations import MATCHED, MISSED, SKIPPED, build_explanation
+from knowledge_base import map_travel_times
+from scoring_engine import WEIGHT_KEYS, VectorizedScorer
+
+
+# user_inputs key -> spot attribute, in ATTRIBUTES order after travel
+ATTRIBUTE_KEYS = (
+    ("work_type", "work"),
+    ("outlet_pref", "outlets"),
+    ("vibe_pref", "vibe"),
+    ("seating_pref", "seating"),
+    ("price_pref", "price"),
+    ("open_late", "open_late"),
+)
+
+
+def reference_states(spot, query):
+    """Match states of one spot, one attribute at a time, as score_spot/20 computes them."""
+    band = map_travel_times(query["max_minutes"])
+    states = [MATCHED if spot["travel"][query["origin"]] == band else MISSED]
+    for key, attribute in ATTRIBUTE_KEYS:
+        value = spot[attribute]
+        if query[key] == "skip":
+            states.append(SKIPPED)
+        elif query[key] in value if isinstance(value, list) else query[key] == value:
+            states.append(MATCHED)
+        else:
+            states.append(MISSED)
+    return tuple(states)
+
+
+def reference_fallback(spots, query):
+    """Score every spot, sort by score then name (both descending) and keep top_n."""
+    rows = []
+    for spot in spots:
+        states = reference_states(spot, query)
+        score = sum(query[key] for key, state in zip(WEIGHT_KEYS, states) if state == MATCHED)
+        rows.append([score, spot["name"], spot["link"], build_explanation(states, query["explain_mode"]), states])
+    rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+    return rows if query["top_n"] is None else rows[:query["top_n"]]
+
+
+def test_scorer_matches_reference(spots, queries):
+    scorer = VectorizedScorer(spots)
+    for query in queries("fallback"):
+        assert scorer.find_top_study_spots(query) == [{"Results": reference_fallback(spots, query)}]
+
+
+def test_scorer_candidates_match_reference_on_subset(spots, queries):
+    scorer = VectorizedScorer(spots)
+    rng = np.random.default_rng(1)
+    for query in queries("fallback", count=100, seed=1):
+        candidates = np.sort(rng.choice(len(spots), size=rng.integers(0, 50), replace=False))
+        expected = reference_fallback([spots[i] for i in candidates], query)
+        assert scorer.find_top_study_spots(query, candidates=candidates) == [{"Results": expected}]
+
+
+def test_scorer_exact_minutes(spots, queries):
+    scorer = VectorizedScorer(spots)
+    rng = np.random.default_rng(2)
+    for query in queries("fallback", count=50, seed=2):
+        minutes = rng.integers(0, 60, size=len(spots))
+        scores, states = scorer.score(query, travel_minutes=minutes)
+        assert np.array_equal(states[0] == MATCHED, minutes <= query["max_minutes"])
@@ -0,0 +1,42 @@
+import numpy as np
+
+from knowledge_base import map_travel_times
+from strict_index import StrictIndex
+
+
+def brute_force(spots, query, allowed=None):
+    """Every spot matching all preferences exactly ("skip" matches nothing), in order."""
+    band = map_travel_times(query["max_minutes"])
+    results = []
+    for i, spot in enumerate(spots):
+        if allowed is not None and i not in allowed:
+            continue
+        if (
+            spot["travel"][query["origin"]] == band
+            and query["work_type"] in spot["work"]
+            and query["outlet_pref"] == spot["outlets"]
+            and query["vibe_pref"] in spot["vibe"]
+            and query["seating_pref"] in spot["seating"]
+            and query["price_pref"] == spot["price"]
+            and query["open_late"] == spot["open_late"]
+        ):
+            results.append({"Name": spot["name"], "Link": spot["link"]})
+    return results
+
+
+def test_index_matches_brute_force(spots, queries):
+    index = StrictIndex(spots)
+    matched = 0
+    for query in queries("strict"):
+        expected = brute_force(spots, query)
+        assert index.recommend_spot(query) == expected
+        matched += bool(expected)
+    assert matched  # the random queries do exercise non-empty results
+
+
+def test_index_candidates_match_brute_force(spots, queries):
+    index = StrictIndex(spots)
+    rng = np.random.default_rng(3)
+    for query in queries("strict", count=100, seed=3):
+        candidates = rng.choice(len(spots), size=rng.integers(0, len(spots)), replace=False)
+        assert index.recommend_spot(query, candidates=candidates) == brute_force(spots, query, set(candidates))
@@ -0,0 +1,352 @@
+"""
+Transit Graph Travel Engine
+---------------------------
+Exact travel times from any subway station to every study spot, computed on a
+local Seoul subway/walk graph (seoul_transit.csv) instead of the four coarse
+travel/3 bands.
+
+The graph file lists two-way edges with their minutes; stations are plain ids
+(e.g. "sinchon", "city_hall") and spots are "spot:<study_spot id>". One
+Dijkstra run per origin gives the shortest time to every spot, and the results
+are stored as a (origins x spots) uint16 matrix:
+- the matrix is cached on disk as a .npy file with a JSON sidecar (origins,
+  spot ids and a hash of the graph and spot list), and memory-mapped on load
+- it is rebuilt only when the graph file or the spot list changes
+- a query looks up its origin's row once, so per-spot cost is O(1)
+
+The residences the CLI asks about ("sinseol", "dongdaemun") are nodes of the
+graph, so every existing origin stays valid.
+
+Usage:
+$ python3 transit_graph.py build                  # (re)build the cached matrix
+$ python3 transit_graph.py lookup sinchon         # minutes from a station to every spot
+$ python3 transit_graph.py origins                # list valid origins
+
+"""
+
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import os
+
+import numpy as np
+
+from knowledge_base import KB_PATH, load_spots
+
+
+# Graph shipped with the project, and the cached matrix built from it
+GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seoul_transit.csv")
+
+# Matrix value for spots that cannot be reached from an origin
+UNREACHABLE = np.iinfo(np.uint16).max
+
+SPOT_PREFIX = "spot:"
+
+
+def spot_node(spot_id):
+    """Return the graph node id of a study spot."""
+    return SPOT_PREFIX + spot_id
+
+
+def load_graph(path=GRAPH_PATH):
+    """
+    Read a transit graph file into an adjacency list.
+
+    The file is CSV with a from,to,minutes,kind header; lines starting with '#'
+    are comments. Every edge can be travelled in both directions.
+
+    Parameters
+    ----------
+    path : str
+        Path to the graph file.
+
+    Returns
+    -------
+    dict
+        node -> list of (neighbour, minutes).
+
+    Raises
+    ------
+    ValueError
+        If an edge has a negative or non-numeric travel time.
+    """
+    graph = {}
+    with open(path, encoding="utf-8", newline="") as graph_file:
+        rows = csv.DictReader(line for line in graph_file if line.strip() and not line.startswith("#"))
+        for row in rows:
+            source, target = row["from"].strip(), row["to"].strip()
+            try:
+                minutes = float(row["minutes"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Bad travel time on edge {source} -> {target}: {row['minutes']!r}") from None
+            if minutes < 0:
+                raise ValueError(f"Negative travel time on edge {source} -> {target}")
+            graph.setdefault(source, []).append((target, minutes))
+            graph.setdefault(target, []).append((source, minutes))
+    return graph
+
+
+def origins(graph):
+    """
+    Return every node that can be used as an origin (all non-spot nodes).
+
+    Parameters
+    ----------
+    graph : dict
+        Adjacency list from load_graph.
+
+    Returns
+    -------
+    list of str
+        Origin ids, sorted.
+    """
+    return sorted(node for node in graph if not node.startswith(SPOT_PREFIX))
+
+
+def shortest_times(graph, source):
+    """
+    Dijkstra's algorithm from one node.
+
+    Spot nodes are destinations only: paths are never extended through a spot,
+    so walking "through a cafe" cannot shortcut the network.
+
+    Parameters
+    ----------
+    graph : dict
+        Adjacency list from load_graph.
+    source : str
+        Start node.
+
+    Returns
+    -------
+    dict
+        node -> shortest travel time in minutes, for every reachable node.
+    """
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        minutes, node = heapq.heappop(heap)
+        if minutes > best[node] or (node != source and node.startswith(SPOT_PREFIX)):
+            continue
+        for neighbour, cost in graph.get(node, ()):
+            total = minutes + cost
+            if total < best.get(neighbour, float("inf")):
+                best[neighbour] = total
+                heapq.heappush(heap, (total, neighbour))
+    return best
+
+
+def graph_hash(path, spot_ids):
+    """
+    Hash a graph file together with the spot order a matrix is built for.
+
+    Parameters
+    ----------
+    path : str
+        Path to the graph file.
+    spot_ids : sequence of str
+        Spot ids in column order.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as graph_file:
+        digest.update(graph_file.read())
+    digest.update("\0".join(spot_ids).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TravelMatrix:
+    """
+    Shortest travel times from every origin to every spot.
+
+    Attributes
+    ----------
+    origins : list of str
+        Origin ids, one per matrix row.
+    spot_ids : list of str
+        Spot ids, one per matrix column.
+    minutes : np.ndarray
+        uint16 minutes, shape (len(origins), len(spot_ids)); UNREACHABLE where
+        there is no path. May be a read-only memory map.
+    """
+
+    def __init__(self, origins, spot_ids, minutes):
+        self.origins = list(origins)
+        self.spot_ids = list(spot_ids)
+        self.minutes = minutes
+        self._rows = {origin: i for i, origin in enumerate(self.origins)}
+        self._columns = {spot: i for i, spot in enumerate(self.spot_ids)}
+
+    @classmethod
+    def build(cls, graph, spot_ids):
+        """
+        Run Dijkstra from every origin of a graph.
+
+        Parameters
+        ----------
+        graph : dict
+            Adjacency list from load_graph.
+        spot_ids : sequence of str
+            Spot ids in column order; spots missing from the graph are UNREACHABLE.
+
+        Returns
+        -------
+        TravelMatrix
+        """
+        rows = origins(graph)
+        nodes = [spot_node(spot) for spot in spot_ids]
+        minutes = np.full((len(rows), len(nodes)), UNREACHABLE, dtype=np.uint16)
+        for r, origin in enumerate(rows):
+            best = shortest_times(graph, origin)
+            for c, node in enumerate(nodes):
+                if node in best:
+                    minutes[r, c] = min(int(round(best[node])), UNREACHABLE - 1)
+        return cls(rows, spot_ids, minutes)
+
+    def save(self, path, key):
+        """
+        Write the matrix to `path` (.npy) and its metadata to `path` + ".json".
+
+        Parameters
+        ----------
+        path : str
+            Output .npy path.
+        key : str
+            graph_hash of the inputs, checked when the cache is loaded.
+        """
+        np.save(path, np.ascontiguousarray(self.minutes))
+        with open(path + ".json", "w", encoding="utf-8") as meta_file:
+            json.dump({"key": key, "origins": self.origins, "spot_ids": self.spot_ids}, meta_file)
+
+    @classmethod
+    def load(cls, path, key=None):
+        """
+        Memory-map a cached matrix.
+
+        Parameters
+        ----------
+        path : str
+            .npy path written by save.
+        key : str, optional
+            Expected graph_hash; a cache built from other inputs is not loaded.
+
+        Returns
+        -------
+        TravelMatrix or None
+            None if the cache is missing or stale.
+        """
+        try:
+            with open(path + ".json", encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            if key is not None and meta.get("key") != key:
+                return None
+            minutes = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if minutes.shape != (len(meta["origins"]), len(meta["spot_ids"])):
+            return None
+        return cls(meta["origins"], meta["spot_ids"], minutes)
+
+    def has_origin(self, origin):
+        return origin in self._rows
+
+    def row(self, origin):
+        """
+        Return the travel times from one origin to every spot.
+
+        Parameters
+        ----------
+        origin : str
+            An origin id.
+
+        Returns
+        -------
+        np.ndarray
+            uint16 minutes in spot_ids order.
+
+        Raises
+        ------
+        KeyError
+            If the origin is not a node of the graph.
+        """
+        return self.minutes[self._rows[origin]]
+
+    def travel_minutes(self, origin, spot_id):
+        """
+        Return the travel time from an origin to one spot, or None if unreachable.
+        """
+        minutes = int(self.minutes[self._rows[origin], self._columns[spot_id]])
+        return None if minutes == UNREACHABLE else minutes
+
+
+def cache_path(graph_path=GRAPH_PATH):
+    """Return the cached matrix path next to a graph file."""
+    return os.path.splitext(graph_path)[0] + ".minutes.npy"
+
+
+def travel_matrix(spot_ids, graph_path=GRAPH_PATH, cache=None):
+    """
+    Return the travel matrix for a spot list, from the cache when it is fresh.
+
+    Parameters
+    ----------
+    spot_ids : sequence of str
+        Spot ids in the column order the caller indexes by.
+    graph_path : str
+        Path to the graph file.
+    cache : str, optional
+        Cache path; defaults to cache_path(graph_path). Pass "" to skip caching.
+
+    Returns
+    -------
+    TravelMatrix
+    """
+    spot_ids = list(spot_ids)
+    cache = cache_path(graph_path) if cache is None else cache
+    key = graph_hash(graph_path, spot_ids)
+    if cache:
+        matrix = TravelMatrix.load(cache, key)
+        if matrix is not None:
+            return matrix
+
+    matrix = TravelMatrix.build(load_graph(graph_path), spot_ids)
+    if cache:
+        try:
+            matrix.save(cache, key)
+        except OSError:
+            pass  # read-only deployments just rebuild in memory
+    return matrix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the transit travel-time matrix")
+    parser.add_argument("command", choices=["build", "lookup", "origins"])
+    parser.add_argument("origin", nargs="?", help="origin station for lookup")
+    parser.add_argument("--kb", default=KB_PATH, help="path to the Prolog knowledge base")
+    parser.add_argument("--graph", default=GRAPH_PATH, help="path to the transit graph file")
+    args = parser.parse_args()
+
+    spots = load_spots(args.kb)
+    if args.command == "build":
+        cache = cache_path(args.graph)
+        for suffix in ("", ".json"):
+            if os.path.exists(cache + suffix):
+                os.remove(cache + suffix)
+        matrix = travel_matrix([s["id"] for s in spots], args.graph)
+        print(f"✅ Wrote {cache}: {len(matrix.origins)} origins x {len(matrix.spot_ids)} spots")
+    elif args.command == "origins":
+        print("\n".join(origins(load_graph(args.graph))))
+    else:
+        matrix = travel_matrix([s["id"] for s in spots], args.graph)
+        if not args.origin or not matrix.has_origin(args.origin):
+            parser.error(f"unknown origin {args.origin!r}; run 'origins' to list them")
+        row = matrix.row(args.origin)
+        for i in np.argsort(row, kind="stable"):
+            minutes = "unreachable" if row[i] == UNREACHABLE else f"{row[i]} min"
+            print(f"{minutes:>12}  {spots[i]['name']}")